@@ -0,0 +1,127 @@
+"""Format colonnaire Apache Arrow IPC pour ``/predict/batch``.
+
+Les clients à gros volume (service d'ingestion) envoient un flux Arrow IPC
+(``Content-Type: application/vnd.apache.arrow.stream``) dont les colonnes
+portent les champs d'``AccidentInput`` (schéma de référence :
+``ACCIDENT_SCHEMA``). Le corps est converti en DataFrame sans passer par
+un objet Python par ligne, validé colonne par colonne
+(``normalize_frame``) puis encodé directement (``encode_frame``). Le lot
+est journalisé d'un bloc, converti en lignes par le worker de
+journalisation (``prediction_records``).
+
+La réponse est aussi en Arrow quand l'en-tête ``Accept`` le demande :
+une ligne par accident (``prediction``, ``probabilite``, ``grave``,
+``version_modele``), le seuil et la génération des modèles dans les
+métadonnées du schéma.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from api.stream import BOOL_FIELDS, CHOICE_FIELDS, INT_FIELDS
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+ACCIDENT_SCHEMA = pa.schema(
+    [
+        ("departement", pa.string()),
+        *((field, pa.int16()) for field in INT_FIELDS),
+        *((field, pa.bool_()) for field in BOOL_FIELDS),
+        *((field, pa.string()) for field in CHOICE_FIELDS),
+        ("types_vehicules", pa.list_(pa.string())),
+    ]
+)
+
+
+def read_frame(body: bytes) -> pd.DataFrame:
+    """Accidents bruts d'un flux Arrow IPC (une colonne par champ).
+
+    Une colonne ``departement`` entière (schéma inféré par le client) est
+    convertie en chaînes au niveau du schéma ; ``normalize_frame`` refuse
+    sinon les départements non textuels, comme ``AccidentInput``.
+
+    Raises:
+        ValueError: le corps n'est pas un flux Arrow IPC lisible.
+    """
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowException as e:
+        raise ValueError(f"Flux Arrow IPC illisible : {e}") from e
+    i = table.schema.get_field_index("departement")
+    if i >= 0 and pa.types.is_integer(table.schema.field(i).type):
+        table = table.set_column(i, "departement", table.column(i).cast(pa.string()))
+    df: pd.DataFrame = table.to_pandas()
+    return df
+
+
+def input_records(df: pd.DataFrame) -> list[dict]:
+    """Accidents normalisés au format ``model_dump`` (journalisation en base)."""
+    columns = {}
+    for field in df.columns:
+        values = df[field].to_numpy()
+        if field in INT_FIELDS:
+            known = ~np.isnan(values)
+            values = np.full(len(df), None, dtype=object)
+            values[known] = df[field].to_numpy()[known].astype(np.int64)
+        columns[field] = values.tolist()
+    fields = list(columns)
+    return [
+        dict(zip(fields, row, strict=True))
+        for row in zip(*columns.values(), strict=True)
+    ]
+
+
+def prediction_records(
+    df: pd.DataFrame,
+    probas: Sequence[float],
+    versions: Sequence[str],
+    threshold: float,
+) -> list[dict]:
+    """Prédictions à journaliser (clés de ``save_predictions``), construites
+    par colonnes ; appelé par le worker de journalisation (``log_bulk``)."""
+    grave = (np.asarray(probas) >= threshold).tolist()
+    return [
+        {
+            "input_data": input_data,
+            "model_version": version,
+            "probability": proba,
+            "prediction": int(is_grave),
+            "grave": is_grave,
+        }
+        for input_data, version, proba, is_grave in zip(
+            input_records(df), versions, probas, grave, strict=True
+        )
+    ]
+
+
+def write_results(
+    probas: Sequence[float],
+    versions: Sequence[str],
+    threshold: float,
+    generation: str,
+) -> bytes:
+    """Flux Arrow IPC des prédictions, dans l'ordre des accidents."""
+    proba = np.round(np.asarray(probas, dtype=np.float64), 4)
+    grave = np.asarray(probas) >= threshold
+    table = pa.table(
+        {
+            "prediction": pa.array(grave.astype(np.int8)),
+            "probabilite": pa.array(proba),
+            "grave": pa.array(grave),
+            "version_modele": pa.array(versions, pa.string()).dictionary_encode(),
+        },
+        metadata={"seuil": str(threshold), "generation_modele": generation},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body: bytes = sink.getvalue().to_pybytes()
+    return body
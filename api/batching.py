@@ -0,0 +1,136 @@
+"""Micro-batching des inférences unitaires concurrentes.
+
+Sous charge, chaque requête ``/predict`` appelle ``predict_proba`` sur une
+seule ligne. Le micro-batcher regroupe les lignes soumises en même temps
+pour une même clé (génération + version ; jusqu'à ``max_batch`` lignes ou
+``max_wait_ms`` d'attente) et les score en un seul appel, puis résout le
+``Future`` de chaque appelant. La latence ajoutée est bornée par
+``max_wait_ms``. Un worker inactif depuis ``IDLE_TIMEOUT`` s'arrête (cas
+des clés d'une génération de modèles remplacée).
+
+Désactivé par défaut (``MICROBATCH_ENABLED=1`` pour l'activer).
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+
+import numpy as np
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+
+# Arrêt d'un worker sans soumission pendant ce délai (secondes)
+IDLE_TIMEOUT = 60.0
+
+# Fonction de scoring : (clé, matrice de features) → probabilités
+PredictFn = Callable[[Hashable, np.ndarray], np.ndarray]
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Regroupe les inférences unitaires par clé, un worker par clé."""
+
+    def __init__(
+        self,
+        predict_fn: PredictFn,
+        max_wait_ms: float = MICROBATCH_MAX_WAIT_MS,
+        max_batch: int = MICROBATCH_MAX_SIZE,
+    ) -> None:
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queues: dict[Hashable, queue.Queue] = {}
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self) -> None:
+        self._running = True
+
+    def stop(self) -> None:
+        """Arrête les workers après avoir traité les lignes en attente."""
+        with self._lock:
+            self._running = False
+            for q in self._queues.values():
+                q.put(_STOP)
+            threads, self._threads = self._threads, []
+            self._queues = {}
+        for t in threads:
+            t.join()
+
+    def submit(self, key: Hashable, row: np.ndarray) -> Future:
+        """Soumet une ligne de features (1, n) ; le Future porte la probabilité."""
+        future: Future = Future()
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("Micro-batcher arrêté")
+            q = self._queues.get(key)
+            if q is None:
+                q = queue.Queue()
+                t = threading.Thread(
+                    target=self._run, args=(key, q), name="microbatch", daemon=True
+                )
+                self._queues[key] = q
+                self._threads.append(t)
+                t.start()
+            q.put((row, future))
+        return future
+
+    def predict(self, key: Hashable, row: np.ndarray) -> float:
+        """Soumet une ligne et attend sa probabilité."""
+        return float(self.submit(key, row).result())
+
+    def _retire(self, key: Hashable, q: queue.Queue) -> bool:
+        """Retire un worker inactif (sous verrou, si rien n'a été soumis)."""
+        with self._lock:
+            if not q.empty():
+                return False
+            if self._queues.get(key) is q:
+                del self._queues[key]
+            self._threads = [
+                t for t in self._threads if t is not threading.current_thread()
+            ]
+            return True
+
+    def _run(self, key: Hashable, q: queue.Queue) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = q.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                if self._retire(key, q):
+                    return
+                continue
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=timeout) if timeout > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(key, batch)
+
+    def _score(self, key: Hashable, batch: list[tuple[np.ndarray, Future]]) -> None:
+        try:
+            probas = self.predict_fn(key, np.vstack([row for row, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), proba in zip(batch, probas.tolist(), strict=True):
+            future.set_result(proba)
@@ -0,0 +1,78 @@
+"""Cache LRU des probabilités prédites (et des explications SHAP).
+
+La clé est le vecteur de features encodé (et la version du modèle), pas le
+JSON brut : deux saisies différentes qui produisent les mêmes features
+partagent la même entrée. Le cache est vidé à chaque (re)chargement des
+modèles.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))  # 0 = sans expiration
+
+
+class PredictionCache[V = float]:
+    """Cache LRU borné, thread-safe, avec TTL optionnel.
+
+    Les valeurs sont des probabilités par défaut (``V`` = float).
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[tuple[str, Hashable], tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, version: str, key: Hashable) -> V | None:
+        """Valeur en cache, ou None (absente ou expirée)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get((version, key))
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[(version, key)]
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end((version, key))
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, version: str, key: Hashable, value: V) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            self._data[(version, key)] = (value, expires_at)
+            self._data.move_to_end((version, key))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, version: str | None = None) -> None:
+        """Vide le cache entier, ou seulement les entrées d'une version."""
+        with self._lock:
+            if version is None:
+                self._data.clear()
+                return
+            for k in [k for k in self._data if k[0] == version]:
+                del self._data[k]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.max_size, **self._stats}
@@ -0,0 +1,41 @@
+"""Conversion des modèles joblib vers le format natif CatBoost (.cbm).
+
+Le format .cbm se charge sans dépickling (plus rapide, moins de mémoire,
+indépendant des versions de joblib/Python). Une fois converti, un modèle
+est chargé depuis son .cbm en priorité (voir ``api.model.model_path``).
+
+Lancement :
+    python -m api.convert
+"""
+
+import logging
+
+from api.model import MODELS_DIR, VERSIONS, load_model
+
+logger = logging.getLogger(__name__)
+
+
+def convert_all() -> list[str]:
+    """Convertit chaque model_UC1_<version>.joblib en .cbm ; renvoie les versions."""
+    converted = []
+    for version in VERSIONS:
+        src = MODELS_DIR / f"model_UC1_{version}.joblib"
+        if not src.exists():
+            logger.warning("Fichier %s introuvable", src)
+            continue
+        dst = src.with_suffix(".cbm")
+        load_model(src).save_model(str(dst), format="cbm")
+        logger.info(
+            "%s → %s (%.0f Ko → %.0f Ko)",
+            src.name,
+            dst.name,
+            src.stat().st_size / 1024,
+            dst.stat().st_size / 1024,
+        )
+        converted.append(version)
+    return converted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    convert_all()
@@ -1,7 +1,7 @@
 import os
 from datetime import UTC, datetime
 
-from sqlalchemy import JSON, create_engine
+from sqlalchemy import JSON, create_engine, insert
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./predictions.db")
@@ -50,3 +50,31 @@ def save_prediction(
         db.commit()
     finally:
         db.close()
+
+
+def save_predictions(records: list[dict]) -> None:
+    """Enregistre plusieurs prédictions en un seul INSERT groupé (executemany).
+
+    Chaque enregistrement reprend les arguments de ``save_prediction``, avec
+    un ``timestamp`` optionnel (par défaut : l'instant de l'insertion).
+    """
+    if not records:
+        return
+    now = datetime.now(UTC)
+    rows = [
+        {
+            "timestamp": r.get("timestamp") or now,
+            "input_data": r["input_data"],
+            "model_version": r["model_version"],
+            "probability": r["probability"],
+            "prediction": r["prediction"],
+            "grave": "oui" if r["grave"] else "non",
+        }
+        for r in records
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Prediction), rows)
+        db.commit()
+    finally:
+        db.close()
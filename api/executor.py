@@ -0,0 +1,124 @@
+"""Exécuteur dédié des inférences unitaires.
+
+``/predict`` est une coroutine : la validation et le routage tournent dans
+la boucle d'événements, l'inférence dans un pool de ``INFERENCE_WORKERS``
+threads réservé au calcul. Les tâches bloquantes lancées par les
+coroutines (dépôt dans la file de journalisation quand elle est pleine,
+rechargement des modèles) passent par le pool d'AnyIO sous un limiteur
+dédié (``io_limiter``, ``IO_THREADS`` places), sans toucher au limiteur
+global des endpoints synchrones ; l'écriture en base a son propre thread
+(api/prediction_log.py).
+
+Chaque thread d'inférence appelle CatBoost avec ``CATBOOST_THREADS`` (ou
+``CATBOOST_THREADS_<VERSION>``) threads : le total ne doit pas dépasser le
+nombre de cœurs, ce que respecte le défaut (cœurs // ``INFERENCE_WORKERS``,
+voir ``api.model.default_catboost_threads``) ; ``benchmarks/bench_executor.py``
+compare les réglages.
+Pour plusieurs processus, lancer plusieurs workers uvicorn
+(``WEB_CONCURRENCY``) : chacun a son exécuteur et ses modèles.
+
+Avec le micro-batcher (``MICROBATCH_ENABLED=1``), la ligne est soumise
+depuis la boucle d'événements sans occuper de thread d'inférence : seul
+l'appel groupé passe par le pool (``submit``), un lot peut donc dépasser
+``INFERENCE_WORKERS`` lignes.
+
+Contre-pression : au-delà de ``INFERENCE_QUEUE_LIMIT`` inférences en
+attente d'un thread, les nouvelles sont refusées (``Overloaded``, 503 +
+``Retry-After``) au lieu d'allonger la file et la latence de toutes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from anyio import CapacityLimiter
+
+from api.metrics import stage
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+INFERENCE_QUEUE_LIMIT = int(os.getenv("INFERENCE_QUEUE_LIMIT", "64"))
+IO_THREADS = int(os.getenv("IO_THREADS", "40"))
+
+# Limiteur des tâches bloquantes des coroutines (``to_thread.run_sync``)
+io_limiter = CapacityLimiter(IO_THREADS)
+
+
+class Overloaded(Exception):
+    """File d'inférence pleine : requête refusée (contre-pression)."""
+
+
+class InferenceExecutor:
+    """Pool de threads d'inférence avec une file d'attente bornée."""
+
+    def __init__(
+        self, workers: int = INFERENCE_WORKERS, queue_limit: int = INFERENCE_QUEUE_LIMIT
+    ) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="inference"
+            )
+
+    def stop(self) -> None:
+        """Termine les inférences en cours puis libère les threads."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    async def run[T](self, fn: Callable[..., T], *args: Any) -> T:
+        """Exécute ``fn(*args)`` dans le pool et attend son résultat.
+
+        Raises:
+            Overloaded: plus de ``workers + queue_limit`` inférences en cours.
+            RuntimeError: exécuteur arrêté.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def submit[T](self, fn: Callable[..., T], *args: Any) -> Future[T]:
+        """Soumet ``fn(*args)`` au pool (appel depuis un thread, ex. le
+        micro-batcher) ; mêmes refus que ``run``."""
+        pool = self._pool
+        if pool is None:
+            raise RuntimeError("Exécuteur d'inférence arrêté")
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise Overloaded
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def task() -> T:
+            stage("executor_wait").observe(time.perf_counter() - submitted)
+            return fn(*args)
+
+        future: Future[T] = pool.submit(task)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> dict[str, int]:
+        """Taille du pool, inférences en cours ou en attente, refus cumulés."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+            }
@@ -0,0 +1,98 @@
+"""Explications SHAP des prédictions : contribution de chaque feature.
+
+Les valeurs SHAP CatBoost (``ShapValues``, en log-odds) sont calculées par
+paquets d'accidents d'une même version, en un appel par paquet. Le coût
+est d'environ 6 ms par accident (modèles de 300 arbres de profondeur 6) :
+chaque vecteur calculé est mis en cache sous la même clé que sa
+probabilité (version, génération, vecteur de features encodé).
+
+Budget de latence : le délai ``EXPLAIN_BUDGET_MS`` est vérifié avant
+chaque paquet de ``EXPLAIN_CHUNK_ROWS`` vecteurs. Une fois épuisé, les
+accidents restants sont renvoyés sans contributions ; une nouvelle requête
+les calcule en repartant du cache.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from api.metrics import EXPLANATIONS
+
+if TYPE_CHECKING:
+    from api.cache import PredictionCache
+
+EXPLAIN_BUDGET_MS = float(os.getenv("EXPLAIN_BUDGET_MS", "1000"))
+EXPLAIN_CHUNK_ROWS = int(os.getenv("EXPLAIN_CHUNK_ROWS", "16"))
+EXPLAIN_CACHE_SIZE = int(os.getenv("EXPLAIN_CACHE_SIZE", "2000"))
+
+
+def shap_values(model: Any, X: np.ndarray) -> np.ndarray:
+    """Valeurs SHAP (n, n_features + 1) ; dernière colonne = valeur de base."""
+    from catboost import Pool
+
+    pool = Pool(X, cat_features=model.get_cat_feature_indices())
+    values: np.ndarray = model.get_feature_importance(pool, type="ShapValues")
+    return values
+
+
+def explain_rows(
+    model: Any,
+    X: np.ndarray,
+    cache: PredictionCache[np.ndarray],
+    version: str,
+    generation: str,
+    deadline: float,
+    chunk_rows: int = EXPLAIN_CHUNK_ROWS,
+) -> list[np.ndarray | None]:
+    """Valeurs SHAP de chaque ligne de ``X`` (None si le budget est épuisé).
+
+    Les vecteurs en cache sont servis quel que soit le délai ; les vecteurs
+    distincts restants sont calculés par paquets tant que
+    ``time.monotonic()`` n'a pas atteint ``deadline``.
+    """
+    rows: list[np.ndarray | None] = [None] * len(X)
+    pending: dict[tuple, list[int]] = {}
+    for i, key in enumerate(map(tuple, X.tolist())):
+        cached = cache.get(version, (generation, key))
+        if cached is None:
+            pending.setdefault(key, []).append(i)
+        else:
+            rows[i] = cached
+    EXPLANATIONS.labels(version, "cache").inc(len(X) - sum(map(len, pending.values())))
+
+    keys = list(pending)
+    for start in range(0, len(keys), chunk_rows):
+        if time.monotonic() >= deadline:
+            skipped = sum(len(pending[key]) for key in keys[start:])
+            EXPLANATIONS.labels(version, "over_budget").inc(skipped)
+            break
+        chunk = keys[start : start + chunk_rows]
+        values = shap_values(model, X[[pending[key][0] for key in chunk]])
+        for key, row in zip(chunk, values, strict=True):
+            cache.put(version, (generation, key), row)
+            for i in pending[key]:
+                rows[i] = row
+        EXPLANATIONS.labels(version, "computed").inc(
+            sum(len(pending[key]) for key in chunk)
+        )
+    return rows
+
+
+def top_contributions(
+    features: tuple[str, ...], x: np.ndarray, shap_row: np.ndarray, top_k: int
+) -> list[dict[str, Any]]:
+    """Les ``top_k`` contributions les plus fortes en valeur absolue."""
+    contributions = shap_row[:-1]
+    order = np.argsort(-np.abs(contributions), kind="stable")[:top_k]
+    return [
+        {
+            "feature": features[j],
+            "valeur": int(x[j]),
+            "contribution": round(float(contributions[j]), 4),
+        }
+        for j in order
+    ]
@@ -0,0 +1,99 @@
+"""Introspection des modèles, calculée une fois par génération.
+
+Les faits statiques d'une génération (features, métriques, seuil, nombre
+d'arbres, importances) ne changent qu'au rechargement : ils sont calculés
+au chargement du registre et sérialisés une fois en JSON. Les endpoints
+renvoient ces octets tels quels avec un ``ETag`` (empreinte du contenu) et
+un ``Cache-Control`` : les clients revalident par ``If-None-Match`` et
+reçoivent un 304 sans corps tant que la génération n'a pas changé. Le
+contenu ne dépend que des fichiers de MODELS_DIR (pas de date de
+chargement) : tous les workers servent le même ETag.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pydantic import RootModel
+
+from api.schemas import FeatureImportance, ModelsResponse, ModelSummary
+
+if TYPE_CHECKING:
+    from api.registry import ModelRegistry
+
+INTROSPECTION_MAX_AGE = int(os.getenv("INTROSPECTION_MAX_AGE", "60"))
+TOP_IMPORTANCES = 15
+
+ImportancesByVersion = RootModel[dict[str, list[FeatureImportance]]]
+
+
+@dataclass(frozen=True)
+class StaticDocument:
+    """Réponse JSON figée et son ETag (empreinte du corps)."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_json(cls, body: bytes) -> StaticDocument:
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:16]}"')
+
+    def matches(self, if_none_match: str) -> bool:
+        """Vrai si l'en-tête ``If-None-Match`` désigne ce document."""
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+@dataclass(frozen=True)
+class Introspection:
+    """Documents statiques d'une génération (``/models``, ``/feature-importances``)."""
+
+    models: StaticDocument
+    feature_importances: StaticDocument
+
+
+def _importances(model: object, features: list[str]) -> list[FeatureImportance]:
+    """Importances triées par ordre décroissant ([] si le backend l'ignore)."""
+    if not hasattr(model, "get_feature_importance"):
+        return []
+    values = model.get_feature_importance().tolist()
+    pairs = sorted(zip(features, values, strict=False), key=lambda x: -x[1])
+    return [
+        FeatureImportance(feature=feature, importance=round(importance, 4))
+        for feature, importance in pairs
+    ]
+
+
+def build_introspection(registry: ModelRegistry) -> Introspection:
+    """Calcule et sérialise l'introspection de tous les modèles du registre."""
+    summaries = {}
+    for version, model in registry.models.items():
+        info = registry.model_info(version)
+        features = list(info.get("features", []))
+        tree_count = getattr(model, "tree_count_", None)
+        summaries[version] = ModelSummary(
+            features=features,
+            n_features=len(features),
+            n_arbres=None if tree_count is None else int(tree_count),
+            metriques=info.get("metrics_test_2024", {}),
+            importances=_importances(model, features),
+        )
+    models = ModelsResponse(
+        generation=registry.generation,
+        seuil=registry.threshold,
+        modeles=summaries,
+    )
+    top = ImportancesByVersion(
+        {
+            version: summary.importances[:TOP_IMPORTANCES]
+            for version, summary in summaries.items()
+            if summary.importances
+        }
+    )
+    return Introspection(
+        models=StaticDocument.from_json(models.model_dump_json().encode()),
+        feature_importances=StaticDocument.from_json(top.model_dump_json().encode()),
+    )
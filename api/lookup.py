@@ -0,0 +1,204 @@
+"""Table de prédictions précalculée pour le modèle V1.
+
+Les entrées du modèle V1 (``v1_base``) sont entièrement discrètes :
+département x heure x mois x week-end x luminosité. Toutes les cellules
+sont scorées hors ligne et stockées en virgule fixe (uint16, probabilité
+x 65535, soit 7.6e-6 près) pour garder le fichier sous la limite de taille
+des fichiers versionnés ; l'API répond alors aux requêtes V1 par simple
+indexation, sans CatBoost.
+
+Le jour de la semaine n'intervient dans les features V1 qu'à travers
+``weekend`` : la table a donc 2 valeurs sur cet axe et non 7.
+
+Génération (à relancer après chaque réentraînement du modèle V1) :
+    python -m api.lookup
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from itertools import product
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from api.model import MODELS_DIR, FeatureEncoder, load_all_models
+from api.schemas import AccidentInput, literal_values
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+VERSION = "v1_base"
+TABLE_PATH = MODELS_DIR / "lookup_UC1_v1_base.npy"
+LUMINOSITES = literal_values("luminosite")
+
+# Quantification des probabilités stockées (uint16)
+SCALE = np.iinfo(np.uint16).max
+
+# Nombre de cellules vérifiées contre le modèle au chargement
+PARITY_SAMPLE = 256
+PARITY_TOLERANCE = 1e-5  # demi-pas de quantification : 7.6e-6
+
+
+def table_shape(dep_mapping: dict) -> tuple[int, ...]:
+    """(départements, heures, mois, week-end, luminosités)."""
+    n_dep = max((int(v) for v in dep_mapping.values()), default=0) + 1
+    return (n_dep, 24, 12, 2, len(LUMINOSITES))
+
+
+def _cell_inputs(
+    dep_mapping: dict, cells: Sequence[tuple[int, ...]]
+) -> list[AccidentInput]:
+    """Accidents représentatifs de chaque cellule (dep, heure, mois, we, lum)."""
+    dep_by_code: dict[int, str] = {}
+    for dep, code in dep_mapping.items():
+        dep_by_code.setdefault(int(code), str(dep))
+    return [
+        AccidentInput.model_construct(
+            departement=dep_by_code.get(dep, ""),
+            heure=heure,
+            mois=mois + 1,
+            jour_semaine=5 if weekend else 0,
+            luminosite=LUMINOSITES[lum],
+        )
+        for dep, heure, mois, weekend, lum in cells
+    ]
+
+
+def _score_cells(
+    model: Any, encoder: FeatureEncoder, dep_mapping: dict, cells: list
+) -> np.ndarray:
+    X = encoder.encode_batch(_cell_inputs(dep_mapping, cells))
+    return np.asarray(model.predict_proba(X)[:, 1], dtype=np.float32)
+
+
+def build_table(model: Any, encoder: FeatureEncoder, dep_mapping: dict) -> np.ndarray:
+    """Score toutes les cellules avec le modèle V1 (probabilités quantifiées)."""
+    shape = table_shape(dep_mapping)
+    cells = list(product(*(range(n) for n in shape)))
+    probas = _score_cells(model, encoder, dep_mapping, cells).reshape(shape)
+    return np.rint(probas.astype(np.float64) * SCALE).astype(np.uint16)
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class V1LookupTable:
+    """Table V1 mappée en mémoire, interrogée par arithmétique d'indices."""
+
+    def __init__(self, table: np.ndarray, dep_mapping: dict) -> None:
+        self.table = table
+        self._dep_mapping = dep_mapping
+        self._lum_index = {lum: i for i, lum in enumerate(LUMINOSITES)}
+
+    def index(self, data: AccidentInput) -> tuple[int, int, int, int, int]:
+        """Indice de la cellule correspondant à un accident."""
+        return (
+            int(self._dep_mapping.get(str(data.departement), 0)),
+            data.heure,
+            data.mois - 1,
+            int(data.jour_semaine >= 5),
+            self._lum_index[data.luminosite],
+        )
+
+    def lookup_batch(self, rows: list[AccidentInput]) -> np.ndarray:
+        """Probabilités de gravité (float64) pour une liste d'accidents V1."""
+        if not rows:
+            return np.empty(0)
+        idx = np.array([self.index(r) for r in rows]).T
+        return np.asarray(self.table[tuple(idx)], dtype=np.float64) / SCALE
+
+
+def load_table(
+    metadata: dict, dep_mapping: dict, model: Any, encoder: FeatureEncoder
+) -> V1LookupTable | None:
+    """Charge la table V1 si elle est valide, sinon None (repli sur le modèle).
+
+    La table est refusée si son empreinte SHA-256 ou sa forme diffèrent des
+    métadonnées, ou si un échantillon de cellules ne correspond pas au modèle
+    chargé.
+    """
+    info = metadata.get("models", {}).get(VERSION, {}).get("lookup_table")
+    if not info:
+        logger.info("Pas de table V1 dans les métadonnées, inférence CatBoost")
+        return None
+    path = MODELS_DIR / info["path"]
+    if not path.exists():
+        logger.warning("Table V1 %s introuvable, inférence CatBoost", path)
+        return None
+    if file_sha256(path) != info.get("sha256"):
+        logger.warning("Empreinte de %s invalide, inférence CatBoost", path.name)
+        return None
+
+    table = np.load(path, mmap_mode="r")
+    if table.shape != table_shape(dep_mapping) or table.dtype != np.uint16:
+        logger.warning("Table V1 %s (%s) inattendue", table.shape, table.dtype)
+        return None
+
+    # Vérification de parité sur un échantillon de cellules
+    rng = np.random.default_rng(0)
+    cells = [
+        tuple(int(rng.integers(n)) for n in table.shape) for _ in range(PARITY_SAMPLE)
+    ]
+    expected = _score_cells(model, encoder, dep_mapping, cells)
+    actual = np.array([table[c] for c in cells]) / SCALE
+    if not np.allclose(actual, expected, atol=PARITY_TOLERANCE):
+        logger.warning("Table V1 incohérente avec le modèle, inférence CatBoost")
+        return None
+
+    logger.info("Table V1 chargée : %s cellules", f"{table.size:,}")
+    return V1LookupTable(table, dep_mapping)
+
+
+class DeferredTable:
+    """Table V1 d'une génération, vérifiée au chargement du modèle V1.
+
+    L'empreinte et la parité se vérifient avec le modèle : en chargement
+    paresseux (``MODEL_LAZY_LOAD``), ``validate`` est appelé par
+    ``ModelStore.on_load`` à la première requête V1. D'ici là ``table``
+    vaut None et les requêtes V1 passent par le modèle.
+    """
+
+    def __init__(
+        self, metadata: dict, dep_mapping: dict, encoder: FeatureEncoder
+    ) -> None:
+        self._metadata = metadata
+        self._dep_mapping = dep_mapping
+        self._encoder = encoder
+        self.table: V1LookupTable | None = None
+
+    def validate(self, model: Any) -> None:
+        """Charge la table si elle est valide pour ``model`` (``load_table``)."""
+        self.table = load_table(self._metadata, self._dep_mapping, model, self._encoder)
+
+
+def main() -> None:
+    """Génère la table V1 et référence son empreinte dans les métadonnées."""
+    logging.basicConfig(level=logging.INFO)
+    models, metadata, dep_mapping = load_all_models()
+    features = metadata["models"][VERSION]["features"]
+    encoder = FeatureEncoder(VERSION, features, dep_mapping)
+
+    table = build_table(models[VERSION], encoder, dep_mapping)
+    np.save(TABLE_PATH, table)
+
+    meta_path = MODELS_DIR / "metadata_UC1_api.json"
+    metadata["models"][VERSION]["lookup_table"] = {
+        "path": TABLE_PATH.name,
+        "sha256": file_sha256(TABLE_PATH),
+        "shape": list(table.shape),
+    }
+    with open(meta_path, "w") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    logger.info("Table V1 écrite : %s (%s)", TABLE_PATH, table.shape)
+
+
+if __name__ == "__main__":
+    main()
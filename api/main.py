@@ -5,44 +5,209 @@ Prédiction de la gravité des accidents routiers
 Endpoints :
   GET  /health              → statut de l'API
   POST /predict             → prédiction de gravité
+  POST /predict/batch       → prédictions groupées (JSON ou Arrow IPC)
+  POST /predict/sweep       → balayage contrefactuel (un accident, 1-2 axes)
+  POST /predict/stream      → scoring en flux d'un CSV/NDJSON (réponse NDJSON)
+  POST /triage              → classement d'incidents ouverts par gravité
+  POST /explain             → contributions SHAP des features (par accident)
+  GET  /models              → introspection des modèles (features, métriques)
   GET  /feature-importances → importance des features par modèle
+  GET  /shadow              → accord des modèles candidats (évaluation shadow)
+  POST /admin/reload        → rechargement à chaud des modèles
+  GET  /metrics             → métriques Prometheus
 
 Lancement :
   uvicorn api.main:app --reload
 """
 
+import asyncio
+import logging
+import math
 import os
-from collections.abc import AsyncIterator
+import secrets
+import tempfile
+import threading
+import time
+from collections.abc import AsyncIterator, Hashable, Iterator
 from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from functools import partial
+from typing import Annotated, Any, cast
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+import pandas as pd
+from anyio import to_thread
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 
-from api.database import init_db, save_prediction
-from api.model import DEFAULT_THRESHOLD, build_features, detect_version, load_all_models
-from api.schemas import AccidentInput, HealthResponse, PredictionResponse
+from api.arrow_ipc import (
+    ARROW_MEDIA_TYPE,
+    prediction_records,
+    read_frame,
+    write_results,
+)
+from api.batching import MICROBATCH_ENABLED, MicroBatcher
+from api.cache import PredictionCache
+from api.database import init_db
+from api.executor import InferenceExecutor, Overloaded, io_limiter
+from api.explain import (
+    EXPLAIN_BUDGET_MS,
+    EXPLAIN_CACHE_SIZE,
+    explain_rows,
+    top_contributions,
+)
+from api.introspection import INTROSPECTION_MAX_AGE, StaticDocument
+from api.metrics import ANY_VERSION, PREDICTIONS, mark_worker_dead, render, stage
+from api.model import (
+    MODEL_LAZY_LOAD,
+    detect_version,
+    detect_versions,
+    group_by_version,
+    rss_mb,
+)
+from api.prediction_log import PredictionLogger
+from api.registry import (
+    ModelRegistry,
+    RegistryError,
+    Reloader,
+    ReloadTrigger,
+    load_registry,
+    validate_registry,
+)
+from api.schemas import (
+    AccidentInput,
+    Contribution,
+    ExplainRequest,
+    ExplainResponse,
+    Explanation,
+    FeatureImportance,
+    HealthResponse,
+    InferenceExecutorStats,
+    ModelsResponse,
+    PredictionCacheStats,
+    PredictionLogStats,
+    PredictionResponse,
+    ReloadResponse,
+    ShadowStats,
+    SweepAxis,
+    SweepRequest,
+    SweepResponse,
+    TriageRequest,
+    TriageResponse,
+    TriageResult,
+)
+from api.shadow import ShadowScorer
+from api.stream import (
+    FORMATS,
+    READ_BLOCK,
+    SPOOL_MAX_BYTES,
+    normalize_frame,
+    predict_frame,
+    score_blocks,
+)
+from api.sweep import axis_values, expand_grid
+
+logger = logging.getLogger(__name__)
 
 # Origines autorisées pour CORS (configurable via env)
 CORS_ORIGINS = os.getenv(
     "CORS_ORIGINS", "http://localhost:8501,http://frontend:8501"
 ).split(",")
 
+# Taille maximale d'un lot pour /predict/batch
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+
+# Taille maximale d'un lot Arrow IPC (pas d'objet Python par ligne)
+ARROW_BATCH_MAX_SIZE = int(os.getenv("ARROW_BATCH_MAX_SIZE", "100000"))
+
+# Validation d'un corps JSON de /predict/batch
+BATCH_ADAPTER = TypeAdapter(list[AccidentInput])
+
+# Nombre maximal de points de la grille de /predict/sweep
+SWEEP_MAX_CELLS = int(os.getenv("SWEEP_MAX_CELLS", "5000"))
+
+# Nombre maximal d'accidents par appel à /explain
+EXPLAIN_MAX_SIZE = int(os.getenv("EXPLAIN_MAX_SIZE", "100"))
+
+# Jeton requis par /admin/reload (endpoint désactivé si absent)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 # --- État applicatif (chargé au démarrage) ---
-models: dict = {}
-metadata: dict = {}
-dep_mapping: dict = {}
+# Génération de modèles servie : remplacée d'un bloc au rechargement, jamais
+# modifiée en place. Chaque endpoint la lit une seule fois en entrée.
+registry: ModelRegistry = ModelRegistry.empty()
+reloader = Reloader()
+reload_trigger = ReloadTrigger()  # rechargements des autres workers
+ready = False  # passe à True une fois les modèles préchauffés
+
+# Journalisation write-behind des prédictions (voir api/prediction_log.py)
+prediction_logger = PredictionLogger()
+
+# Cache LRU des probabilités, clé = vecteur de features encodé (voir api/cache.py)
+prediction_cache = PredictionCache()
+
+# Cache des valeurs SHAP, même clé que les probabilités (voir api/explain.py)
+explanation_cache: PredictionCache[np.ndarray] = PredictionCache(EXPLAIN_CACHE_SIZE)
+
+# Scoring shadow des modèles candidats, hors requête (voir api/shadow.py)
+shadow_scorer = ShadowScorer(lambda records: prediction_logger.log_many(records))
+
+# Pool de threads dédié aux inférences de /predict (voir api/executor.py)
+inference_executor = InferenceExecutor()
+
+# Micro-batcher optionnel des inférences unitaires (voir api/batching.py)
+micro_batcher: MicroBatcher | None = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Charge les modèles au démarrage, libère les ressources à l'arrêt."""
-    global models, metadata, dep_mapping
-    models, metadata, dep_mapping = load_all_models()
+    global registry, micro_batcher, ready
+    start, rss_start = time.perf_counter(), rss_mb()
+    registry = load_registry()
+    if registry.models:
+        try:
+            validate_registry(registry, loaded_only=MODEL_LAZY_LOAD)
+        except RegistryError as e:
+            logger.warning("Génération %s incohérente : %s", registry.generation, e)
+    reload_trigger.reset()
+    prediction_cache.invalidate()
+    explanation_cache.invalidate()
+    inference_executor.start()
+    if MICROBATCH_ENABLED:
+        micro_batcher = MicroBatcher(_predict_batched)
+        micro_batcher.start()
     init_db()
+    prediction_logger.start()
+    shadow_scorer.reset()
+    shadow_scorer.start()
+    ready = True
+    logger.info(
+        "API prête en %.2f s (génération %s, RSS %.0f Mo → %.0f Mo, "
+        "modèles en mémoire : %s)",
+        time.perf_counter() - start,
+        registry.generation or "-",
+        rss_start,
+        rss_mb(),
+        ", ".join(registry.models.loaded()) or "aucun",
+    )
     yield
-    models.clear()
-    metadata.clear()
-    dep_mapping.clear()
+    ready = False
+    # Le micro-batcher vide ses lots via l'exécuteur : arrêté avant lui, et le
+    # logger en dernier pour journaliser les prédictions de ces lots
+    if micro_batcher is not None:
+        micro_batcher.stop()
+        micro_batcher = None
+    shadow_scorer.stop()
+    inference_executor.stop()
+    prediction_logger.stop()
+    prediction_cache.invalidate()
+    explanation_cache.invalidate()
+    registry = ModelRegistry.empty()
+    mark_worker_dead()
 
 
 app = FastAPI(
@@ -61,22 +226,256 @@ app.add_middleware(
 )
 
 
+# --- Helpers ---
+
+
+def _serving_registry() -> ModelRegistry:
+    """Génération servie ; si un autre worker a rechargé (``reload_trigger``),
+    lance le même rechargement en arrière-plan (la requête garde celle-ci)."""
+    reg = registry
+    token = reload_trigger.poll()
+    if token is not None:
+        threading.Thread(
+            target=_follow_reload, args=(token,), name="model-reload", daemon=True
+        ).start()
+    return reg
+
+
+def _follow_reload(token: str) -> None:
+    """Rechargement publié par un autre worker (rien si déjà en cours ici)."""
+    try:
+        new = reloader.reload()
+    except Exception:
+        # Génération invalide ou illisible (RegistryError, .cbm tronqué, OSError…) :
+        # jeton marqué traité pour ne pas recharger à chaque RELOAD_POLL_INTERVAL
+        logger.exception("Rechargement d'un autre worker refusé ici")
+        reload_trigger.seen = token
+        return
+    if new is not None:
+        _install(new)
+        reload_trigger.seen = token
+
+
+def _install(new: ModelRegistry) -> ModelRegistry:
+    """Remplace la génération servie, vide les caches qui en dépendent et
+    renvoie la précédente."""
+    global registry
+    previous, registry = registry, new
+    prediction_cache.invalidate()
+    explanation_cache.invalidate()
+    shadow_scorer.reset()
+    logger.info("Génération %s → %s", previous.generation, new.generation)
+    return previous
+
+
+def _score(reg: ModelRegistry, version: str, rows: list[AccidentInput]) -> np.ndarray:
+    """Probabilités de gravité d'accidents relevant d'une même version.
+
+    V1 est servi par la table précalculée quand elle est chargée. Sinon, les
+    vecteurs déjà vus sont lus dans le cache et seuls les vecteurs distincts
+    restants passent par ``predict_proba``.
+    """
+    return _score_rows(reg, version, rows)[0]
+
+
+def _score_rows(
+    reg: ModelRegistry, version: str, rows: list[AccidentInput]
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """``_score`` et la matrice de features encodée (None si table V1)."""
+    if version == "v1_base" and reg.v1_table is not None:
+        with stage("predict", version).time():
+            return reg.v1_table.lookup_batch(rows), None
+
+    with stage("features", version).time():
+        X = reg.encoders[version].encode_batch(rows)
+    probas, pending = _cached(reg, version, X)
+    if pending:
+        first = [indices[0] for indices in pending.values()]
+        with stage("predict", version).time():
+            computed = _predict(reg, version, X[first]).tolist()
+        _store(reg, version, probas, pending, computed)
+    return probas, X
+
+
+async def _score_microbatched(
+    batcher: MicroBatcher, reg: ModelRegistry, version: str, data: AccidentInput
+) -> tuple[np.ndarray, np.ndarray]:
+    """``_score_rows`` d'un accident via le micro-batcher.
+
+    Encodage et cache (quelques µs) dans la boucle d'événements ; la ligne
+    est attendue sans occuper de thread, seul l'appel groupé passe par
+    l'exécuteur d'inférence (``_predict_batched``).
+    """
+    with stage("features", version).time():
+        X = reg.encoders[version].encode_batch([data])
+    probas, pending = _cached(reg, version, X)
+    if pending:
+        with stage("predict", version).time():
+            future = batcher.submit((reg, version), X)
+            proba = await asyncio.wrap_future(future)
+        _store(reg, version, probas, pending, [proba])
+    return probas, X
+
+
+def _cached(
+    reg: ModelRegistry, version: str, X: np.ndarray
+) -> tuple[np.ndarray, dict[tuple, list[int]]]:
+    """Probabilités lues dans le cache et indices restants par vecteur."""
+    probas = np.empty(len(X))
+    pending: dict[tuple, list[int]] = {}
+    with stage("cache", version).time():
+        for i, key in enumerate(map(tuple, X.tolist())):
+            cached = prediction_cache.get(version, (reg.generation, key))
+            if cached is None:
+                pending.setdefault(key, []).append(i)
+            else:
+                probas[i] = cached
+    return probas, pending
+
+
+def _store(
+    reg: ModelRegistry,
+    version: str,
+    probas: np.ndarray,
+    pending: dict[tuple, list[int]],
+    computed: list[float],
+) -> None:
+    """Reporte les probabilités calculées (une par vecteur) et les met en cache."""
+    for (key, indices), proba in zip(pending.items(), computed, strict=True):
+        probas[indices] = proba
+        prediction_cache.put(version, (reg.generation, key), proba)
+
+
+def _predict(reg: ModelRegistry, version: str, X: np.ndarray) -> np.ndarray:
+    """Inférence CatBoost."""
+    probas: np.ndarray = reg.models[version].predict_proba(X)[:, 1]
+    return probas
+
+
+def _predict_batched(key: Hashable, X: np.ndarray) -> np.ndarray:
+    """Scoring d'un lot du micro-batcher (clé = génération, version), dans
+    l'exécuteur d'inférence."""
+    reg, version = cast(tuple[ModelRegistry, str], key)
+    return inference_executor.submit(_predict, reg, version, X).result()
+
+
+def _score_by_version(
+    reg: ModelRegistry, data: list[AccidentInput], endpoint: str
+) -> tuple[list[float], list[str]]:
+    """Probabilités et versions d'accidents de versions mélangées.
+
+    Les accidents sont regroupés par version détectée : une matrice de
+    features et un seul appel ``predict_proba`` par version (hors cache).
+    Les résultats sont dans l'ordre d'entrée.
+
+    Raises:
+        HTTPException: 503 si une des versions nécessaires n'est pas chargée.
+    """
+    with stage("detect_version").time():
+        groups = group_by_version(data)
+    missing = sorted(v for v in groups if v not in reg.models)
+    if missing:
+        for version, indices in groups.items():
+            PREDICTIONS.labels(endpoint, version, "unavailable").inc(len(indices))
+        raise HTTPException(
+            status_code=503, detail=f"Modèle(s) {', '.join(missing)} non disponible(s)"
+        )
+
+    probas: list[float] = [0.0] * len(data)
+    versions: list[str] = [""] * len(data)
+    for version, indices in groups.items():
+        try:
+            group_probas = _score(reg, version, [data[i] for i in indices])
+        except Exception:
+            PREDICTIONS.labels(endpoint, version, "error").inc(len(indices))
+            raise
+        for i, proba in zip(indices, group_probas.tolist(), strict=True):
+            probas[i] = proba
+            versions[i] = version
+    for version, indices in groups.items():
+        PREDICTIONS.labels(endpoint, version, "ok").inc(len(indices))
+    return probas, versions
+
+
+def _score_frame(
+    reg: ModelRegistry, raw: pd.DataFrame, endpoint: str
+) -> tuple[list[float], list[str], pd.DataFrame]:
+    """Variante colonne par colonne de ``_score_by_version`` (corps Arrow).
+
+    Les accidents sont validés, routés et encodés par colonnes, sans objet
+    ``AccidentInput`` ni cache. Renvoie aussi les accidents normalisés.
+
+    Raises:
+        HTTPException: 422 si un accident est invalide, 503 si une des
+            versions nécessaires n'est pas chargée.
+    """
+    with stage("validation").time():
+        df, errors = normalize_frame(raw)
+    invalid = np.flatnonzero(errors.notna().to_numpy())
+    if len(invalid):
+        raise HTTPException(
+            status_code=422,
+            detail=[
+                {"loc": ["body", int(i)], "msg": errors.iloc[i], "type": "value_error"}
+                for i in invalid[:10]
+            ],
+        )
+
+    with stage("detect_version").time():
+        versions = detect_versions(df)
+    needed = np.unique(versions).tolist()
+    missing = [v for v in needed if v not in reg.models]
+    if missing:
+        for version in needed:
+            count = int((versions == version).sum())
+            PREDICTIONS.labels(endpoint, version, "unavailable").inc(count)
+        raise HTTPException(
+            status_code=503, detail=f"Modèle(s) {', '.join(missing)} non disponible(s)"
+        )
+    probas = predict_frame(reg, df, versions, endpoint)
+    return probas.tolist(), versions.tolist(), df
+
+
+def _build_response(
+    reg: ModelRegistry, proba: float, version: str
+) -> PredictionResponse:
+    """Construit la réponse d'une prédiction à partir de la probabilité."""
+    grave = proba >= reg.threshold
+    model_info = reg.model_info(version)
+    return PredictionResponse(
+        prediction=int(grave),
+        probabilite=round(proba, 4),
+        grave=grave,
+        seuil=reg.threshold,
+        version_modele=version,
+        generation_modele=reg.generation,
+        n_features=model_info.get("n_features", 0),
+        metriques_modele=model_info.get("metrics_test_2024", {}),
+    )
+
+
 # --- Endpoints ---
 
 
 @app.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
     """Vérifie que l'API et les modèles sont opérationnels."""
+    reg = _serving_registry()
     return HealthResponse(
-        status="ok" if models else "no_models",
-        models_loaded=list(models.keys()),
-        n_models=len(models),
-        threshold=metadata.get("threshold", DEFAULT_THRESHOLD),
+        status="ok" if reg.models else "no_models",
+        ready=ready,
+        generation=reg.generation,
+        models_loaded=list(reg.models.keys()),
+        n_models=len(reg.models),
+        threshold=reg.threshold,
+        prediction_log=PredictionLogStats(**prediction_logger.stats()),
+        prediction_cache=PredictionCacheStats(**prediction_cache.stats()),
+        inference=InferenceExecutorStats(**inference_executor.stats()),
     )
 
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(data: AccidentInput) -> PredictionResponse:
+async def predict(data: AccidentInput) -> PredictionResponse:
     """Prédit la gravité d'un accident.
 
     Le modèle est sélectionné automatiquement selon les champs renseignés :
@@ -84,55 +483,448 @@ def predict(data: AccidentInput) -> PredictionResponse:
     - V2 (+route) si les infos route sont ajoutées
     - V3 (+véhicules) si les véhicules sont précisés
     - V4 (+collision) si le type de collision est renseigné
+
+    L'inférence passe par l'exécuteur dédié (api/executor.py) : 503 avec
+    ``Retry-After`` quand sa file d'attente est pleine.
     """
-    if not models:
+    reg = _serving_registry()
+    if not reg.models:
+        PREDICTIONS.labels("predict", ANY_VERSION, "unavailable").inc()
         raise HTTPException(status_code=503, detail="Aucun modèle chargé")
 
+    start = time.perf_counter()
     version = detect_version(data)
-    if version not in models:
+    stage("detect_version", version).observe(time.perf_counter() - start)
+    if version not in reg.models:
+        PREDICTIONS.labels("predict", version, "unavailable").inc()
         raise HTTPException(status_code=503, detail=f"Modèle {version} non disponible")
 
-    threshold = metadata.get("threshold", DEFAULT_THRESHOLD)
-    X = build_features(data, version, metadata, dep_mapping)
-    proba = float(models[version].predict_proba(X)[0, 1])
-    grave = proba >= threshold
+    try:
+        if version == "v1_base" and reg.v1_table is not None:
+            # Lecture de table (quelques µs) : pas de passage par l'exécuteur
+            probas, X = _score_rows(reg, version, [data])
+        elif micro_batcher is not None:
+            probas, X = await _score_microbatched(micro_batcher, reg, version, data)
+        else:
+            probas, X = await inference_executor.run(_score_rows, reg, version, [data])
+    except Overloaded:
+        PREDICTIONS.labels("predict", version, "rejected").inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Inférences en attente trop nombreuses",
+            headers={"Retry-After": "1"},
+        ) from None
+    except Exception:
+        PREDICTIONS.labels("predict", version, "error").inc()
+        raise
+    proba = float(probas[0])
+    grave = proba >= reg.threshold
 
-    # Sauvegarde en base de données
-    save_prediction(
-        input_data=data.model_dump(),
-        model_version=version,
-        probability=proba,
-        prediction=int(grave),
-        grave=grave,
+    # Sauvegarde en base de données (asynchrone, par lots)
+    record = {
+        "input_data": data.model_dump(),
+        "timestamp": datetime.now(UTC),
+        "model_version": version,
+        "probability": proba,
+        "prediction": int(grave),
+        "grave": grave,
+    }
+    with stage("log", version).time():
+        if not prediction_logger.try_log(record):
+            # File pleine (politique block) : attente hors boucle d'événements
+            await to_thread.run_sync(prediction_logger.log, record, limiter=io_limiter)
+
+    # Évaluation du candidat éventuel, hors requête (même horodatage)
+    with stage("shadow", version).time():
+        shadow_scorer.submit(reg, version, data, X, proba, record)
+
+    PREDICTIONS.labels("predict", version, "ok").inc()
+    return _build_response(reg, proba, version)
+
+
+async def _batch_body(request: Request) -> list[AccidentInput] | pd.DataFrame:
+    """Corps de ``/predict/batch`` selon son Content-Type : JSON ou Arrow IPC."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == ARROW_MEDIA_TYPE:
+        try:
+            return read_frame(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+    try:
+        return BATCH_ADAPTER.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ],
+            body=body,
+        ) from e
+
+
+@app.post(
+    "/predict/batch",
+    response_model=list[PredictionResponse],
+    responses={200: {"content": {ARROW_MEDIA_TYPE: {}}}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/AccidentInput"},
+                    }
+                },
+                ARROW_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+def predict_batch(
+    data: Annotated[list[AccidentInput] | pd.DataFrame, Depends(_batch_body)],
+    accept: str = Header(""),
+) -> Any:
+    """Prédit la gravité d'une liste d'accidents.
+
+    Les accidents sont regroupés par version détectée : une matrice de
+    features et un seul appel ``predict_proba`` par version. Les résultats
+    sont renvoyés dans l'ordre d'entrée et journalisés en base par lots.
+
+    Le corps peut être un flux Arrow IPC (``ARROW_MEDIA_TYPE``) : validé et
+    encodé par colonnes, jusqu'à ``ARROW_BATCH_MAX_SIZE`` accidents. La
+    réponse est en Arrow si l'en-tête ``Accept`` le demande.
+    """
+    reg = _serving_registry()
+    arrow = isinstance(data, pd.DataFrame)
+    max_size = ARROW_BATCH_MAX_SIZE if arrow else BATCH_MAX_SIZE
+    if not reg.models:
+        PREDICTIONS.labels("batch", ANY_VERSION, "unavailable").inc(len(data))
+        raise HTTPException(status_code=503, detail="Aucun modèle chargé")
+    if len(data) > max_size:
+        PREDICTIONS.labels("batch", ANY_VERSION, "rejected").inc(len(data))
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux ({len(data)} > {max_size})",
+        )
+
+    threshold = reg.threshold
+    if isinstance(data, pd.DataFrame):
+        probas, versions, df = _score_frame(reg, data, "batch")
+        # Lot déposé d'un bloc, converti en lignes par le worker
+        with stage("log").time():
+            prediction_logger.log_bulk(
+                partial(prediction_records, df, probas, versions, threshold),
+                len(df),
+            )
+    else:
+        probas, versions = _score_by_version(reg, data, "batch")
+        with stage("log").time():
+            prediction_logger.log_many(
+                [
+                    {
+                        "input_data": item.model_dump(),
+                        "model_version": version,
+                        "probability": proba,
+                        "prediction": int(proba >= threshold),
+                        "grave": proba >= threshold,
+                    }
+                    for item, version, proba in zip(data, versions, probas, strict=True)
+                ]
+            )
+    if ARROW_MEDIA_TYPE in accept:
+        return Response(
+            write_results(probas, versions, threshold, reg.generation),
+            media_type=ARROW_MEDIA_TYPE,
+        )
+    return [
+        _build_response(reg, proba, version)
+        for version, proba in zip(versions, probas, strict=True)
+    ]
+
+
+@app.post("/predict/sweep", response_model=SweepResponse)
+def predict_sweep(request: SweepRequest) -> SweepResponse:
+    """Score un accident en faisant varier un ou deux champs.
+
+    La grille (produit des valeurs des axes) est construite côté serveur et
+    scorée en un seul appel ``predict_proba`` ; la réponse est une matrice
+    (valeurs du premier axe x valeurs du second). Les accidents hypothétiques
+    ne sont pas journalisés en base.
+    """
+    reg = _serving_registry()
+    if not reg.models:
+        PREDICTIONS.labels("sweep", ANY_VERSION, "unavailable").inc()
+        raise HTTPException(status_code=503, detail="Aucun modèle chargé")
+
+    n_cells = math.prod(len(axis_values(a, reg.dep_mapping)) for a in request.axes)
+    if n_cells > SWEEP_MAX_CELLS:
+        PREDICTIONS.labels("sweep", ANY_VERSION, "rejected").inc(n_cells)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Grille trop volumineuse ({n_cells} > {SWEEP_MAX_CELLS})",
+        )
+    try:
+        values, rows = expand_grid(request.accident, request.axes, reg.dep_mapping)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+    version = detect_version(rows[0])
+    if version not in reg.models:
+        PREDICTIONS.labels("sweep", version, "unavailable").inc(len(rows))
+        raise HTTPException(status_code=503, detail=f"Modèle {version} non disponible")
+    try:
+        probas = _score(reg, version, rows)
+    except Exception:
+        PREDICTIONS.labels("sweep", version, "error").inc(len(rows))
+        raise
+    PREDICTIONS.labels("sweep", version, "ok").inc(len(rows))
+
+    return SweepResponse(
+        version_modele=version,
+        generation_modele=reg.generation,
+        seuil=reg.threshold,
+        axes=[
+            SweepAxis(champ=axis.champ, valeurs=axis_vals)
+            for axis, axis_vals in zip(request.axes, values, strict=True)
+        ],
+        probabilites=probas.round(4).reshape(len(values[0]), -1).tolist(),
     )
 
-    model_info = metadata.get("models", {}).get(version, {})
-    return PredictionResponse(
-        prediction=int(grave),
-        probabilite=round(proba, 4),
-        grave=grave,
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request) -> StreamingResponse:
+    """Score en flux un corps CSV ou NDJSON, résultats en NDJSON.
+
+    Le corps est recopié bloc par bloc dans un fichier temporaire (en
+    mémoire jusqu'à 1 Mo, sur disque au-delà ; écritures dans un thread
+    ``io_limiter``, hors de la boucle d'événements), puis relu et scoré par
+    paquets de ``STREAM_CHUNK_ROWS`` lignes (encodage vectorisé, un
+    ``predict_proba`` par version) pendant l'envoi de la réponse : la
+    mémoire reste constante quelle que soit la taille du fichier. La
+    dernière ligne renvoyée est un résumé avec le débit. Les résultats ne
+    sont ni mis en cache ni journalisés en base.
+    """
+    reg = _serving_registry()
+    if not reg.models:
+        raise HTTPException(status_code=503, detail="Aucun modèle chargé")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type attendu : {' ou '.join(FORMATS)}",
+        )
+
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)  # noqa: SIM115
+    async for block in request.stream():
+        await to_thread.run_sync(body.write, block, limiter=io_limiter)
+    body.seek(0)
+
+    def results() -> Iterator[str]:
+        try:
+            blocks = iter(lambda: body.read(READ_BLOCK), b"")
+            yield from score_blocks(reg, blocks, FORMATS[content_type])
+        finally:
+            body.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/triage", response_model=TriageResponse)
+def triage(request: TriageRequest) -> TriageResponse:
+    """Classe les incidents ouverts par probabilité de gravité décroissante.
+
+    Chaque incident est scoré à sa propre version (un appel ``predict_proba``
+    par version). Les appels sont incrémentaux : le cache étant indexé par
+    vecteur de features, renvoyer l'ensemble avec quelques incidents modifiés
+    ne rescore que ceux-là. Les incidents ne sont pas journalisés en base
+    (l'ensemble est renvoyé à chaque mise à jour).
+    """
+    reg = _serving_registry()
+    n = len(request.incidents)
+    if not reg.models:
+        PREDICTIONS.labels("triage", ANY_VERSION, "unavailable").inc(n)
+        raise HTTPException(status_code=503, detail="Aucun modèle chargé")
+    if n > BATCH_MAX_SIZE:
+        PREDICTIONS.labels("triage", ANY_VERSION, "rejected").inc(n)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'incidents ({n} > {BATCH_MAX_SIZE})",
+        )
+
+    probas, versions = _score_by_version(
+        reg, [incident.accident for incident in request.incidents], "triage"
+    )
+    order = sorted(range(n), key=lambda i: -probas[i])
+    threshold = reg.threshold
+    return TriageResponse(
+        generation_modele=reg.generation,
         seuil=threshold,
-        version_modele=version,
-        n_features=model_info.get("n_features", 0),
-        metriques_modele=model_info.get("metrics_test_2024", {}),
+        n_incidents=n,
+        n_graves=sum(p >= threshold for p in probas),
+        classement=[
+            TriageResult(
+                id=request.incidents[i].id,
+                rang=rank,
+                probabilite=round(probas[i], 4),
+                grave=probas[i] >= threshold,
+                version_modele=versions[i],
+            )
+            for rank, i in enumerate(order[: request.top_k], start=1)
+        ],
     )
 
 
-@app.get("/feature-importances")
-def feature_importances() -> dict[str, list[dict[str, float]]]:
-    """Retourne le top 15 features par modèle."""
-    result: dict[str, list[dict[str, float]]] = {}
-    for version, model in models.items():
-        if hasattr(model, "get_feature_importance"):
-            importances = model.get_feature_importance()
-            features = metadata["models"][version]["features"]
-            pairs = sorted(
-                zip(features, importances.tolist(), strict=False),
-                key=lambda x: x[1],
-                reverse=True,
+@app.post("/explain", response_model=ExplainResponse)
+def explain(request: ExplainRequest) -> ExplainResponse:
+    """Explique la prédiction de chaque accident par ses contributions SHAP.
+
+    Les valeurs SHAP sont calculées en un appel CatBoost par paquet
+    d'accidents d'une même version et mises en cache sous la clé de la
+    prédiction. Au-delà de ``EXPLAIN_BUDGET_MS``, les accidents non encore
+    calculés sont renvoyés sans contributions (``complet`` = False).
+    """
+    reg = _serving_registry()
+    data = request.accidents
+    if not reg.models:
+        PREDICTIONS.labels("explain", ANY_VERSION, "unavailable").inc(len(data))
+        raise HTTPException(status_code=503, detail="Aucun modèle chargé")
+    if len(data) > EXPLAIN_MAX_SIZE:
+        PREDICTIONS.labels("explain", ANY_VERSION, "rejected").inc(len(data))
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'accidents ({len(data)} > {EXPLAIN_MAX_SIZE})",
+        )
+
+    deadline = time.monotonic() + EXPLAIN_BUDGET_MS / 1000
+    probas, versions = _score_by_version(reg, data, "explain")
+    groups: dict[str, list[int]] = {}
+    for i, version in enumerate(versions):
+        groups.setdefault(version, []).append(i)
+
+    contributions: list[list[Contribution] | None] = [None] * len(data)
+    base_values: list[float | None] = [None] * len(data)
+    for version, indices in groups.items():
+        model = reg.models[version]
+        if not hasattr(model, "get_feature_importance"):
+            raise HTTPException(
+                status_code=501,
+                detail=f"Explications indisponibles pour le modèle {version}",
+            )
+        encoder = reg.encoders[version]
+        X = encoder.encode_batch([data[i] for i in indices])
+        with stage("explain", version).time():
+            rows = explain_rows(
+                model, X, explanation_cache, version, reg.generation, deadline
             )
-            result[version] = [
-                {"feature": feat, "importance": round(imp, 4)}
-                for feat, imp in pairs[:15]
+        for i, x, shap_row in zip(indices, X, rows, strict=True):
+            if shap_row is None:
+                continue
+            base_values[i] = round(float(shap_row[-1]), 4)
+            contributions[i] = [
+                Contribution(**c)
+                for c in top_contributions(encoder.features, x, shap_row, request.top_k)
             ]
-    return result
+
+    threshold = reg.threshold
+    return ExplainResponse(
+        generation_modele=reg.generation,
+        seuil=threshold,
+        complet=all(c is not None for c in contributions),
+        explications=[
+            Explanation(
+                version_modele=version,
+                probabilite=round(proba, 4),
+                grave=proba >= threshold,
+                valeur_base=base,
+                contributions=contrib,
+            )
+            for version, proba, base, contrib in zip(
+                versions, probas, base_values, contributions, strict=True
+            )
+        ],
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Métriques au format texte Prometheus (tous workers confondus)."""
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+
+def _static_response(document: StaticDocument, if_none_match: str) -> Response:
+    """Document d'introspection, ou 304 si le client a déjà cette version."""
+    headers = {
+        "ETag": document.etag,
+        "Cache-Control": f"public, max-age={INTROSPECTION_MAX_AGE}",
+    }
+    if if_none_match and document.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=document.body, media_type="application/json", headers=headers
+    )
+
+
+@app.get("/models", response_model=ModelsResponse)
+def models_info(if_none_match: str = Header("")) -> Response:
+    """Features, métriques, nombre d'arbres et importances de chaque modèle.
+
+    Calculé une fois par génération ; revalidable par ``If-None-Match``.
+    """
+    reg = _serving_registry()
+    return _static_response(reg.introspection.models, if_none_match)
+
+
+@app.get("/feature-importances", response_model=dict[str, list[FeatureImportance]])
+def feature_importances(if_none_match: str = Header("")) -> Response:
+    """Retourne le top 15 features par modèle (revalidable par ETag)."""
+    reg = _serving_registry()
+    return _static_response(reg.introspection.feature_importances, if_none_match)
+
+
+@app.get("/shadow", response_model=ShadowStats)
+def shadow_stats() -> ShadowStats:
+    """Accord et dérive des modèles candidats face aux modèles servis.
+
+    Statistiques du worker qui répond, remises à zéro au rechargement ; les
+    compteurs ``uc1_shadow_*`` de ``/metrics`` agrègent tous les workers.
+    """
+    reg = _serving_registry()
+    return ShadowStats(candidats=list(reg.shadows), **shadow_scorer.stats())
+
+
+@app.post("/admin/reload", response_model=ReloadResponse)
+async def reload_models(x_admin_token: str = Header("")) -> ReloadResponse:
+    """Recharge les modèles depuis MODELS_DIR sans interrompre le service.
+
+    La nouvelle génération est chargée, validée contre les métadonnées et
+    préchauffée pendant que l'ancienne continue de servir, puis les deux sont
+    échangées d'un bloc. Le chargement tourne dans un thread (``io_limiter``),
+    hors de la boucle d'événements. Requiert l'en-tête ``X-Admin-Token`` =
+    ``ADMIN_TOKEN``.
+
+    Les autres workers uvicorn sont prévenus par ``reload_trigger`` et
+    rechargent à leur tour dans les ``RELOAD_POLL_INTERVAL`` secondes ; la
+    réponse décrit la génération du worker qui a traité la requête.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Rechargement désactivé")
+    if not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Jeton d'administration invalide")
+
+    try:
+        new = await to_thread.run_sync(reloader.reload, limiter=io_limiter)
+    except RegistryError as e:
+        raise HTTPException(status_code=422, detail=f"Génération refusée : {e}") from e
+    if new is None:
+        raise HTTPException(status_code=409, detail="Rechargement déjà en cours")
+
+    previous = _install(new)
+    reload_trigger.bump()
+    return ReloadResponse(
+        previous_generation=previous.generation,
+        generation=new.generation,
+        models_loaded=list(new.models.keys()),
+    )
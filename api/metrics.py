@@ -0,0 +1,139 @@
+"""Métriques Prometheus de l'API (exposées sur ``GET /metrics``).
+
+Les étapes d'une prédiction sont chronométrées par version de modèle :
+
+  validation      → validation Pydantic d'un accident (avant routage)
+  executor_wait   → attente d'un thread de l'exécuteur d'inférence (/predict)
+  detect_version  → choix de la version
+  features        → encodage du vecteur de features
+  cache           → lecture du cache des probabilités
+  predict         → ``predict_proba`` (ou lecture de la table V1)
+  log             → dépôt dans la file de journalisation
+  shadow          → tirage et dépôt dans la file du scoring shadow
+
+L'écriture en base, faite par le thread de journalisation, a son propre
+histogramme ; la profondeur de sa file et le devenir des prédictions
+(écrites, en échec, abandonnées ou débordées) sont aussi exportés. Une
+observation coûte environ une microseconde ; le rendu texte n'est calculé
+qu'au moment d'un scrape.
+
+Plusieurs workers uvicorn : définir ``PROMETHEUS_MULTIPROC_DIR`` (dossier
+vide au lancement, partagé par les workers). Chaque worker écrit alors ses
+compteurs dans un fichier mappé en mémoire et ``/metrics`` agrège tous les
+fichiers, quel que soit le worker qui répond au scrape. Un worker qui
+s'arrête normalement retire ses jauges ``livesum`` de l'agrégat
+(``mark_worker_dead``, appelé à la fin du lifespan) ; sous gunicorn, le
+hook ``child_exit`` couvre aussi les workers tués :
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+"""
+
+from __future__ import annotations
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Étapes antérieures au routage : pas encore de version connue
+ANY_VERSION = "all"
+
+# Les étapes vont de la microseconde (table V1) à quelques dizaines de ms
+STAGE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+)
+
+STAGE_SECONDS = Histogram(
+    "uc1_stage_duration_seconds",
+    "Durée des étapes de prédiction",
+    ["stage", "version"],
+    buckets=STAGE_BUCKETS,
+)
+PREDICTIONS = Counter(
+    "uc1_predictions",
+    "Accidents traités, par endpoint, version et issue",
+    ["endpoint", "version", "outcome"],
+)
+EXPLANATIONS = Counter(
+    "uc1_explanations",
+    "Explications SHAP, par version et issue (cache, computed, over_budget)",
+    ["version", "outcome"],
+)
+SHADOW_PREDICTIONS = Counter(
+    "uc1_shadow_predictions",
+    "Scorings des modèles candidats (agree, disagree, dropped, error)",
+    ["version", "outcome"],
+)
+SHADOW_ABS_DIFF = Histogram(
+    "uc1_shadow_abs_diff",
+    "Écart absolu de probabilité candidat - modèle servi",
+    ["version"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5),
+)
+DB_WRITE_SECONDS = Histogram(
+    "uc1_db_write_duration_seconds",
+    "Durée d'un INSERT groupé de prédictions",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_ROWS = Counter(
+    "uc1_db_rows",
+    "Prédictions journalisées, par issue (written, failed, dropped, spilled)",
+    ["outcome"],
+)
+# Somme des files des workers vivants (mode multi-processus)
+LOG_QUEUE_DEPTH = Gauge(
+    "uc1_prediction_log_queue_depth",
+    "Entrées en attente dans la file de journalisation",
+    multiprocess_mode="livesum",
+)
+
+
+def stage(name: str, version: str = ANY_VERSION) -> Histogram:
+    """Histogramme d'une étape (``with stage("predict", version).time(): ...``)."""
+    return STAGE_SECONDS.labels(name, version)
+
+
+def mark_worker_dead() -> None:
+    """Retire les jauges ``livesum`` du processus courant (arrêt du worker),
+    sans quoi ses dernières valeurs resteraient dans l'agrégat."""
+    if MULTIPROC_DIR:
+        mark_process_dead(os.getpid(), MULTIPROC_DIR)
+
+
+def render() -> tuple[bytes, str]:
+    """Corps et Content-Type de ``/metrics``.
+
+    En mode multi-processus, un registre dédié agrège les fichiers de tous
+    les workers (le registre global ne verrait que le worker courant).
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,512 @@
+"""Backend d'inférence ONNX Runtime pour les modèles CatBoost.
+
+CatBoost n'exporte pas en ONNX les modèles qui ont une variable
+catégorielle (``dep``). Les modèles UC1 sont donc compilés ici en un graphe
+ONNX standard (``TreeEnsembleRegressor`` du domaine ``ai.onnx.ml``) qui
+évalue les arbres symétriques (oblivious) de CatBoost :
+
+- split sur une feature numérique → comparaison ``x > seuil`` ;
+- split sur une statistique de ``dep`` (CTR) → lecture dans une table.
+  La valeur d'un CTR ne dépend que du département et de quelques seuils
+  numériques (combinaisons) ; le résultat de chaque split CTR est relevé,
+  pour chaque département et chaque combinaison, via ``calc_leaf_indexes``
+  du modèle d'origine.
+
+Le graphe renvoie les probabilités de ``predict_proba`` à 1e-5 près (les
+valeurs des feuilles sont stockées en float32). L'export
+vérifie cette parité sur un échantillon de l'année de test (2024) de
+``data/UC1_v4_collision.csv`` s'il est présent, sinon sur une grille
+d'accidents synthétiques.
+
+Export (à relancer après chaque réentraînement) :
+    python -m api.onnx_backend
+
+Dépendances optionnelles (groupe uv ``onnx``, ``uv sync --group onnx``) :
+``onnx`` pour l'export, ``onnxruntime`` pour l'inférence.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from api.model import (
+    BASE_DIR,
+    MODELS_DIR,
+    VERSIONS,
+    FeatureEncoder,
+    compile_encoders,
+    load_all_models,
+)
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
+HOLDOUT_PATH = DATA_DIR / "UC1_v4_collision.csv"
+HOLDOUT_YEAR = 2024
+PARITY_SAMPLE = 2000
+PARITY_TOLERANCE = 1e-5  # feuilles en float32 dans TreeEnsembleRegressor
+OPSET = 17
+ML_OPSET = 3
+IR_VERSION = 8  # version du format associée à l'opset 17
+
+
+def onnx_path(version: str) -> Path:
+    return MODELS_DIR / f"model_UC1_{version}.onnx"
+
+
+@dataclass
+class ObliviousTree:
+    """Arbre symétrique : un split par niveau, feuille = bits des niveaux.
+
+    ``columns`` indexe l'entrée étendue du graphe (features puis un bit par
+    split CTR) ; le split du niveau ``l`` vaut ``x[col] > border`` et donne
+    le bit ``l`` de l'indice de feuille.
+    """
+
+    columns: list[int]
+    borders: list[float]
+    leaf_values: list[float]
+
+
+@dataclass
+class CompiledEnsemble:
+    """Arbres d'un modèle CatBoost et tables de ses splits CTR.
+
+    Le résultat du split CTR ``s`` est lu dans ``ctr_table[dep, combinaison,
+    s]``, où la combinaison code les comparaisons ``x[ctr_cols] >
+    ctr_borders`` (un bit chacune).
+    """
+
+    feature_names: list[str]
+    dep_col: int
+    ctr_cols: np.ndarray  # (S_c, K) int64
+    ctr_borders: np.ndarray  # (S_c, K) float32 : +inf en remplissage
+    ctr_table: np.ndarray  # (n_dep, 2**K, S_c) bool
+    trees: list[ObliviousTree]
+    scale: float
+    bias: float
+
+
+def _model_json(model: Any) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.json"
+        model.save_model(str(path), format="json")
+        info: dict = json.loads(path.read_text())
+    return info
+
+
+def _value_between(lo: float, hi: float) -> float:
+    """Une valeur de l'intervalle ]lo, hi] (bornes éventuellement infinies)."""
+    if np.isinf(lo) and np.isinf(hi):
+        return 0.0
+    if np.isinf(lo):
+        return hi - 1
+    if np.isinf(hi):
+        return lo + 1
+    return (lo + hi) / 2
+
+
+def _probe_ctr(
+    model: Any,
+    n_dep: int,
+    n_features: int,
+    dep_col: int,
+    combo: list[tuple[int, float]],
+    probes: dict[int, tuple[int, int]],
+) -> dict[int, np.ndarray]:
+    """Résultat des splits d'un CTR pour chaque (département, combinaison).
+
+    ``probes`` associe chaque split à un (arbre, niveau) qui l'utilise ; le
+    bit correspondant de l'indice de feuille donne le résultat du split.
+    Les combinaisons impossibles (seuils contradictoires) valent False.
+    """
+    rows, valid = [], []
+    for dep in range(n_dep):
+        for assignment in range(2 ** len(combo)):
+            row = [0.0] * n_features
+            row[dep_col] = dep
+            bounds: dict[int, tuple[float, float]] = {}
+            for j, (col, border) in enumerate(combo):
+                lo, hi = bounds.get(col, (-np.inf, np.inf))
+                if assignment >> j & 1:
+                    lo = max(lo, border)
+                else:
+                    hi = min(hi, border)
+                bounds[col] = (lo, hi)
+            for col, (lo, hi) in bounds.items():
+                row[col] = _value_between(lo, hi)
+            rows.append(row)
+            valid.append(all(lo < hi for lo, hi in bounds.values()))
+
+    leaves = model.calc_leaf_indexes(np.array(rows, dtype=object))
+    mask = np.array(valid)
+    return {
+        split: ((leaves[:, tree] >> level & 1).astype(bool) & mask).reshape(
+            n_dep, 2 ** len(combo)
+        )
+        for split, (tree, level) in probes.items()
+    }
+
+
+def compile_catboost(model: Any, n_dep: int) -> CompiledEnsemble:
+    """Compile un CatBoostClassifier binaire à une variable catégorielle.
+
+    Les départements sont les codes 0..n_dep-1 produits par les encodeurs.
+    """
+    info = _model_json(model)
+    features_info = info["features_info"]
+    [cat_feature] = features_info["categorical_features"]
+    dep_col = int(cat_feature["flat_feature_index"])
+    float_features = features_info["float_features"]
+    flat_index = [f["flat_feature_index"] for f in float_features]
+
+    # split_index de CatBoost : seuils numériques puis seuils CTR, dans l'ordre
+    catalog: list[tuple[str, int, float]] = [
+        ("float", f["flat_feature_index"], b)
+        for f in float_features
+        for b in f["borders"] or []
+    ]
+    ctrs = features_info["ctrs"]
+    catalog += [("ctr", i, b) for i, c in enumerate(ctrs) for b in c["borders"]]
+    combos = [
+        [
+            (flat_index[e["float_feature_index"]], e["border"])
+            for e in c["elements"]
+            if e["combination_element"] == "float_feature"
+        ]
+        for c in ctrs
+    ]
+
+    # Splits CTR distincts (et un usage de chacun pour le relevé)
+    trees = info["oblivious_trees"]
+    ctr_ids: dict[int, int] = {}
+    probes: dict[int, dict[int, tuple[int, int]]] = {}
+    for t, tree in enumerate(trees):
+        for level, split in enumerate(tree["splits"] or []):
+            index = split["split_index"]
+            kind, ref, _ = catalog[index]
+            if kind == "ctr":
+                ctr_ids.setdefault(index, len(ctr_ids))
+                probes.setdefault(ref, {}).setdefault(index, (t, level))
+
+    n_features = len(flat_index) + 1
+    k = max((len(combos[catalog[i][1]]) for i in ctr_ids), default=1) or 1
+    ctr_cols = np.zeros((len(ctr_ids), k), dtype=np.int64)
+    ctr_borders = np.full((len(ctr_ids), k), np.inf, dtype=np.float32)
+    ctr_table = np.zeros((n_dep, 2**k, len(ctr_ids)), dtype=bool)
+    for ctr, ctr_probes in probes.items():
+        combo = combos[ctr]
+        bits = _probe_ctr(model, n_dep, n_features, dep_col, combo, ctr_probes)
+        for index, table in bits.items():
+            s = ctr_ids[index]
+            ctr_table[:, : table.shape[1], s] = table
+            for j, (col, border) in enumerate(combo):
+                ctr_cols[s, j], ctr_borders[s, j] = col, border
+
+    compiled = []
+    for tree in trees:
+        columns, borders = [], []
+        for split in tree["splits"] or []:
+            kind, ref, border = catalog[split["split_index"]]
+            if kind == "float":
+                columns.append(ref)
+                borders.append(border)
+            else:
+                columns.append(n_features + ctr_ids[split["split_index"]])
+                borders.append(0.5)
+        compiled.append(ObliviousTree(columns, borders, list(tree["leaf_values"])))
+
+    scale, [bias] = info["scale_and_bias"]
+    return CompiledEnsemble(
+        feature_names=list(model.feature_names_),
+        dep_col=dep_col,
+        ctr_cols=ctr_cols,
+        ctr_borders=ctr_borders,
+        ctr_table=ctr_table,
+        trees=compiled,
+        scale=float(scale),
+        bias=float(bias),
+    )
+
+
+def _tree_attributes(ensemble: CompiledEnsemble) -> dict[str, Any]:
+    """Attributs de ``TreeEnsembleRegressor`` : arbres symétriques dépliés.
+
+    Dans un arbre de profondeur D, les nœuds du niveau ``d`` portent les
+    numéros ``2**d - 1 + p`` (``p`` : bits des niveaux précédents) ; la
+    branche vraie ajoute le bit ``d``. Les feuilles suivent, dans l'ordre
+    des indices de feuille de CatBoost.
+    """
+    nodes: dict[str, list] = {
+        key: []
+        for key in (
+            "nodes_treeids",
+            "nodes_nodeids",
+            "nodes_featureids",
+            "nodes_modes",
+            "nodes_values",
+            "nodes_truenodeids",
+            "nodes_falsenodeids",
+            "target_treeids",
+            "target_nodeids",
+            "target_ids",
+            "target_weights",
+        )
+    }
+
+    def add(tree: int, node: int, feature: int, mode: str, value: float) -> None:
+        nodes["nodes_treeids"].append(tree)
+        nodes["nodes_nodeids"].append(node)
+        nodes["nodes_featureids"].append(feature)
+        nodes["nodes_modes"].append(mode)
+        nodes["nodes_values"].append(value)
+
+    for t, tree in enumerate(ensemble.trees):
+        depth = len(tree.columns)
+        first_leaf = 2**depth - 1
+        for d, (col, border) in enumerate(zip(tree.columns, tree.borders, strict=True)):
+            below = 2 ** (d + 1) - 1 if d + 1 < depth else first_leaf
+            for p in range(2**d):
+                add(t, 2**d - 1 + p, col, "BRANCH_GT", border)
+                nodes["nodes_truenodeids"].append(below + (p | 1 << d))
+                nodes["nodes_falsenodeids"].append(below + p)
+        for leaf, value in enumerate(tree.leaf_values):
+            add(t, first_leaf + leaf, 0, "LEAF", 0.0)
+            nodes["nodes_truenodeids"].append(0)
+            nodes["nodes_falsenodeids"].append(0)
+            nodes["target_treeids"].append(t)
+            nodes["target_nodeids"].append(first_leaf + leaf)
+            nodes["target_ids"].append(0)
+            nodes["target_weights"].append(value * ensemble.scale)
+    return nodes
+
+
+def to_onnx(ensemble: CompiledEnsemble) -> Any:
+    """Graphe ONNX : ``features`` (N, F) float32 → ``probabilities`` (N, 2).
+
+    Les bits des splits CTR sont calculés par des opérateurs standard puis
+    ajoutés aux features ; ``TreeEnsembleRegressor`` (domaine ``ai.onnx.ml``)
+    évalue ensuite tous les arbres.
+    """
+    from onnx import TensorProto, helper, numpy_helper
+
+    e = ensemble
+    n_dep, n_assign, n_ctr = e.ctr_table.shape
+    k = e.ctr_cols.shape[1]
+    constants = {
+        "ctr_cols": e.ctr_cols.ravel(),
+        "ctr_borders": e.ctr_borders.ravel(),
+        "ctr_shape": np.array([-1, n_ctr, k], dtype=np.int64),
+        "ctr_pow2": 2 ** np.arange(k, dtype=np.int64),
+        "axis_last": np.array([2], dtype=np.int64),
+        "dep_col": np.array([e.dep_col], dtype=np.int64),
+        "dep_max": np.array(n_dep - 1, dtype=np.int64),
+        "dep_stride": np.array(n_assign * n_ctr, dtype=np.int64),
+        "n_ctr": np.array(n_ctr, dtype=np.int64),
+        "ctr_range": np.arange(n_ctr, dtype=np.int64),
+        "ctr_table": e.ctr_table.ravel(),
+        "zero": np.array(0, dtype=np.int64),
+        "bias": np.array(e.bias, dtype=np.float64),
+        "one": np.array(1.0, dtype=np.float64),
+    }
+    node = helper.make_node
+    nodes = [
+        # Splits CTR : combinaison des seuils numériques, puis table[dep, combi]
+        node("Gather", ["features", "ctr_cols"], ["ctr_x"], axis=1),
+        node("Greater", ["ctr_x", "ctr_borders"], ["ctr_gt"]),
+        node("Cast", ["ctr_gt"], ["ctr_gt_int"], to=TensorProto.INT64),
+        node("Reshape", ["ctr_gt_int", "ctr_shape"], ["ctr_gt_3d"]),
+        node("Mul", ["ctr_gt_3d", "ctr_pow2"], ["ctr_weighted"]),
+        node("ReduceSum", ["ctr_weighted", "axis_last"], ["assign"], keepdims=0),
+        node("Gather", ["features", "dep_col"], ["dep_x"], axis=1),
+        node("Cast", ["dep_x"], ["dep_raw"], to=TensorProto.INT64),
+        node("Clip", ["dep_raw", "zero", "dep_max"], ["dep"]),
+        node("Mul", ["dep", "dep_stride"], ["dep_offset"]),
+        node("Mul", ["assign", "n_ctr"], ["assign_offset"]),
+        node("Add", ["dep_offset", "assign_offset"], ["ctr_base"]),
+        node("Add", ["ctr_base", "ctr_range"], ["ctr_index"]),
+        node("Gather", ["ctr_table", "ctr_index"], ["ctr_bits_bool"], axis=0),
+        node("Cast", ["ctr_bits_bool"], ["ctr_bits"], to=TensorProto.FLOAT),
+        # Arbres sur [features, bits CTR], puis sigmoïde en double précision
+        node("Concat", ["features", "ctr_bits"], ["extended"], axis=1),
+        node(
+            "TreeEnsembleRegressor",
+            ["extended"],
+            ["raw"],
+            domain="ai.onnx.ml",
+            n_targets=1,
+            aggregate_function="SUM",
+            **_tree_attributes(e),
+        ),
+        node("Cast", ["raw"], ["raw_double"], to=TensorProto.DOUBLE),
+        node("Add", ["raw_double", "bias"], ["logit"]),
+        node("Sigmoid", ["logit"], ["proba"]),
+        node("Sub", ["one", "proba"], ["proba_neg"]),
+        node("Concat", ["proba_neg", "proba"], ["probabilities"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "uc1_catboost",
+        [
+            helper.make_tensor_value_info(
+                "features", TensorProto.FLOAT, ["N", len(e.feature_names)]
+            )
+        ],
+        [helper.make_tensor_value_info("probabilities", TensorProto.DOUBLE, ["N", 2])],
+        initializer=[numpy_helper.from_array(v, k) for k, v in constants.items()],
+    )
+    proto = helper.make_model(
+        graph,
+        opset_imports=[
+            helper.make_opsetid("", OPSET),
+            helper.make_opsetid("ai.onnx.ml", ML_OPSET),
+        ],
+        ir_version=IR_VERSION,
+        producer_name="uc1",
+    )
+    helper.set_model_props(proto, {"feature_names": json.dumps(e.feature_names)})
+    return proto
+
+
+class OnnxModel:
+    """Modèle ONNX servi par ONNX Runtime, même interface que CatBoost.
+
+    ``predict_proba`` accepte la matrice (dtype ``object``) des encodeurs et
+    renvoie les probabilités (N, 2) des deux classes.
+    """
+
+    def __init__(self, path: Path, threads: int = 1) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.path = path
+        self.threads = threads
+        self._session = ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        meta = self._session.get_modelmeta().custom_metadata_map
+        self.feature_names_: list[str] = json.loads(meta["feature_names"])
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        features = np.asarray(X, dtype=np.float32)
+        [probas] = self._session.run(["probabilities"], {"features": features})
+        return np.asarray(probas)
+
+
+def load_holdout(
+    version: str, encoder: FeatureEncoder, dep_mapping: dict, n: int = PARITY_SAMPLE
+) -> np.ndarray | None:
+    """Échantillon de l'année de test du dataset V4, encodé pour ``version``.
+
+    Le dataset V4 contient toutes les features des versions V1-V4.
+    Renvoie None si le fichier est absent.
+    """
+    if not HOLDOUT_PATH.exists():
+        return None
+    df = pd.read_csv(HOLDOUT_PATH, dtype={"dep": str})
+    df = df[df["annee"] == HOLDOUT_YEAR]
+    df = df.sample(min(n, len(df)), random_state=0)
+    df["dep"] = df["dep"].map(dep_mapping).fillna(0).astype(int)
+    X: np.ndarray = df[list(encoder.features)].to_numpy(dtype=object)
+    return X
+
+
+def synthetic_sample(encoder: FeatureEncoder, dep_mapping: dict) -> np.ndarray:
+    """Accidents aléatoires couvrant tous les départements et options V2-V4."""
+    from api.schemas import AccidentInput
+
+    rng = random.Random(0)  # noqa: S311  # nosec B311 - échantillon synthétique
+    rows = []
+    for dep in sorted(dep_mapping):
+        for _ in range(4):
+            payload = {
+                "departement": dep,
+                "heure": rng.randint(0, 23),
+                "mois": rng.randint(1, 12),
+                "jour_semaine": rng.randint(0, 6),
+                "luminosite": rng.choice(
+                    ["jour", "nuit_eclairee", "nuit_non_eclairee"]
+                ),
+                "vma": rng.choice([30, 50, 80, 90, 110, 130]),
+                "nbv": rng.randint(1, 4),
+                "type_route": rng.choice(["autoroute", "departementale", "communale"]),
+                "en_agglomeration": rng.random() < 0.5,
+                "bidirectionnelle": rng.random() < 0.5,
+                "meteo_degradee": rng.random() < 0.2,
+                "surface_glissante": rng.random() < 0.2,
+                "intersection": rng.random() < 0.3,
+                "route_en_pente": rng.random() < 0.1,
+                "nb_vehicules": rng.randint(1, 3),
+                "types_vehicules": rng.sample(
+                    ["moto", "velo", "pieton", "poids_lourd"], rng.randint(0, 2)
+                ),
+                "type_collision": rng.choice(["frontale", "arriere", "cote", "solo"]),
+            }
+            rows.append(AccidentInput(**payload))
+    return encoder.encode_batch(rows)
+
+
+def check_parity(reference: Any, candidate: Any, X: np.ndarray) -> float:
+    """Écart maximal entre les probabilités de deux modèles sur ``X``."""
+    expected = reference.predict_proba(X)[:, 1]
+    actual = candidate.predict_proba(X)[:, 1]
+    return float(np.max(np.abs(expected - actual)))
+
+
+def export_all() -> dict[str, float]:
+    """Exporte chaque modèle en ONNX et vérifie la parité ; renvoie les écarts.
+
+    Raises:
+        ValueError: un modèle exporté s'écarte de CatBoost de plus de
+            ``PARITY_TOLERANCE`` (le fichier est alors supprimé).
+    """
+    import onnx
+
+    models, metadata, dep_mapping = load_all_models(backend="catboost")
+    encoders = compile_encoders(metadata, dep_mapping)
+    n_dep = max(int(v) for v in dep_mapping.values()) + 1
+    gaps = {}
+    for version in VERSIONS:
+        if version not in models:
+            continue
+        model, path = models[version], onnx_path(version)
+        onnx.save(to_onnx(compile_catboost(model, n_dep)), str(path))
+
+        X = load_holdout(version, encoders[version], dep_mapping)
+        source = f"{HOLDOUT_PATH.name} ({HOLDOUT_YEAR})"
+        if X is None:
+            X = synthetic_sample(encoders[version], dep_mapping)
+            source = "échantillon synthétique"
+        gap = check_parity(model, OnnxModel(path), X)
+        if gap > PARITY_TOLERANCE:
+            path.unlink()
+            raise ValueError(f"{version} : écart ONNX/CatBoost {gap:.2e}")
+        logger.info(
+            "%s → %s (%.0f Ko, écart max %.1e sur %d lignes, %s)",
+            version,
+            path.name,
+            path.stat().st_size / 1024,
+            gap,
+            len(X),
+            source,
+        )
+        gaps[version] = gap
+    return gaps
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    export_all()
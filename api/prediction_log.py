@@ -0,0 +1,270 @@
+"""Journalisation asynchrone (write-behind) des prédictions.
+
+Les endpoints déposent les prédictions dans une file bornée en mémoire ;
+un thread dédié les écrit en base par lots (INSERT groupé), dès que le lot
+est plein ou que l'intervalle de flush est écoulé. La requête HTTP ne paie
+donc plus l'aller-retour ni le commit en base.
+
+Politique quand la file est pleine (``PREDICTION_LOG_FULL_POLICY``) :
+  block → l'appelant attend qu'une place se libère
+  drop  → la prédiction n'est pas journalisée (compteur ``dropped``)
+  spill → la prédiction est ajoutée à un fichier JSONL local
+
+La profondeur de file et les compteurs (``stats``, repris par ``/health``)
+sont aussi exportés en métriques Prometheus (``uc1_prediction_log_queue_depth``,
+``uc1_db_rows`` par issue).
+
+Les gros lots (``/predict/batch`` en Arrow) sont déposés d'un bloc
+(``log_bulk``) : une seule place de file, lignes construites par le worker
+et écrites en un seul INSERT.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from api.database import save_predictions
+from api.metrics import DB_ROWS, DB_WRITE_SECONDS, LOG_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL", "1.0"))
+FULL_POLICY = os.getenv("PREDICTION_LOG_FULL_POLICY", "block")
+SPILL_PATH = Path(os.getenv("PREDICTION_LOG_SPILL_PATH", "predictions_spill.jsonl"))
+
+# Sentinelle déposée dans la file pour réveiller le worker à l'arrêt
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class _Bulk:
+    """Lot déposé d'un bloc ; ``records`` construit ses lignes (worker)."""
+
+    records: Callable[[], list[dict]]
+    count: int
+    timestamp: datetime
+
+    def expand(self) -> list[dict]:
+        rows = self.records()
+        for row in rows:
+            row.setdefault("timestamp", self.timestamp)
+        return rows
+
+
+class PredictionLogger:
+    """File bornée + worker qui écrit les prédictions en base par lots."""
+
+    def __init__(
+        self,
+        writer: Callable[[list[dict]], None] = save_predictions,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        full_policy: str = FULL_POLICY,
+        spill_path: Path = SPILL_PATH,
+    ) -> None:
+        if full_policy not in ("block", "drop", "spill"):
+            raise ValueError(f"Politique inconnue : {full_policy!r}")
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.full_policy = full_policy
+        self.spill_path = spill_path
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "spilled": 0, "failed": 0}
+
+    # --- Cycle de vie ---
+
+    def start(self) -> None:
+        """Démarre le worker (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="prediction-logger", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Vide la file en base puis arrête le worker."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        # File pleine : le worker est occupé à la vider, il verra l'arrêt
+        with contextlib.suppress(queue.Full):
+            self._queue.put_nowait(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                "Arrêt du logger : %d prédiction(s) non écrite(s)", self.depth
+            )
+        self._thread = None
+
+    # --- Producteurs ---
+
+    def log(self, record: dict) -> None:
+        """Ajoute une prédiction (mêmes clés que ``save_predictions``)."""
+        record.setdefault("timestamp", datetime.now(UTC))
+        if self.full_policy == "block":
+            self._queue.put(record)
+            self._observe_depth()
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.full_policy == "spill":
+                self._spill([record])
+            else:
+                self._incr("dropped", 1)
+        else:
+            self._observe_depth()
+
+    def try_log(self, record: dict) -> bool:
+        """Comme ``log``, sans jamais attendre : False si la politique ``block``
+        devrait attendre une place (l'appelant rappelle ``log`` hors de la
+        boucle d'événements)."""
+        if self.full_policy != "block":
+            self.log(record)
+            return True
+        record.setdefault("timestamp", datetime.now(UTC))
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            return False
+        self._observe_depth()
+        return True
+
+    def log_many(self, records: list[dict]) -> None:
+        """Ajoute plusieurs prédictions."""
+        for record in records:
+            self.log(record)
+
+    def log_bulk(self, records: Callable[[], list[dict]], count: int) -> None:
+        """Ajoute ``count`` prédictions en une seule place de file.
+
+        ``records`` est appelé par le worker (conversion en lignes hors de
+        la requête) et le lot est écrit en un seul appel au writer. Sous la
+        politique ``block``, l'appelant n'attend qu'une place, pas ``count``.
+        """
+        bulk = _Bulk(records, count, datetime.now(UTC))
+        if self.full_policy == "block":
+            self._queue.put(bulk)
+            self._observe_depth()
+            return
+        try:
+            self._queue.put_nowait(bulk)
+        except queue.Full:
+            if self.full_policy == "spill":
+                self._spill(bulk.expand())
+            else:
+                self._incr("dropped", count)
+        else:
+            self._observe_depth()
+
+    # --- Observabilité ---
+
+    @property
+    def depth(self) -> int:
+        """Nombre d'entrées en attente d'écriture (un lot compte pour une)."""
+        return self._queue.qsize()
+
+    def _observe_depth(self) -> None:
+        LOG_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def stats(self) -> dict[str, int]:
+        """Profondeur de file et compteurs cumulés."""
+        with self._stats_lock:
+            return {"queue_depth": self.depth, **self._stats}
+
+    # --- Worker ---
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _collect(self) -> list[dict]:
+        """Attend un premier élément puis complète le lot jusqu'à la taille
+        maximale ou l'échéance du flush (sans attendre si arrêt en cours).
+        Un lot déposé d'un bloc termine la collecte, quelle que soit sa
+        taille."""
+        batch: list[dict] = []
+        deadline: float | None = None
+        while len(batch) < self.batch_size:
+            if self._stopping.is_set():
+                timeout = 0.0
+            elif deadline is None:
+                timeout = self.flush_interval
+            else:
+                timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    item = self._queue.get(timeout=timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            if isinstance(item, _Bulk):
+                try:
+                    batch += item.expand()
+                except Exception:
+                    logger.exception("Lot de %d prédiction(s) illisible", item.count)
+                    self._incr("failed", item.count)
+                break
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        self._observe_depth()
+        return batch
+
+    def _write(self, batch: list[dict]) -> None:
+        try:
+            with DB_WRITE_SECONDS.time():
+                self.writer(batch)
+        except Exception:
+            logger.exception("Échec d'écriture de %d prédiction(s)", len(batch))
+            self._incr("failed", len(batch))
+            if self.full_policy == "spill":
+                self._spill(batch)
+        else:
+            self._incr("written", len(batch))
+
+    def _spill(self, records: list[dict]) -> None:
+        """Ajoute les prédictions au fichier JSONL de débordement."""
+        with self._spill_lock, open(self.spill_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record, default=_json_default) + "\n")
+        self._incr("spilled", len(records))
+
+    def _incr(self, key: str, n: int) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+        DB_ROWS.labels(key).inc(n)
+
+
+def _json_default(value: object) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
@@ -0,0 +1,260 @@
+"""Registre immuable d'une génération de modèles.
+
+Une génération regroupe tout ce qui sert à prédire : modèles, métadonnées,
+mapping des départements, encodeurs compilés et table V1, ainsi que les
+modèles candidats évalués en shadow (voir api/shadow.py). L'API sert les
+requêtes depuis une seule référence ``registry`` ; un rechargement construit
+et valide une nouvelle génération à côté, puis remplace la référence en une
+affectation (atomique). Les requêtes en cours terminent sur l'ancienne
+génération, qu'elles ont capturée au début du traitement.
+
+Avec plusieurs workers uvicorn, chaque processus a sa génération : le
+worker qui recharge écrit un nouveau jeton dans ``RELOAD_TRIGGER``
+(fichier partagé) et les autres, qui le relisent au plus une fois par
+``RELOAD_POLL_INTERVAL`` avant de servir, rechargent à leur tour en
+arrière-plan.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+from api.introspection import Introspection, build_introspection
+from api.lookup import DeferredTable, V1LookupTable
+from api.model import (
+    DEFAULT_THRESHOLD,
+    MODEL_LAZY_LOAD,
+    MODELS_DIR,
+    FeatureEncoder,
+    ModelStore,
+    compile_encoders,
+    load_all_models,
+    warmup,
+    warmup_model,
+)
+from api.shadow import load_shadow_models
+
+logger = logging.getLogger(__name__)
+
+# Signal de rechargement partagé par les workers (hors empreinte de génération)
+RELOAD_TRIGGER = Path(os.getenv("RELOAD_TRIGGER", str(MODELS_DIR / ".reload")))
+RELOAD_POLL_INTERVAL = float(os.getenv("RELOAD_POLL_INTERVAL", "1.0"))
+
+
+class RegistryError(Exception):
+    """Génération de modèles invalide (refusée au rechargement)."""
+
+
+@dataclass(frozen=True, eq=False)
+class ModelRegistry:
+    """Génération de modèles servie par l'API (ne pas muter après création)."""
+
+    generation: str
+    models: ModelStore
+    metadata: dict
+    dep_mapping: dict
+    encoders: dict[str, FeatureEncoder]
+    v1_lookup: DeferredTable | None = None
+    shadows: ModelStore = field(default_factory=ModelStore)
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    @classmethod
+    def empty(cls) -> ModelRegistry:
+        return cls(
+            generation="", models=ModelStore(), metadata={}, dep_mapping={}, encoders={}
+        )
+
+    @property
+    def threshold(self) -> float:
+        return float(self.metadata.get("threshold", DEFAULT_THRESHOLD))
+
+    @property
+    def v1_table(self) -> V1LookupTable | None:
+        """Table V1 vérifiée, None tant que le modèle V1 n'est pas chargé."""
+        return self.v1_lookup.table if self.v1_lookup is not None else None
+
+    def model_info(self, version: str) -> dict:
+        info: dict = self.metadata.get("models", {}).get(version, {})
+        return info
+
+    @cached_property
+    def introspection(self) -> Introspection:
+        """Faits statiques de la génération, calculés au premier accès."""
+        return build_introspection(self)
+
+
+def generation_id() -> str:
+    """Empreinte courte de MODELS_DIR (métadonnées + modèles).
+
+    Les métadonnées JSON sont hachées en entier ; les modèles et tables par
+    (nom, taille, date de modification) seulement, pour ne pas lire tous les
+    octets des modèles au démarrage (chargement lazy) ni à chaque
+    rechargement.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(MODELS_DIR.glob("*")):
+        if path.suffix == ".json":
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+        elif path.suffix in (".joblib", ".cbm", ".onnx", ".npy"):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def load_registry(lazy: bool = MODEL_LAZY_LOAD) -> ModelRegistry:
+    """Charge, préchauffe et assemble une génération depuis MODELS_DIR."""
+    generation = generation_id()
+    models, metadata, dep_mapping = load_all_models(lazy=lazy)
+    encoders = compile_encoders(metadata, dep_mapping)
+    v1_lookup = None
+    if "v1_base" in models and "v1_base" in encoders:
+        v1_lookup = DeferredTable(metadata, dep_mapping, encoders["v1_base"])
+
+    def on_load(version: str, model: Any) -> None:
+        warmup_model(model, encoders[version])
+        if version == "v1_base" and v1_lookup is not None:
+            v1_lookup.validate(model)
+
+    # Préchauffage : modèles déjà chargés maintenant, les autres à leur chargement
+    # (la table V1 est vérifiée avec le modèle V1, donc au même moment)
+    warmup(models, encoders)
+    models.on_load = on_load
+    if v1_lookup is not None and "v1_base" in models.loaded():
+        v1_lookup.validate(models["v1_base"])
+    shadows = load_shadow_models(lazy=lazy)
+    warmup(shadows, encoders)
+    shadows.on_load = lambda version, model: warmup_model(model, encoders[version])
+    registry = ModelRegistry(
+        generation=generation,
+        models=models,
+        metadata=metadata,
+        dep_mapping=dep_mapping,
+        encoders=encoders,
+        v1_lookup=v1_lookup,
+        shadows=shadows,
+    )
+    if not lazy:
+        # Introspection calculée avant la bascule, pas à la première requête
+        _ = registry.introspection
+    return registry
+
+
+def validate_registry(registry: ModelRegistry, loaded_only: bool = False) -> None:
+    """Vérifie une génération contre metadata_UC1_api.json.
+
+    Avec ``loaded_only`` (démarrage en chargement paresseux), seuls les
+    modèles déjà en mémoire sont vérifiés, sans charger les autres.
+
+    Raises:
+        RegistryError: aucun modèle, seuil invalide, ou features d'un modèle
+            (ou d'un candidat shadow) différentes de celles déclarées dans
+            les métadonnées.
+    """
+    if not registry.models:
+        raise RegistryError("Aucun modèle disponible")
+    if not 0 < registry.threshold < 1:
+        raise RegistryError(f"Seuil invalide : {registry.threshold}")
+    models = registry.models.loaded() if loaded_only else list(registry.models)
+    for version in models:
+        expected = registry.model_info(version).get("features")
+        if expected is None:
+            raise RegistryError(f"{version} absent des métadonnées")
+        actual = getattr(registry.models[version], "feature_names_", expected)
+        if list(actual) != list(expected):
+            raise RegistryError(f"{version} : features différentes des métadonnées")
+    shadows = registry.shadows.loaded() if loaded_only else list(registry.shadows)
+    for version in shadows:
+        expected = registry.model_info(version).get("features", [])
+        actual = getattr(registry.shadows[version], "feature_names_", expected)
+        if list(actual) != list(expected):
+            raise RegistryError(f"Candidat {version} : features différentes")
+
+
+class Reloader:
+    """Recharge une nouvelle génération ; un seul rechargement à la fois."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def in_progress(self) -> bool:
+        return self._lock.locked()
+
+    def reload(self) -> ModelRegistry | None:
+        """Charge et valide une nouvelle génération (eager : tous les modèles
+        sont chargés et préchauffés avant la bascule).
+
+        Returns:
+            La nouvelle génération, ou None si un rechargement est déjà en cours.
+
+        Raises:
+            RegistryError: la nouvelle génération est invalide.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            registry = load_registry(lazy=False)
+            validate_registry(registry)
+            return registry
+        finally:
+            self._lock.release()
+
+
+class ReloadTrigger:
+    """Jeton de rechargement partagé par les workers (un fichier).
+
+    ``bump`` publie un nouveau jeton après un rechargement ; ``poll`` renvoie
+    le jeton s'il diffère du dernier jeton traité (``seen``), en relisant le
+    fichier au plus une fois par ``interval`` secondes.
+    """
+
+    def __init__(
+        self, path: Path = RELOAD_TRIGGER, interval: float = RELOAD_POLL_INTERVAL
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self.seen = self._read()
+
+    def _read(self) -> str:
+        try:
+            return self.path.read_text()
+        except OSError:
+            return ""
+
+    def reset(self) -> None:
+        """Prend le jeton courant comme déjà traité (démarrage du worker)."""
+        self.seen = self._read()
+
+    def bump(self) -> None:
+        """Publie un nouveau jeton (écriture atomique) et le marque traité."""
+        token = f"{time.time_ns()}-{os.getpid()}"
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(token)
+            tmp.replace(self.path)
+        except OSError as e:
+            logger.warning("Signal de rechargement non publié (%s) : %s", self.path, e)
+            return
+        self.seen = token
+
+    def poll(self) -> str | None:
+        """Nouveau jeton à traiter, ou None (pas encore l'heure, ou inchangé)."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return None
+            self._next_check = now + self.interval
+        token = self._read()
+        return token if token != self.seen else None
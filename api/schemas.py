@@ -1,8 +1,11 @@
 """Schémas Pydantic pour la validation des requêtes et réponses."""
 
-from typing import Literal
+import time
+from typing import Any, Literal, Self, get_args, get_origin
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ModelWrapValidatorHandler, model_validator
+
+from api.metrics import stage
 
 
 class AccidentInput(BaseModel):
@@ -51,6 +54,16 @@ class AccidentInput(BaseModel):
         description="'frontale' | 'arriere' | 'cote' | 'solo'",
     )
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def _timed(cls, data: Any, handler: ModelWrapValidatorHandler[Self]) -> Self:
+        """Chronomètre la validation (étape ``validation`` de /metrics)."""
+        start = time.perf_counter()
+        try:
+            return handler(data)
+        finally:
+            stage("validation").observe(time.perf_counter() - start)
+
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -72,6 +85,17 @@ class AccidentInput(BaseModel):
     }
 
 
+def literal_values(field: str) -> tuple:
+    """Valeurs du ``Literal[...]`` d'un champ d'accident (même dans ``list[...] | None``)."""
+    pending = [AccidentInput.model_fields[field].annotation]
+    while pending:
+        arg = pending.pop()
+        if get_origin(arg) is Literal:
+            return get_args(arg)
+        pending.extend(get_args(arg))
+    raise TypeError(f"{field} n'est pas un champ Literal")
+
+
 class PredictionResponse(BaseModel):
     """Résultat de la prédiction de gravité."""
 
@@ -82,14 +106,255 @@ class PredictionResponse(BaseModel):
     version_modele: str = Field(
         ..., description="v1_base | v2_route | v3_vehicules | v4_collision"
     )
+    generation_modele: str = Field(
+        ..., description="Empreinte de la génération de modèles ayant répondu"
+    )
     n_features: int
     metriques_modele: dict
 
 
+class PredictionLogStats(BaseModel):
+    """État de la journalisation asynchrone des prédictions."""
+
+    queue_depth: int = Field(..., description="Prédictions en attente d'écriture")
+    written: int
+    dropped: int
+    spilled: int
+    failed: int
+
+
+class PredictionCacheStats(BaseModel):
+    """Compteurs du cache LRU des prédictions."""
+
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class InferenceExecutorStats(BaseModel):
+    """État de l'exécuteur d'inférence de /predict."""
+
+    workers: int
+    queue_limit: int = Field(..., description="Attente maximale avant refus (503)")
+    in_flight: int = Field(..., description="Inférences en cours ou en attente")
+    rejected: int
+
+
 class HealthResponse(BaseModel):
     """Statut de l'API."""
 
     status: str
+    ready: bool = Field(..., description="Modèles chargés et préchauffés")
+    generation: str = Field(..., description="Génération de modèles servie")
     models_loaded: list[str]
     n_models: int
     threshold: float
+    prediction_log: PredictionLogStats
+    prediction_cache: PredictionCacheStats
+    inference: InferenceExecutorStats
+
+
+class ShadowAgreement(BaseModel):
+    """Accord et dérive d'un modèle candidat face au modèle servi."""
+
+    n: int = Field(..., description="Accidents scorés par le candidat")
+    accord: float = Field(..., description="Part de décisions identiques au seuil")
+    proba_moyenne_servi: float
+    proba_moyenne_candidat: float
+    ecart_moyen: float = Field(..., description="Moyenne de candidat - servi")
+    ecart_absolu_moyen: float
+    ecart_absolu_max: float
+
+
+class ShadowStats(BaseModel):
+    """Évaluation shadow des candidats (worker courant, depuis le chargement)."""
+
+    taux_echantillonnage: float
+    candidats: list[str] = Field(..., description="Versions ayant un candidat")
+    queue_depth: int = Field(..., description="Accidents en attente de scoring")
+    dropped: int = Field(..., description="Échantillons abandonnés (file pleine)")
+    errors: int
+    versions: dict[str, ShadowAgreement]
+
+
+class ReloadResponse(BaseModel):
+    """Résultat d'un rechargement à chaud des modèles."""
+
+    previous_generation: str
+    generation: str
+    models_loaded: list[str]
+
+
+class FeatureImportance(BaseModel):
+    """Importance d'une feature (``get_feature_importance`` CatBoost)."""
+
+    feature: str
+    importance: float
+
+
+class ModelSummary(BaseModel):
+    """Faits statiques d'un modèle chargé."""
+
+    features: list[str]
+    n_features: int
+    n_arbres: int | None = Field(None, description="None si le backend l'ignore")
+    metriques: dict = Field(..., description="Métriques sur l'année de test (2024)")
+    importances: list[FeatureImportance] = Field(
+        ..., description="Toutes les features, par importance décroissante"
+    )
+
+
+class ModelsResponse(BaseModel):
+    """Introspection d'une génération de modèles (calculée une fois)."""
+
+    generation: str
+    seuil: float
+    modeles: dict[str, ModelSummary]
+
+
+SweepField = Literal[
+    "departement",
+    "heure",
+    "mois",
+    "jour_semaine",
+    "luminosite",
+    "vma",
+    "nbv",
+    "type_route",
+    "en_agglomeration",
+    "bidirectionnelle",
+    "meteo_degradee",
+    "surface_glissante",
+    "intersection",
+    "route_en_pente",
+    "nb_vehicules",
+    "type_collision",
+]
+
+
+class SweepAxis(BaseModel):
+    """Champ d'``AccidentInput`` à faire varier."""
+
+    champ: SweepField
+    valeurs: list[bool | int | str] | None = Field(
+        None,
+        min_length=1,
+        description="Valeurs à parcourir (défaut : tout le domaine du champ)",
+    )
+
+
+class SweepRequest(BaseModel):
+    """Accident de référence et un ou deux axes de variation."""
+
+    accident: AccidentInput
+    axes: list[SweepAxis] = Field(..., min_length=1, max_length=2)
+
+    @model_validator(mode="after")
+    def _distinct_axes(self) -> Self:
+        if len({axis.champ for axis in self.axes}) != len(self.axes):
+            raise ValueError("Les axes doivent porter sur des champs distincts")
+        return self
+
+
+class SweepResponse(BaseModel):
+    """Probabilités de gravité sur la grille des axes.
+
+    ``probabilites[i][j]`` correspond à la valeur ``i`` du premier axe et à
+    la valeur ``j`` du second (une seule colonne s'il n'y a qu'un axe).
+    """
+
+    version_modele: str
+    generation_modele: str
+    seuil: float
+    axes: list[SweepAxis] = Field(..., description="Valeurs effectivement parcourues")
+    probabilites: list[list[float]]
+
+
+class TriageIncident(BaseModel):
+    """Incident ouvert : identifiant du centre et accident (V1 à V4)."""
+
+    id: str = Field(..., min_length=1, description="Identifiant de l'incident")
+    accident: AccidentInput
+
+
+class TriageRequest(BaseModel):
+    """Ensemble des incidents ouverts à classer."""
+
+    incidents: list[TriageIncident]
+    top_k: int | None = Field(
+        None, ge=1, description="Ne renvoyer que les k incidents les plus graves"
+    )
+
+    @model_validator(mode="after")
+    def _unique_ids(self) -> Self:
+        if len({i.id for i in self.incidents}) != len(self.incidents):
+            raise ValueError("Identifiants d'incidents en double")
+        return self
+
+
+class TriageResult(BaseModel):
+    """Incident classé."""
+
+    id: str
+    rang: int = Field(..., description="1 = incident le plus grave")
+    probabilite: float
+    grave: bool
+    version_modele: str
+
+
+class TriageResponse(BaseModel):
+    """Incidents classés par probabilité de gravité décroissante."""
+
+    generation_modele: str
+    seuil: float
+    n_incidents: int
+    n_graves: int = Field(..., description="Incidents au-dessus du seuil")
+    classement: list[TriageResult]
+
+
+class ExplainRequest(BaseModel):
+    """Accidents à expliquer (versions mélangées possibles)."""
+
+    accidents: list[AccidentInput] = Field(..., min_length=1)
+    top_k: int = Field(
+        5, ge=1, le=40, description="Nombre de contributions renvoyées par accident"
+    )
+
+
+class Contribution(BaseModel):
+    """Contribution d'une feature à la prédiction (valeur SHAP)."""
+
+    feature: str = Field(
+        ..., description="Nom de la feature (libellé : FEATURE_LABELS du frontend)"
+    )
+    valeur: int = Field(..., description="Valeur encodée de la feature")
+    contribution: float = Field(
+        ..., description="Contribution en log-odds (> 0 : augmente la gravité)"
+    )
+
+
+class Explanation(BaseModel):
+    """Prédiction d'un accident et ses principales contributions."""
+
+    version_modele: str
+    probabilite: float
+    grave: bool
+    valeur_base: float | None = Field(
+        None, description="Log-odds moyen du modèle (base des contributions)"
+    )
+    contributions: list[Contribution] | None = Field(
+        None, description="None si le budget de latence a été épuisé avant le calcul"
+    )
+
+
+class ExplainResponse(BaseModel):
+    """Explications, dans l'ordre des accidents de la requête."""
+
+    generation_modele: str
+    seuil: float
+    complet: bool = Field(
+        ..., description="False si des explications manquent (budget de latence)"
+    )
+    explications: list[Explanation]
@@ -0,0 +1,299 @@
+"""Évaluation shadow de modèles candidats, hors du chemin de la requête.
+
+Un modèle candidat par version (réentraînement à valider) est déposé dans
+``SHADOW_MODELS_DIR`` sous le même nom que le modèle servi
+(``model_UC1_v2_route.cbm``...). Il est chargé avec la génération et doit
+avoir les mêmes features que le modèle qu'il remplacerait.
+
+Une fraction ``SHADOW_SAMPLE_RATE`` des requêtes ``/predict`` est déposée,
+avec le vecteur de features déjà encodé et la probabilité servie, dans une
+file bornée. Un pool de ``SHADOW_WORKERS`` threads la vide par lots et
+score les candidats (``SHADOW_THREADS`` threads CatBoost chacun, pour
+laisser les cœurs au modèle servi). La probabilité du candidat est
+journalisée à côté de celle du modèle servi (même accident, même
+horodatage, version ``<version>@shadow``) et les écarts sont agrégés.
+
+Coût sur la requête : un tirage aléatoire et un ``put_nowait`` (quelques
+microsecondes, étape ``shadow`` des métriques). La file pleine ne bloque
+jamais l'appelant : l'échantillon est abandonné (compteur ``dropped``).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import queue
+import random
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from api.metrics import SHADOW_ABS_DIFF, SHADOW_PREDICTIONS
+from api.model import (
+    INFERENCE_BACKEND,
+    MODEL_LAZY_LOAD,
+    MODELS_DIR,
+    VERSIONS,
+    ModelStore,
+    load_model,
+    model_path,
+)
+
+if TYPE_CHECKING:
+    from api.registry import ModelRegistry
+    from api.schemas import AccidentInput
+
+logger = logging.getLogger(__name__)
+
+SHADOW_MODELS_DIR = Path(os.getenv("SHADOW_MODELS_DIR", str(MODELS_DIR / "shadow")))
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_THREADS = int(os.getenv("SHADOW_THREADS", "1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+SHADOW_BATCH_SIZE = 64
+
+# Sentinelle déposée dans la file pour arrêter un worker
+_STOP = object()
+
+
+def load_shadow_models(
+    lazy: bool = MODEL_LAZY_LOAD, backend: str = INFERENCE_BACKEND
+) -> ModelStore:
+    """Modèles candidats présents dans SHADOW_MODELS_DIR (aucun par défaut)."""
+    paths = {}
+    for version in VERSIONS:
+        path = model_path(version, backend, SHADOW_MODELS_DIR)
+        if path is not None:
+            paths[version] = path
+    models = ModelStore(paths, loader=lambda path: load_model(path, SHADOW_THREADS))
+    if not lazy:
+        models.load_all()
+    if paths:
+        logger.info("Candidat(s) en shadow : %s", ", ".join(paths))
+    return models
+
+
+@dataclass(frozen=True)
+class ShadowJob:
+    """Accident échantillonné : de quoi scorer le candidat et journaliser."""
+
+    registry: ModelRegistry
+    version: str
+    row: AccidentInput
+    features: np.ndarray | None  # (1, n) ; None si servi par la table V1
+    probability: float
+    record: dict
+
+
+class _Agreement:
+    """Écarts cumulés candidat / modèle servi d'une version."""
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.agree = 0
+        self.sum_primary = 0.0
+        self.sum_shadow = 0.0
+        self.sum_abs_diff = 0.0
+        self.max_abs_diff = 0.0
+
+    def add(self, primary: float, shadow: float, threshold: float) -> bool:
+        agree = (primary >= threshold) == (shadow >= threshold)
+        self.n += 1
+        self.agree += agree
+        self.sum_primary += primary
+        self.sum_shadow += shadow
+        self.sum_abs_diff += abs(shadow - primary)
+        self.max_abs_diff = max(self.max_abs_diff, abs(shadow - primary))
+        return agree
+
+    def summary(self) -> dict[str, float | int]:
+        n = max(self.n, 1)
+        return {
+            "n": self.n,
+            "accord": round(self.agree / n, 4),
+            "proba_moyenne_servi": round(self.sum_primary / n, 4),
+            "proba_moyenne_candidat": round(self.sum_shadow / n, 4),
+            "ecart_moyen": round((self.sum_shadow - self.sum_primary) / n, 4),
+            "ecart_absolu_moyen": round(self.sum_abs_diff / n, 4),
+            "ecart_absolu_max": round(self.max_abs_diff, 4),
+        }
+
+
+class ShadowScorer:
+    """File bornée + pool de workers qui scorent les modèles candidats."""
+
+    def __init__(
+        self,
+        log: Callable[[list[dict]], None],
+        sample_rate: float = SHADOW_SAMPLE_RATE,
+        workers: int = SHADOW_WORKERS,
+        queue_size: int = SHADOW_QUEUE_SIZE,
+        batch_size: int = SHADOW_BATCH_SIZE,
+    ) -> None:
+        self.log = log
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.batch_size = batch_size
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._rng = random.Random()  # noqa: S311  # nosec B311 - échantillonnage
+        self._threads: list[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._agreement: dict[str, _Agreement] = {}
+        self._counts = {"dropped": 0, "errors": 0}
+
+    # --- Cycle de vie ---
+
+    def start(self) -> None:
+        """Démarre le pool (idempotent ; rien à faire si l'échantillon est nul)."""
+        if self._threads or self.sample_rate <= 0:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"shadow-scorer-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Score les accidents en attente puis arrête les workers."""
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            with contextlib.suppress(queue.Full):
+                self._queue.put(_STOP, timeout=timeout)
+        for thread in threads:
+            thread.join(timeout)
+
+    # --- Producteur (chemin de la requête) ---
+
+    def submit(
+        self,
+        registry: ModelRegistry,
+        version: str,
+        row: AccidentInput,
+        features: np.ndarray | None,
+        probability: float,
+        record: dict,
+    ) -> bool:
+        """Échantillonne un accident pour le candidat de sa version.
+
+        Ne bloque jamais : False si l'accident n'est pas tiré, s'il n'y a pas
+        de candidat pour la version ou si la file est pleine.
+        """
+        if not self._threads or version not in registry.shadows:
+            return False
+        if self._rng.random() >= self.sample_rate:
+            return False
+        job = ShadowJob(registry, version, row, features, probability, record)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._incr("dropped")
+            SHADOW_PREDICTIONS.labels(version, "dropped").inc()
+            return False
+        return True
+
+    # --- Observabilité ---
+
+    def stats(self) -> dict[str, Any]:
+        """Accord et dérive par version depuis le dernier rechargement."""
+        with self._stats_lock:
+            return {
+                "taux_echantillonnage": self.sample_rate,
+                "queue_depth": self._queue.qsize(),
+                **self._counts,
+                "versions": {
+                    version: agreement.summary()
+                    for version, agreement in self._agreement.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Remet les écarts à zéro (nouvelle génération de modèles)."""
+        with self._stats_lock:
+            self._agreement.clear()
+            self._counts = dict.fromkeys(self._counts, 0)
+
+    # --- Workers ---
+
+    def _run(self) -> None:
+        """Vide la file par lots ; chaque worker consomme une seule sentinelle."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stopping = [item], False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+            if stopping:
+                return
+
+    def _score(self, jobs: list[ShadowJob]) -> None:
+        """Un appel ``predict_proba`` par (génération, version) du lot."""
+        groups: dict[tuple[int, str], list[ShadowJob]] = {}
+        for job in jobs:
+            groups.setdefault((id(job.registry), job.version), []).append(job)
+        for group in groups.values():
+            reg, version = group[0].registry, group[0].version
+            try:
+                X = np.vstack([self._features(job) for job in group])
+                probas = reg.shadows[version].predict_proba(X)[:, 1].tolist()
+            except Exception:
+                logger.exception("Échec du scoring shadow %s", version)
+                self._incr("errors", len(group))
+                SHADOW_PREDICTIONS.labels(version, "error").inc(len(group))
+                continue
+            self._record(reg, version, group, probas)
+
+    @staticmethod
+    def _features(job: ShadowJob) -> np.ndarray:
+        if job.features is not None:
+            return job.features
+        # Accident servi par la table V1 : encodé ici, hors de la requête
+        return job.registry.encoders[job.version].encode_batch([job.row])
+
+    def _record(
+        self,
+        reg: ModelRegistry,
+        version: str,
+        group: list[ShadowJob],
+        probas: list[float],
+    ) -> None:
+        threshold = reg.threshold
+        records = []
+        with self._stats_lock:
+            agreement = self._agreement.setdefault(version, _Agreement())
+            for job, proba in zip(group, probas, strict=True):
+                agree = agreement.add(job.probability, proba, threshold)
+                SHADOW_PREDICTIONS.labels(
+                    version, "agree" if agree else "disagree"
+                ).inc()
+                SHADOW_ABS_DIFF.labels(version).observe(abs(proba - job.probability))
+                grave = proba >= threshold
+                records.append(
+                    {
+                        **job.record,
+                        "model_version": f"{version}@shadow",
+                        "probability": proba,
+                        "prediction": int(grave),
+                        "grave": grave,
+                    }
+                )
+        self.log(records)
+
+    def _incr(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._counts[key] += n
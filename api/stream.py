@@ -0,0 +1,355 @@
+"""Scoring en flux de gros volumes d'accidents (rejeux historiques).
+
+Un fichier CSV (en-tête = champs d'``AccidentInput``, ``types_vehicules``
+séparés par ``|``) ou NDJSON (un accident JSON par ligne) est lu par blocs
+d'octets et découpé en paquets de ``STREAM_CHUNK_ROWS`` lignes. Chaque
+paquet est validé, routé et encodé colonne par colonne (pandas/NumPy, sans
+objet Pydantic par ligne), scoré en un appel ``predict_proba`` par version,
+puis renvoyé en NDJSON. La mémoire dépend de la taille d'un paquet, pas de
+celle du fichier.
+
+Chaque ligne de sortie reprend le numéro de ligne (1 = premier accident) et
+la colonne ``id`` si elle existe ; une ligne invalide donne ``erreur`` au
+lieu d'une probabilité sans interrompre le flux. La dernière ligne est un
+résumé (lignes, erreurs, durée, débit).
+
+Endpoint : ``POST /predict/stream`` (Content-Type ``text/csv`` ou
+``application/x-ndjson``). En ligne de commande :
+    python -m api.stream accidents.csv [--output scores.ndjson]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pandas as pd
+
+from api.metrics import PREDICTIONS, stage
+from api.model import detect_versions
+from api.schemas import AccidentInput, literal_values
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from api.registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+READ_BLOCK = 1 << 20  # octets lus à la fois
+SPOOL_MAX_BYTES = 1 << 20  # corps reçu gardé en mémoire au-delà : disque
+
+FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson"}
+
+INT_FIELDS = ("heure", "mois", "jour_semaine", "vma", "nbv", "nb_vehicules")
+BOOL_FIELDS = (
+    "en_agglomeration",
+    "bidirectionnelle",
+    "meteo_degradee",
+    "surface_glissante",
+    "intersection",
+    "route_en_pente",
+)
+CHOICE_FIELDS = ("luminosite", "type_route", "type_collision")
+VEHICULES = frozenset(literal_values("types_vehicules"))
+
+# Booléens acceptés (JSON natif ou texte CSV)
+BOOL_VALUES: dict[Any, bool] = {
+    True: True,
+    False: False,
+    "true": True,
+    "false": False,
+    "True": True,
+    "False": False,
+    "1": True,
+    "0": False,
+}
+
+
+def _bounds(field: str) -> tuple[float, float]:
+    """Bornes ``ge``/``le`` d'un champ entier du schéma."""
+    lo, hi = -np.inf, np.inf
+    for constraint in AccidentInput.model_fields[field].metadata:
+        lo = getattr(constraint, "ge", lo)
+        hi = getattr(constraint, "le", hi)
+    return lo, hi
+
+
+def _vehicules(value: Any) -> list[str] | None:
+    if isinstance(value, str):
+        return [v for v in value.split("|") if v]
+    if isinstance(value, list):
+        return value
+    if isinstance(value, np.ndarray):  # colonne liste Arrow
+        vehicules: list[str] = value.tolist()
+        return vehicules
+    return None
+
+
+def _keep(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Tableau objet : ``values`` là où ``mask`` est vrai, None ailleurs."""
+    kept = np.full(len(values), None, dtype=object)
+    kept[mask] = values[mask]
+    return kept
+
+
+def normalize_frame(raw: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Valide un paquet d'accidents bruts, colonne par colonne.
+
+    Renvoie le DataFrame normalisé (une colonne par champ d'``AccidentInput``,
+    valeurs manquantes à None/NaN) et, par ligne, le premier message d'erreur
+    (None si la ligne est valide). Mêmes règles que ``AccidentInput``.
+    Les colonnes sont traitées en tableaux NumPy : le coût fixe par paquet
+    reste faible devant celui de pandas.
+    """
+    n = len(raw)
+    errors = np.full(n, None, dtype=object)
+    valid = np.ones(n, dtype=bool)
+
+    def fail(mask: np.ndarray, message: str) -> None:
+        hit = mask & valid
+        errors[hit] = message
+        valid[hit] = False
+
+    columns: dict[str, np.ndarray] = {}
+    for field, info in AccidentInput.model_fields.items():
+        column = raw[field].to_numpy() if field in raw else np.full(n, None, object)
+        if field == "types_vehicules":
+            column = np.fromiter(map(_vehicules, column), dtype=object, count=n)
+        missing = pd.isna(column)
+        if info.is_required():
+            fail(missing, f"{field} manquant")
+
+        if field in INT_FIELDS:
+            lo, hi = _bounds(field)
+            numbers = np.asarray(pd.to_numeric(column, errors="coerce"), np.float64)
+            with np.errstate(invalid="ignore"):
+                bad = ~missing & (
+                    np.isnan(numbers)
+                    | (numbers % 1 != 0)
+                    | (numbers < lo)
+                    | (numbers > hi)
+                )
+            columns[field] = np.where(bad, np.nan, numbers)
+        elif field in BOOL_FIELDS:
+            if column.dtype == bool:
+                values = column.astype(object)
+            else:
+                values = pd.Series(column).map(BOOL_VALUES).to_numpy()
+            bad = ~missing & pd.isna(values)
+            columns[field] = _keep(values, ~bad & ~missing)
+        elif field in CHOICE_FIELDS:
+            known = pd.Series(column).isin(literal_values(field)).to_numpy()
+            bad = ~missing & ~known
+            columns[field] = _keep(column, ~bad & ~missing)
+        elif field == "types_vehicules":
+            known = np.fromiter(
+                (VEHICULES.issuperset(v or ()) for v in column), dtype=bool, count=n
+            )
+            bad = ~missing & ~known
+            columns[field] = _keep(column, ~bad & ~missing)
+        else:  # departement : chaîne, comme ``AccidentInput`` (75 refusé)
+            text = np.fromiter((isinstance(v, str) for v in column), bool, count=n)
+            bad = ~missing & ~text
+            columns[field] = _keep(column, ~bad & ~missing)
+        fail(bad, f"{field} invalide")
+    df = pd.DataFrame(columns, index=raw.index)
+    return df, pd.Series(errors, index=raw.index, dtype=object)
+
+
+def predict_frame(
+    registry: ModelRegistry, df: pd.DataFrame, versions: np.ndarray, endpoint: str
+) -> np.ndarray:
+    """Probabilités de lignes normalisées et valides, dans leur ordre.
+
+    Un encodage colonne par colonne et un ``predict_proba`` par version ;
+    toutes les versions de ``versions`` doivent être chargées.
+    """
+    probas = np.empty(len(df))
+    for version in np.unique(versions):
+        rows = versions == version
+        try:
+            with stage("features", version).time():
+                X = registry.encoders[version].encode_frame(df[rows])
+            with stage("predict", version).time():
+                probas[rows] = registry.models[version].predict_proba(X)[:, 1]
+        except Exception:
+            PREDICTIONS.labels(endpoint, version, "error").inc(rows.sum())
+            raise
+        PREDICTIONS.labels(endpoint, version, "ok").inc(rows.sum())
+    return probas
+
+
+class ChunkParser:
+    """Découpe un flux d'octets CSV ou NDJSON en paquets de lignes (DataFrame).
+
+    ``feed`` reçoit les blocs dans l'ordre et renvoie les paquets complets ;
+    ``close`` renvoie le dernier paquet, incomplet.
+    """
+
+    def __init__(self, fmt: str, chunk_rows: int = CHUNK_ROWS) -> None:
+        if fmt not in FORMATS.values():
+            raise ValueError(f"Format inconnu : {fmt!r}")
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self._rest = b""
+        self._header: bytes | None = None
+        self._lines: list[bytes] = []
+
+    def feed(self, block: bytes) -> list[pd.DataFrame]:
+        *lines, self._rest = (self._rest + block).split(b"\n")
+        return self._add(lines, final=False)
+
+    def close(self) -> list[pd.DataFrame]:
+        lines, self._rest = [self._rest], b""
+        return self._add(lines, final=True)
+
+    def _add(self, lines: list[bytes], final: bool) -> list[pd.DataFrame]:
+        for line in lines:
+            if not line.strip():
+                continue
+            if self.fmt == "csv" and self._header is None:
+                self._header = line
+            else:
+                self._lines.append(line)
+        chunks = []
+        while len(self._lines) >= self.chunk_rows or (final and self._lines):
+            batch = self._lines[: self.chunk_rows]
+            del self._lines[: self.chunk_rows]
+            chunks.append(self._parse(batch))
+        return chunks
+
+    def _parse(self, lines: list[bytes]) -> pd.DataFrame:
+        if self.fmt == "csv":
+            text = b"\n".join([self._header or b"", *lines])
+            return pd.read_csv(io.BytesIO(text), dtype=str)
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            records.append(record if isinstance(record, dict) else {"_json": False})
+        return pd.DataFrame.from_records(records)
+
+
+class StreamScorer:
+    """Score les paquets d'un flux avec une génération de modèles figée."""
+
+    def __init__(self, registry: ModelRegistry) -> None:
+        self.registry = registry
+        self.rows = 0
+        self.errors = 0
+        self.versions: Counter[str] = Counter()
+        self._start = time.perf_counter()
+
+    def score(self, chunk: pd.DataFrame) -> str:
+        """Résultats NDJSON d'un paquet, dans l'ordre des lignes."""
+        reg = self.registry
+        df, errors = normalize_frame(chunk)
+        if "_json" in chunk:
+            errors[chunk["_json"].eq(False)] = "JSON invalide"
+        valid = errors.isna().to_numpy()
+        versions = detect_versions(df)
+        for version in np.unique(versions[valid]):
+            if version not in reg.models:
+                mask = valid & (versions == version)
+                errors[mask] = f"Modèle {version} non disponible"
+                PREDICTIONS.labels("stream", version, "unavailable").inc(mask.sum())
+                valid &= ~mask
+        probas = np.full(len(df), np.nan)
+        probas[valid] = predict_frame(reg, df[valid], versions[valid], "stream")
+        self.versions.update(versions[valid].tolist())
+
+        ids = [None] * len(chunk)
+        if "id" in chunk:  # id absent d'une ligne CSV/NDJSON : NaN → None (JSON valide)
+            ids = [
+                None if pd.api.types.is_scalar(v) and pd.isna(v) else v
+                for v in chunk["id"].tolist()
+            ]
+        lines = []
+        threshold = reg.threshold
+        for i, (row_id, version, proba, error) in enumerate(
+            zip(ids, versions.tolist(), probas.tolist(), errors.tolist(), strict=True)
+        ):
+            result: dict[str, Any] = {"ligne": self.rows + i + 1}
+            if row_id is not None:
+                result["id"] = row_id
+            if error is None:
+                result["version_modele"] = version
+                result["probabilite"] = round(proba, 4)
+                result["grave"] = proba >= threshold
+            else:
+                result["erreur"] = error
+            lines.append(json.dumps(result, ensure_ascii=False))
+        self.rows += len(chunk)
+        self.errors += int(errors.notna().sum())
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def summary(self) -> str:
+        """Dernière ligne du flux : volumes, durée et débit."""
+        elapsed = time.perf_counter() - self._start
+        resume = {
+            "lignes": self.rows,
+            "erreurs": self.errors,
+            "versions": dict(sorted(self.versions.items())),
+            "generation_modele": self.registry.generation,
+            "secondes": round(elapsed, 3),
+            "lignes_par_seconde": round(self.rows / elapsed, 1) if elapsed else 0.0,
+        }
+        return json.dumps({"resume": resume}, ensure_ascii=False) + "\n"
+
+
+def score_blocks(
+    registry: ModelRegistry,
+    blocks: Iterable[bytes],
+    fmt: str,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[str]:
+    """Version synchrone du flux (CLI) : résultats NDJSON puis résumé."""
+    parser = ChunkParser(fmt, chunk_rows)
+    scorer = StreamScorer(registry)
+    for block in blocks:
+        for chunk in parser.feed(block):
+            yield scorer.score(chunk)
+    for chunk in parser.close():
+        yield scorer.score(chunk)
+    yield scorer.summary()
+
+
+def main() -> None:
+    from api.registry import load_registry
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="Fichier .csv ou .ndjson/.jsonl")
+    parser.add_argument(
+        "--output", type=Path, help="Résultats NDJSON (défaut : stdout)"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    fmt = "csv" if args.input.suffix == ".csv" else "ndjson"
+    registry = load_registry(lazy=False)
+    out = args.output.open("w") if args.output else sys.stdout
+    try:
+        with args.input.open("rb") as f:
+            blocks = iter(lambda: f.read(READ_BLOCK), b"")
+            for text in score_blocks(registry, blocks, fmt):
+                out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
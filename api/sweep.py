@@ -0,0 +1,98 @@
+"""Balayage contrefactuel : un accident scoré sur une grille de valeurs.
+
+Pour répondre à « et si cet accident avait eu lieu de nuit, ou sur
+autoroute ? », on fait varier un ou deux champs d'``AccidentInput`` sur
+leur domaine (ou sur des valeurs choisies) en gardant les autres fixes.
+Chaque valeur d'axe est validée une seule fois (départements : ceux du
+mapping des modèles ; ni doublon, ni booléen pour un champ entier) ; les
+accidents de la grille sont ensuite des copies sans revalidation, scorés en
+un seul appel ``predict_proba``.
+
+Tous les points de la grille renseignent les mêmes champs : ils relèvent
+donc de la même version de modèle (qui peut être supérieure à celle de
+l'accident d'origine si l'axe porte sur un champ V2-V4).
+"""
+
+from __future__ import annotations
+
+from itertools import product
+from typing import Any
+
+from pydantic import ValidationError
+
+from api.schemas import AccidentInput, SweepAxis, literal_values
+
+BOOLEANS = (False, True)
+
+# Domaine parcouru quand l'axe ne précise pas ses valeurs (départements :
+# ceux du mapping des modèles)
+DOMAINS: dict[str, tuple] = {
+    "heure": tuple(range(24)),
+    "mois": tuple(range(1, 13)),
+    "jour_semaine": tuple(range(7)),
+    "luminosite": literal_values("luminosite"),
+    "vma": (30, 50, 70, 80, 90, 110, 130),
+    "nbv": (1, 2, 3, 4),
+    "type_route": literal_values("type_route"),
+    "en_agglomeration": BOOLEANS,
+    "bidirectionnelle": BOOLEANS,
+    "meteo_degradee": BOOLEANS,
+    "surface_glissante": BOOLEANS,
+    "intersection": BOOLEANS,
+    "route_en_pente": BOOLEANS,
+    "nb_vehicules": (1, 2, 3, 4),
+    "type_collision": literal_values("type_collision"),
+}
+
+# Champs entiers : ``True``/``False`` y sont refusés (pas de conversion en 1/0)
+INT_FIELDS = frozenset(
+    champ for champ, domain in DOMAINS.items() if type(domain[0]) is int
+)
+
+
+def axis_values(axis: SweepAxis, dep_mapping: dict) -> list[Any]:
+    """Valeurs parcourues par un axe : celles demandées, sinon le domaine."""
+    if axis.valeurs is not None:
+        return list(axis.valeurs)
+    if axis.champ == "departement":
+        return sorted(dep_mapping)
+    return list(DOMAINS[axis.champ])
+
+
+def expand_grid(
+    base: AccidentInput, axes: list[SweepAxis], dep_mapping: dict
+) -> tuple[list[list[Any]], list[AccidentInput]]:
+    """Valeurs de chaque axe et accidents de la grille (ordre ligne par ligne).
+
+    Raises:
+        ValueError: une valeur d'axe est invalide pour son champ, un
+            département est absent du mapping des modèles, ou une valeur est
+            répétée sur un axe.
+    """
+    data = base.model_dump()
+    values = []
+    for axis in axes:
+        validated = []
+        for value in axis_values(axis, dep_mapping):
+            error = ValueError(f"Valeur invalide pour {axis.champ} : {value!r}")
+            if axis.champ in INT_FIELDS and isinstance(value, bool):
+                raise error
+            try:
+                row = AccidentInput.model_validate({**data, axis.champ: value})
+            except ValidationError as e:
+                raise error from e
+            validated.append(getattr(row, axis.champ))
+        if axis.champ == "departement":
+            unknown = [dep for dep in validated if dep not in dep_mapping]
+            if unknown:
+                raise ValueError(f"Département(s) inconnu(s) : {unknown}")
+        if len(set(validated)) != len(validated):
+            raise ValueError(f"Valeurs en double pour {axis.champ}")
+        values.append(validated)
+
+    fields = [axis.champ for axis in axes]
+    rows = [
+        base.model_copy(update=dict(zip(fields, combo, strict=True)))
+        for combo in product(*values)
+    ]
+    return values, rows
@@ -0,0 +1,108 @@
+"""Benchmark : /predict/batch en JSON vs Arrow IPC.
+
+Envoie le même lot d'accidents aléatoires (versions mélangées) en JSON puis
+en Arrow IPC, réponse dans le même format, via le client de test FastAPI
+(sans réseau). Les prédictions passent par le vrai ``PredictionLogger``,
+écrites dans une base SQLite temporaire. Le cache des prédictions est
+désactivé pour que chaque répétition score tout le lot. Affiche le
+meilleur temps de requête (décodage de la réponse compris), le débit,
+puis le temps d'écriture en base restant après la dernière requête.
+
+Lancement :
+    python -m benchmarks.bench_arrow [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+import pyarrow as pa
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import api.main
+from api import database
+from api.arrow_ipc import ACCIDENT_SCHEMA, ARROW_MEDIA_TYPE
+from api.cache import PredictionCache
+from api.model import VERSIONS
+from api.prediction_log import PredictionLogger
+from api.registry import load_registry
+from benchmarks.payloads import random_payload
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+
+
+def arrow_body(payloads: list[dict]) -> bytes:
+    table = pa.Table.from_pylist(payloads, schema=ACCIDENT_SCHEMA)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body: bytes = sink.getvalue().to_pybytes()
+    return body
+
+
+def best_seconds(client: TestClient, body: bytes, media_type: str) -> float:
+    """Meilleur temps d'une requête (réponse décodée) sur ``REPEAT`` essais."""
+    headers = {"Content-Type": media_type, "Accept": media_type}
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        response = client.post("/predict/batch", content=body, headers=headers)
+        response.raise_for_status()
+        if media_type == ARROW_MEDIA_TYPE:
+            pa.ipc.open_stream(response.content).read_all()
+        else:
+            response.json()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    api.main.registry = load_registry(lazy=False)
+    api.main.prediction_cache = PredictionCache(max_size=0)
+    api.main.BATCH_MAX_SIZE = api.main.ARROW_BATCH_MAX_SIZE = max(args.sizes)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench_arrow.db")
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        prediction_logger = PredictionLogger()
+        api.main.prediction_logger = prediction_logger
+        prediction_logger.start()
+        run(TestClient(api.main.app), args.sizes)
+        start = time.perf_counter()
+        prediction_logger.stop(timeout=600)
+        print(
+            f"\nÉcriture en base restante : {time.perf_counter() - start:.2f} s "
+            f"({prediction_logger.stats()['written']:,} prédictions au total)"
+        )
+        engine.dispose()
+
+
+def run(client: TestClient, sizes: list[int]) -> None:
+    rng = random.Random(0)
+
+    header = (
+        f"{'lignes':>8}{'JSON (s)':>11}{'Arrow (s)':>11}"
+        f"{'JSON l/s':>12}{'Arrow l/s':>12}{'gain':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for size in sizes:
+        payloads = [random_payload(rng, rng.choice(VERSIONS)) for _ in range(size)]
+        json_s = best_seconds(client, json.dumps(payloads).encode(), "application/json")
+        arrow_s = best_seconds(client, arrow_body(payloads), ARROW_MEDIA_TYPE)
+        print(
+            f"{size:>8}{json_s:>11.3f}{arrow_s:>11.3f}"
+            f"{size / json_s:>12,.0f}{size / arrow_s:>12,.0f}{json_s / arrow_s:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
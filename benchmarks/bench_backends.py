@@ -0,0 +1,78 @@
+"""Benchmark : backends d'inférence CatBoost et ONNX Runtime.
+
+Mesure, pour chaque version, la latence de ``predict_proba`` sur une ligne
+puis sur des lots, avec le nombre de threads choisi pour chaque backend.
+Les modèles ONNX doivent avoir été exportés (``python -m api.onnx_backend``).
+
+Lancement :
+    python -m benchmarks.bench_backends [--catboost-threads 1] [--onnx-threads 1]
+"""
+
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from api.model import (
+    VERSIONS,
+    CatBoostModel,
+    InferenceBackend,
+    compile_encoders,
+    load_all_models,
+    model_path,
+)
+from api.onnx_backend import OnnxModel
+from api.schemas import AccidentInput
+from benchmarks.payloads import random_payload
+
+BATCH_SIZES = (1, 100, 1000)
+
+
+def per_call_us(model: InferenceBackend, X: np.ndarray) -> float:
+    """Meilleur temps moyen par appel (µs) sur 5 répétitions."""
+    number = max(1, 2000 // len(X))
+    times = timeit.repeat(lambda: model.predict_proba(X), number=number, repeat=5)
+    return min(times) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catboost-threads", type=int, default=1)
+    parser.add_argument("--onnx-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    models, metadata, dep_mapping = load_all_models(backend="catboost")
+    encoders = compile_encoders(metadata, dep_mapping)
+    rng = random.Random(0)
+
+    print(
+        f"threads : CatBoost {args.catboost_threads}, ONNX Runtime {args.onnx_threads}"
+    )
+    header = f"{'version':<14}{'lignes':>7}{'CatBoost':>13}{'ONNX':>13}{'gain':>8}"
+    print(header)
+    print("-" * len(header))
+    for version in VERSIONS:
+        path = model_path(version, backend="onnx")
+        if path is None or path.suffix != ".onnx":
+            print(f"{version:<14}  export ONNX absent")
+            continue
+        backends: tuple[InferenceBackend, InferenceBackend] = (
+            CatBoostModel(models[version].model, threads=args.catboost_threads),
+            OnnxModel(path, threads=args.onnx_threads),
+        )
+        encoder = encoders[version]
+        rows = [
+            AccidentInput(**random_payload(rng, version))
+            for _ in range(BATCH_SIZES[-1])
+        ]
+        for size in BATCH_SIZES:
+            X = encoder.encode_batch(rows[:size])
+            ref, new = (per_call_us(b, X) for b in backends)
+            print(
+                f"{version:<14}{size:>7}{ref:>11.1f}µs{new:>11.1f}µs{ref / new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark : build_features (DataFrame) vs encodeur compilé (NumPy).
+
+Mesure, pour chaque version, le coût par appel de la construction des
+features seule, puis de la construction + ``predict_proba``.
+
+Lancement :
+    python -m benchmarks.bench_encoder
+"""
+
+import timeit
+from collections.abc import Callable
+
+from api.model import (
+    VERSIONS,
+    FeatureEncoder,
+    build_features,
+    compile_encoders,
+    load_all_models,
+)
+from api.schemas import AccidentInput
+from benchmarks.payloads import SAMPLES
+
+N_CALLS = 2000
+
+
+def per_call_us(fn: Callable[[], object], number: int = N_CALLS) -> float:
+    """Meilleur temps moyen par appel (µs) sur 5 répétitions."""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    models, metadata, dep_mapping = load_all_models()
+    encoders = compile_encoders(metadata, dep_mapping)
+
+    header = f"{'version':<14}{'étape':<22}{'DataFrame':>12}{'encodeur':>12}{'gain':>8}"
+    print(header)
+    print("-" * len(header))
+    for version in VERSIONS:
+        data = AccidentInput(**SAMPLES[version])
+        model, encoder = models[version], encoders[version]
+
+        def with_df(v: str = version, d: AccidentInput = data) -> object:
+            return build_features(d, v, metadata, dep_mapping)
+
+        def with_encoder(
+            e: FeatureEncoder = encoder, d: AccidentInput = data
+        ) -> object:
+            return e.encode(d)
+
+        rows = [
+            ("features", per_call_us(with_df), per_call_us(with_encoder)),
+            (
+                "features + predict",
+                per_call_us(lambda m=model: m.predict_proba(with_df()), N_CALLS // 4),
+                per_call_us(
+                    lambda m=model: m.predict_proba(with_encoder()), N_CALLS // 4
+                ),
+            ),
+        ]
+        for step, ref, new in rows:
+            print(
+                f"{version:<14}{step:<22}{ref:>10.1f}µs{new:>10.1f}µs{ref / new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
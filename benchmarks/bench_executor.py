@@ -0,0 +1,125 @@
+"""Benchmark : réglages de l'exécuteur d'inférence par nombre de cœurs.
+
+Pour chaque nombre de cœurs (affinité du serveur restreinte à N cœurs),
+lance l'API sous uvicorn avec chaque combinaison de processus uvicorn
+(``--workers``), de threads d'inférence (``INFERENCE_WORKERS``) et de
+threads CatBoost (``CATBOOST_THREADS``), puis envoie des accidents V2-V4
+(inférence réelle, cache désactivé) à ``/predict``. Affiche débit et
+latences de chaque réglage, le meilleur débit par nombre de cœurs, et
+écrit le rapport JSON complet.
+
+Les nombres de cœurs supérieurs à ceux de la machine sont ignorés : les
+mesures ne valent que pour la machine où elles ont été faites.
+
+Lancement :
+    python -m benchmarks.bench_executor [--cores 2 4 8] [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+
+from benchmarks.loadtest import make_payloads, run_scenario, serve
+
+CORES = (2, 4, 8)
+CONCURRENCY = 32
+MIX = {"v2_route": 0.4, "v3_vehicules": 0.3, "v4_collision": 0.3}
+
+
+def settings(cores: int) -> list[dict[str, int]]:
+    """Réglages essayés pour ``cores`` cœurs (doublons retirés)."""
+    grid = itertools.product(
+        dict.fromkeys((1, cores)),  # processus uvicorn
+        dict.fromkeys((1, cores, 2 * cores)),  # threads d'inférence par processus
+        (1, -1),  # threads CatBoost par appel (-1 = tous les cœurs)
+    )
+    return [
+        {"processes": p, "inference_workers": w, "catboost_threads": t}
+        for p, w, t in grid
+    ]
+
+
+def run_setting(cores: int, setting: dict[str, int], payloads: list[dict]) -> dict:
+    env = {
+        "INFERENCE_WORKERS": str(setting["inference_workers"]),
+        "CATBOOST_THREADS": str(setting["catboost_threads"]),
+        "PREDICTION_CACHE_SIZE": "0",
+    }
+    with serve(setting["processes"], env, cpus=cores) as url:
+        run_scenario(url, "/predict", payloads[:200], CONCURRENCY)  # échauffement
+        return {**setting, **run_scenario(url, "/predict", payloads, CONCURRENCY)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cores", type=int, nargs="+", default=CORES)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--output", type=Path, help="Rapport JSON (défaut : stdout)")
+    args = parser.parse_args()
+
+    available = len(os.sched_getaffinity(0))
+    payloads = make_payloads(args.requests, MIX)
+    results: dict[str, list[dict]] = {}
+    header = (
+        f"{'cœurs':>5}{'proc.':>6}{'inf.':>6}{'cb':>4}"
+        f"{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    print(header, file=sys.stderr)
+    for cores in args.cores:
+        if cores > available:
+            print(
+                f"{cores:>5}  ignoré ({available} cœur(s) disponibles)", file=sys.stderr
+            )
+            continue
+        results[str(cores)] = []
+        for setting in settings(cores):
+            r = run_setting(cores, setting, payloads)
+            results[str(cores)].append(r)
+            print(
+                f"{cores:>5}{r['processes']:>6}{r['inference_workers']:>6}"
+                f"{r['catboost_threads']:>4}{r['rps']:>9.0f}"
+                f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}",
+                file=sys.stderr,
+            )
+
+    best = {
+        cores: max((r for r in runs if not r["errors"]), key=lambda r: r["rps"])
+        for cores, runs in results.items()
+    }
+    for cores, r in best.items():
+        print(
+            f"Meilleur réglage sur {cores} cœur(s) : --workers {r['processes']} "
+            f"INFERENCE_WORKERS={r['inference_workers']} "
+            f"CATBOOST_THREADS={r['catboost_threads']} ({r['rps']:.0f} req/s)",
+            file=sys.stderr,
+        )
+
+    report = {
+        "meta": {
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": available,
+            "requests": args.requests,
+            "concurrency": CONCURRENCY,
+            "mix": MIX,
+        },
+        "results": results,
+        "best": best,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text, end="")
+
+
+if __name__ == "__main__":
+    main()
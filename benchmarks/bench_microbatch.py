@@ -0,0 +1,83 @@
+"""Benchmark de charge : inférence unitaire avec et sans micro-batcher.
+
+N threads soumettent chacun des inférences V4 unitaires (lignes toutes
+différentes) ; on compare latences p50/p99 et débit entre l'appel direct
+à ``predict_proba`` et le passage par ``MicroBatcher``.
+
+Lancement :
+    python -m benchmarks.bench_microbatch [--requests 2000] [--wait-ms 2]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api.batching import MicroBatcher
+from api.model import compile_encoders, load_all_models
+from api.schemas import AccidentInput
+from benchmarks.payloads import random_payload
+
+VERSION = "v4_collision"
+CONCURRENCY = (1, 4, 16, 64)
+
+
+def run(score, rows: list[np.ndarray], concurrency: int) -> dict[str, float]:
+    """Soumet toutes les lignes avec ``concurrency`` threads."""
+
+    def timed(row: np.ndarray) -> float:
+        start = time.perf_counter()
+        score(row)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(timed, rows))
+    elapsed = time.perf_counter() - start
+    q = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": q[49] * 1e3, "p99_ms": q[98] * 1e3, "rps": len(rows) / elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    models, metadata, dep_mapping = load_all_models()
+    model = models[VERSION]
+    encoder = compile_encoders(metadata, dep_mapping)[VERSION]
+    rng = random.Random(0)
+    rows = [
+        encoder.encode(AccidentInput(**random_payload(rng, VERSION)))
+        for _ in range(args.requests)
+    ]
+
+    batcher = MicroBatcher(
+        lambda v, X: model.predict_proba(X)[:, 1],
+        max_wait_ms=args.wait_ms,
+        max_batch=args.max_batch,
+    )
+    batcher.start()
+    modes = {
+        "direct": lambda row: model.predict_proba(row),
+        "micro-batch": lambda row: batcher.predict(VERSION, row),
+    }
+
+    print(f"{'threads':>7} {'mode':<12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'req/s':>10}")
+    for concurrency in CONCURRENCY:
+        for mode, score in modes.items():
+            r = run(score, rows, concurrency)
+            print(
+                f"{concurrency:>7} {mode:<12}"
+                f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['rps']:>10.0f}"
+            )
+    batcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Test de charge de l'API avec les vrais modèles.
+
+Démarre ``api.main:app`` sous uvicorn (modèles de ``models/``, base SQLite
+temporaire), envoie un mélange d'accidents V1-V4 à ``/predict`` et à
+``/predict/batch`` pour plusieurs niveaux de concurrence, puis écrit un
+rapport JSON : débit, latences p50/p95/p99 côté client et durée moyenne
+de chaque étape côté serveur (différence des histogrammes de ``/metrics``
+avant/après chaque scénario).
+
+Comparaison à une référence : le lancement échoue (code 1) si le p99 ou le
+débit d'un scénario se dégradent au-delà de la tolérance. Une référence
+n'a de sens que sur la machine où elle a été mesurée.
+
+Lancement :
+    python -m benchmarks.loadtest [--requests 2000] [--concurrency 1 8 32]
+    python -m benchmarks.loadtest --baseline benchmarks/baselines/loadtest.json
+    python -m benchmarks.loadtest --save-baseline benchmarks/baselines/loadtest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.payloads import random_payload
+
+# Répartition par défaut des versions (saisies partielles majoritaires)
+DEFAULT_MIX = {
+    "v1_base": 0.4,
+    "v2_route": 0.3,
+    "v3_vehicules": 0.2,
+    "v4_collision": 0.1,
+}
+DEFAULT_CONCURRENCY = (1, 8, 32)
+STARTUP_TIMEOUT = 60.0
+
+# Indicateurs comparés à la référence : (clé, sens de la dégradation,
+# multiplicateur de la tolérance — la queue de distribution est plus bruitée)
+CHECKS = (("rps", "lower", 1.0), ("p95_ms", "higher", 1.0), ("p99_ms", "higher", 2.0))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+@contextmanager
+def serve(workers: int, env: dict[str, str], cpus: int | None = None) -> Iterator[str]:
+    """Lance l'API dans un sous-processus et attend qu'elle soit prête.
+
+    ``cpus`` restreint le processus (et ses workers) aux ``cpus`` premiers
+    cœurs (affinité Linux).
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_dir = Path(tmp) / "metrics"
+        metrics_dir.mkdir()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/loadtest.db",
+            "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir),
+            "PREDICTION_LOG_SPILL_PATH": f"{tmp}/spill.jsonl",
+            **env,
+        }
+        cmd = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ]
+        affinity = None
+        if cpus is not None:
+            cores = sorted(os.sched_getaffinity(0))[:cpus]
+
+            def affinity() -> None:
+                os.sched_setaffinity(0, cores)
+
+        proc = subprocess.Popen(cmd, env=env, preexec_fn=affinity)  # noqa: S603
+        url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_ready(url, proc)
+            yield url
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def _wait_ready(url: str, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn s'est arrêté (code {proc.returncode})")
+        try:
+            if httpx.get(f"{url}/health").json().get("ready"):
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"API non prête après {STARTUP_TIMEOUT:.0f} s")
+
+
+def make_payloads(n: int, mix: dict[str, float], seed: int = 0) -> list[dict]:
+    """Accidents aléatoires reproductibles, versions tirées selon ``mix``."""
+    rng = random.Random(seed)
+    versions = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    return [random_payload(rng, v) for v in versions]
+
+
+def scrape_stages(url: str) -> dict[tuple[str, str], tuple[float, float]]:
+    """(étape, version) → (nombre, somme en secondes) depuis /metrics."""
+    stages: dict[tuple[str, str], tuple[float, float]] = {}
+    text = httpx.get(f"{url}/metrics").text
+    for family in text_string_to_metric_families(text):
+        if family.name != "uc1_stage_duration_seconds":
+            continue
+        for sample in family.samples:
+            key = (sample.labels["stage"], sample.labels["version"])
+            count, total = stages.get(key, (0.0, 0.0))
+            if sample.name.endswith("_count"):
+                count = sample.value
+            elif sample.name.endswith("_sum"):
+                total = sample.value
+            stages[key] = (count, total)
+    return stages
+
+
+def stage_breakdown(
+    before: dict[tuple[str, str], tuple[float, float]],
+    after: dict[tuple[str, str], tuple[float, float]],
+) -> dict[str, dict[str, float]]:
+    """Durée moyenne (µs) et nombre d'observations par étape sur l'intervalle."""
+    breakdown: dict[str, dict[str, float]] = {}
+    for key, (count, total) in sorted(after.items()):
+        count0, total0 = before.get(key, (0.0, 0.0))
+        if count > count0:
+            breakdown["/".join(key)] = {
+                "count": count - count0,
+                "mean_us": round((total - total0) / (count - count0) * 1e6, 1),
+            }
+    return breakdown
+
+
+def run_scenario(
+    url: str, path: str, bodies: list, concurrency: int
+) -> dict[str, float | int]:
+    """Envoie ``bodies`` sur ``path`` avec ``concurrency`` clients en parallèle."""
+    local = threading.local()
+    errors = 0
+    lock = threading.Lock()
+
+    def send(body: dict | list) -> float:
+        nonlocal errors
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(base_url=url, timeout=30)
+        start = time.perf_counter()
+        response = local.client.post(path, json=body)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            with lock:
+                errors += 1
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(send, bodies))
+    elapsed = time.perf_counter() - start
+    q = statistics.quantiles(latencies, n=100)
+    n_rows = sum(len(b) if isinstance(b, list) else 1 for b in bodies)
+    return {
+        "requests": len(bodies),
+        "errors": errors,
+        "rps": round(len(bodies) / elapsed, 1),
+        "rows_per_s": round(n_rows / elapsed, 1),
+        "p50_ms": round(q[49] * 1e3, 3),
+        "p95_ms": round(q[94] * 1e3, 3),
+        "p99_ms": round(q[98] * 1e3, 3),
+    }
+
+
+def run_all(args: argparse.Namespace) -> dict:
+    """Tous les scénarios : /predict puis /predict/batch, par concurrence.
+
+    Chaque scénario reçoit ses propres accidents (graine distincte) : les
+    résultats ne dépendent pas du cache rempli par les scénarios précédents.
+    """
+    scenarios: dict[str, dict] = {}
+    with serve(args.workers, args.env) as url:
+        # Échauffement : connexions, caches CPU, premiers INSERT
+        warmup = make_payloads(args.warmup, args.mix, seed=args.seed - 1)
+        run_scenario(url, "/predict", warmup, args.concurrency[-1])
+        for i, concurrency in enumerate(args.concurrency):
+            seed = args.seed + 1000 * i
+            payloads = make_payloads(args.requests, args.mix, seed)
+            rows = make_payloads(args.batches * args.batch_size, args.mix, seed + 1)
+            batches = [
+                rows[j : j + args.batch_size]
+                for j in range(0, len(rows), args.batch_size)
+            ]
+            for name, path, bodies in (
+                ("predict", "/predict", payloads),
+                ("batch", "/predict/batch", batches),
+            ):
+                before = scrape_stages(url)
+                result = run_scenario(url, path, bodies, concurrency)
+                result["stages"] = stage_breakdown(before, scrape_stages(url))
+                scenarios[f"{name}_c{concurrency}"] = result
+                print(
+                    f"{name:<8}c={concurrency:<3} {result['rps']:>9.0f} req/s  "
+                    f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms",
+                    file=sys.stderr,
+                )
+    return {
+        "meta": {
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "requests": args.requests,
+            "batches": args.batches,
+            "batch_size": args.batch_size,
+            "mix": args.mix,
+            "env": args.env,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Régressions du rapport par rapport à la référence (liste vide si aucune).
+
+    Un indicateur régresse s'il est pire que la référence de plus de
+    ``tolerance`` (fraction, doublée pour le p99) ; les scénarios absents
+    d'un côté sont ignorés.
+    Toute requête en erreur est une régression.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        if result.get("errors"):
+            regressions.append(f"{name}: {result['errors']} requête(s) en erreur")
+        ref = baseline.get("scenarios", {}).get(name)
+        if ref is None:
+            continue
+        for key, worse, factor in CHECKS:
+            value, expected = result[key], ref[key]
+            margin = tolerance * factor
+            if worse == "higher" and value > expected * (1 + margin):
+                regressions.append(f"{name}: {key} {value} > {expected} (référence)")
+            if worse == "lower" and value < expected * (1 - margin):
+                regressions.append(f"{name}: {key} {value} < {expected} (référence)")
+    return regressions
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """``"v1_base=0.5,v4_collision=0.5"`` → ``{"v1_base": 0.5, ...}``."""
+    mix = {}
+    for item in text.split(","):
+        version, _, weight = item.partition("=")
+        mix[version.strip()] = float(weight)
+    return mix
+
+
+def parse_env(items: list[str]) -> dict[str, str]:
+    return dict(item.split("=", 1) for item in items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY)
+    )
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Répartition des versions, ex. v1_base=0.5,v4_collision=0.5",
+    )
+    parser.add_argument(
+        "--env",
+        nargs="*",
+        default=[],
+        help="Variables passées à l'API, ex. MICROBATCH_ENABLED=1",
+    )
+    parser.add_argument("--output", type=Path, help="Rapport JSON (défaut : stdout)")
+    parser.add_argument("--baseline", type=Path, help="Référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--save-baseline", type=Path, help="Enregistre le rapport comme référence"
+    )
+    args = parser.parse_args()
+    args.env = parse_env(args.env)
+
+    report = run_all(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text, end="")
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(text)
+
+    if args.baseline:
+        regressions = compare(
+            report, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for line in regressions:
+            print(f"RÉGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Microbenchmarks du chemin Python d'une prédiction, par version.
+
+Fonctions mesurées (sans modèle CatBoost) :
+
+  validate         → ``AccidentInput.model_validate`` (dict JSON décodé)
+  detect_version   → ``detect_version``
+  build_features   → ``build_features`` (DataFrame, chemin de référence)
+  encode           → ``FeatureEncoder.encode`` (chemin servi par l'API)
+
+Pour chacune : temps par appel en nanosecondes (meilleure de plusieurs
+répétitions) et mémoire allouée par appel (pic ``tracemalloc``, mesuré à
+part car le traçage ralentit l'exécution).
+
+Comparaison à une référence versionnée : le lancement échoue (code 1) si
+une fonction est plus lente ou alloue plus que la référence au-delà de la
+tolérance.
+
+Lancement :
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --baseline benchmarks/baselines/microbench.json
+    python -m benchmarks.microbench --save-baseline benchmarks/baselines/microbench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+
+from api.model import (
+    VERSIONS,
+    build_features,
+    compile_encoders,
+    detect_version,
+    load_all_models,
+)
+from api.schemas import AccidentInput
+from benchmarks.payloads import SAMPLES
+
+REPEAT = 7
+TARGET_SECONDS = 0.05  # durée visée d'une répétition
+ALLOC_CALLS = 20
+
+
+def ns_per_call(fn: Callable[[], object]) -> float:
+    """Meilleur temps par appel (ns) sur ``REPEAT`` répétitions."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number * 1e9
+
+
+def alloc_bytes_per_call(fn: Callable[[], object]) -> int:
+    """Pic de mémoire allouée pendant un appel (octets, minimum sur N appels)."""
+    fn()  # caches et imports paresseux hors mesure
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(ALLOC_CALLS):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return min(peaks)
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    """Fonctions à mesurer, nommées ``<version>/<fonction>``."""
+    _, metadata, dep_mapping = load_all_models(lazy=True)
+    encoders = compile_encoders(metadata, dep_mapping)
+    result: dict[str, Callable[[], object]] = {}
+    for version in VERSIONS:
+        payload = SAMPLES[version]
+        data = AccidentInput(**payload)
+        encoder = encoders[version]
+        result[f"{version}/validate"] = partial(AccidentInput.model_validate, payload)
+        result[f"{version}/detect_version"] = partial(detect_version, data)
+        result[f"{version}/build_features"] = partial(
+            build_features, data, version, metadata, dep_mapping
+        )
+        result[f"{version}/encode"] = partial(encoder.encode, data)
+    return result
+
+
+def run(only: str | None = None) -> dict:
+    results = {}
+    for name, fn in cases().items():
+        if only and only not in name:
+            continue
+        results[name] = {
+            "ns_per_call": round(ns_per_call(fn)),
+            "alloc_bytes": alloc_bytes_per_call(fn),
+        }
+    return {
+        "meta": {
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Ligne de comparaison par fonction présente dans les deux rapports."""
+    rows = []
+    for name, result in report["results"].items():
+        ref = baseline.get("results", {}).get(name)
+        if ref is None:
+            continue
+        time_ratio = result["ns_per_call"] / ref["ns_per_call"]
+        alloc_ratio = result["alloc_bytes"] / max(ref["alloc_bytes"], 1)
+        rows.append(
+            {
+                "name": name,
+                "ns_per_call": result["ns_per_call"],
+                "baseline_ns": ref["ns_per_call"],
+                "time_ratio": round(time_ratio, 3),
+                "alloc_bytes": result["alloc_bytes"],
+                "baseline_alloc": ref["alloc_bytes"],
+                "alloc_ratio": round(alloc_ratio, 3),
+                "regression": time_ratio > 1 + tolerance or alloc_ratio > 1 + tolerance,
+            }
+        )
+    return rows
+
+
+def print_table(report: dict, comparison: list[dict] | None) -> None:
+    if comparison is None:
+        print(f"{'fonction':<32}{'ns/appel':>12}{'octets':>10}", file=sys.stderr)
+        for name, r in report["results"].items():
+            print(
+                f"{name:<32}{r['ns_per_call']:>12,}{r['alloc_bytes']:>10,}",
+                file=sys.stderr,
+            )
+        return
+    print(
+        f"{'fonction':<32}{'ns/appel':>12}{'réf.':>12}{'Δ':>8}"
+        f"{'octets':>10}{'réf.':>10}{'Δ':>8}",
+        file=sys.stderr,
+    )
+    for row in comparison:
+        flag = "  RÉGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:<32}{row['ns_per_call']:>12,}{row['baseline_ns']:>12,}"
+            f"{row['time_ratio'] - 1:>+8.0%}{row['alloc_bytes']:>10,}"
+            f"{row['baseline_alloc']:>10,}{row['alloc_ratio'] - 1:>+8.0%}{flag}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help="Ne mesure que les noms contenant ce texte")
+    parser.add_argument("--output", type=Path, help="Rapport JSON (défaut : stdout)")
+    parser.add_argument("--baseline", type=Path, help="Référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--save-baseline", type=Path, help="Enregistre le rapport comme référence"
+    )
+    args = parser.parse_args()
+
+    report = run(args.only)
+    comparison = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        comparison = compare(report, baseline, args.tolerance)
+        report["comparison"] = comparison
+    print_table(report, comparison)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text, end="")
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(
+            json.dumps({k: report[k] for k in ("meta", "results")}, indent=2) + "\n"
+        )
+
+    if comparison and any(row["regression"] for row in comparison):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
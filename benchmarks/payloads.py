@@ -0,0 +1,84 @@
+"""Accidents utilisés par les benchmarks : un de référence par version et un
+générateur aléatoire."""
+
+import random
+
+from api.model import VERSIONS
+
+SAMPLES: dict[str, dict] = {
+    "v1_base": {
+        "departement": "2A",
+        "heure": 3,
+        "mois": 1,
+        "jour_semaine": 6,
+        "luminosite": "nuit_non_eclairee",
+    },
+    "v2_route": {
+        "departement": "13",
+        "heure": 18,
+        "mois": 7,
+        "jour_semaine": 4,
+        "luminosite": "jour",
+        "vma": 90,
+        "type_route": "departementale",
+        "en_agglomeration": False,
+        "bidirectionnelle": True,
+    },
+    "v3_vehicules": {
+        "departement": "59",
+        "heure": 23,
+        "mois": 12,
+        "jour_semaine": 5,
+        "luminosite": "nuit_non_eclairee",
+        "vma": 80,
+        "en_agglomeration": False,
+        "nb_vehicules": 2,
+        "types_vehicules": ["moto", "poids_lourd"],
+    },
+    "v4_collision": {
+        "departement": "75",
+        "heure": 22,
+        "mois": 11,
+        "jour_semaine": 5,
+        "luminosite": "nuit_eclairee",
+        "vma": 50,
+        "type_route": "communale",
+        "en_agglomeration": True,
+        "nb_vehicules": 2,
+        "types_vehicules": ["moto"],
+        "type_collision": "frontale",
+    },
+}
+
+
+DEPARTEMENTS = ("75", "13", "69", "59", "33", "31", "2A", "44", "67", "93")
+VEHICULES = ("moto", "velo", "edp", "cyclomoteur", "pieton", "poids_lourd")
+
+
+def random_payload(rng: random.Random, version: str) -> dict:
+    """Accident aléatoire dont les champs renseignés mènent à ``version``."""
+    payload: dict = {
+        "departement": rng.choice(DEPARTEMENTS),
+        "heure": rng.randint(0, 23),
+        "mois": rng.randint(1, 12),
+        "jour_semaine": rng.randint(0, 6),
+        "luminosite": rng.choice(("jour", "nuit_eclairee", "nuit_non_eclairee")),
+    }
+    level = VERSIONS.index(version)
+    if level >= 1:
+        payload.update(
+            vma=rng.choice((30, 50, 70, 80, 90, 110, 130)),
+            nbv=rng.randint(1, 4),
+            type_route=rng.choice(("autoroute", "departementale", "communale")),
+            en_agglomeration=rng.random() < 0.6,
+            bidirectionnelle=rng.random() < 0.5,
+            meteo_degradee=rng.random() < 0.2,
+        )
+    if level >= 2:
+        payload.update(
+            nb_vehicules=rng.randint(1, 4),
+            types_vehicules=rng.sample(VEHICULES, rng.randint(0, 2)),
+        )
+    if level >= 3:
+        payload["type_collision"] = rng.choice(("frontale", "arriere", "cote", "solo"))
+    return payload
@@ -1,47 +1,63 @@
 """Page dashboard — visualisations et statistiques des accidents."""
 
-import json
-from urllib.request import urlopen
-
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import requests
 import streamlit as st
 from plotly.subplots import make_subplots
-from utils.config import API_URL, DEPARTMENTS, VERSION_LABELS, feature_label
-from utils.data import load_dataset, load_metadata
-
-GEOJSON_URL = (
-    "https://raw.githubusercontent.com/gregoiredavid/france-geojson/"
-    "master/departements-version-simplifiee.geojson"
+from utils.config import DEPARTMENTS, VERSION_LABELS, feature_label
+from utils.data import (
+    ROAD_TYPES,
+    VEHICLE_TYPES,
+    Filters,
+    binary_flags,
+    dataset_available,
+    filter_options,
+    get_api_json,
+    grave_counts,
+    load_metadata,
+    risk_ratios,
+)
+from utils.geo import departments_geojson, refresh
+
+# Facteurs binaires comparés dans « Facteurs de risque »
+RISK_FEATURES = (
+    "hors_agglo",
+    "bidirectionnelle",
+    "haute_vitesse",
+    "meteo_degradee",
+    "surface_glissante",
+    "has_moto",
+    "has_velo",
+    "has_pieton",
+    "has_vehicule_lourd",
+    "collision_frontale",
+    "collision_solo",
+    "nuit",
+    "weekend",
+    "intersection_complexe",
 )
-
-
-@st.cache_data
-def load_geojson() -> dict:
-    """Charge le GeoJSON des départements français (mis en cache)."""
-    with urlopen(GEOJSON_URL) as response:  # noqa: S310
-        return json.load(response)
 
 
 # --- Sections du dashboard ---
 
 
-def section_kpis(df: pd.DataFrame, meta: dict):
+def section_kpis(filters: Filters, meta: dict):
     """KPIs principaux en haut de page."""
     best_metrics = (
         meta.get("models", {}).get("v4_collision", {}).get("metrics_test_2024", {})
     )
+    total = grave_counts(None, filters).iloc[0]
 
     k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total accidents", f"{len(df):,}")
-    k2.metric("Accidents graves", f"{int(df['grave'].sum()):,}")
-    k3.metric("Taux de gravité", f"{df['grave'].mean():.1%}")
+    k1.metric("Total accidents", f"{int(total['nb_accidents']):,}")
+    k2.metric("Accidents graves", f"{int(total['nb_graves']):,}")
+    k3.metric("Taux de gravité", f"{total['taux_gravite']:.1%}")
     k4.metric("ROC-AUC (V4)", f"{best_metrics.get('roc_auc', 0):.3f}")
 
 
-def section_impact_operationnel(df: pd.DataFrame, meta: dict):
+def section_impact_operationnel(filters: Filters, meta: dict):
     """Traduction du recall en chiffres concrets pour les secours."""
     st.subheader("Impact opérationnel du modèle")
 
@@ -52,9 +68,8 @@ def section_impact_operationnel(df: pd.DataFrame, meta: dict):
         .get("recall_at_threshold", 0)
     )
 
-    nb_graves_2024 = (
-        int(df[df["annee"] == 2024]["grave"].sum()) if "annee" in df.columns else 0
-    )
+    graves_par_annee = grave_counts("annee", filters).set_index("annee")["nb_graves"]
+    nb_graves_2024 = int(graves_par_annee.get(2024, 0))
     nb_detectes = int(nb_graves_2024 * best_recall)
     nb_manques = nb_graves_2024 - nb_detectes
 
@@ -79,14 +94,13 @@ def section_impact_operationnel(df: pd.DataFrame, meta: dict):
     )
 
 
-def section_distributions_temporelles(df: pd.DataFrame):
+def section_distributions_temporelles(filters: Filters):
     """Accidents par heure et par mois, couleur = taux de gravité."""
     st.subheader("Distributions temporelles")
     t1, t2 = st.columns(2)
 
     with t1:
-        hourly = df.groupby("heure")["grave"].agg(["mean", "count"]).reset_index()
-        hourly.columns = ["heure", "taux_gravite", "nb_accidents"]
+        hourly = grave_counts("heure", filters)
         fig = px.bar(
             hourly,
             x="heure",
@@ -99,8 +113,7 @@ def section_distributions_temporelles(df: pd.DataFrame):
         st.plotly_chart(fig, use_container_width=True)
 
     with t2:
-        monthly = df.groupby("mois")["grave"].agg(["mean", "count"]).reset_index()
-        monthly.columns = ["mois", "taux_gravite", "nb_accidents"]
+        monthly = grave_counts("mois", filters)
         mois_noms = {
             1: "Jan",
             2: "Fév",
@@ -132,45 +145,56 @@ def section_distributions_temporelles(df: pd.DataFrame):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def section_geographie(df: pd.DataFrame):
+def section_geographie(filters: Filters):
     """Carte choropleth + top 15 départements."""
     st.subheader("Répartition géographique")
 
-    dep_stats = df.groupby("dep")["grave"].agg(["count", "sum", "mean"]).reset_index()
-    dep_stats.columns = ["dep", "nb_accidents", "nb_graves", "taux_gravite"]
+    dep_stats = grave_counts("dep", filters)
+    dep_stats["dep"] = dep_stats["dep"].astype(str)
     dep_stats["nom"] = dep_stats["dep"].map(DEPARTMENTS)
     dep_stats["label"] = dep_stats["dep"] + " — " + dep_stats["nom"].fillna("")
 
     # --- Carte choropleth ---
-    geojson = load_geojson()
-
-    metric_choice = st.radio(
-        "Métrique affichée sur la carte",
-        ["Taux de gravité", "Nombre d'accidents"],
-        horizontal=True,
-    )
-    color_col = "taux_gravite" if metric_choice == "Taux de gravité" else "nb_accidents"
-    color_scale = "Reds" if color_col == "taux_gravite" else "Blues"
-
-    fig_map = px.choropleth(
-        dep_stats,
-        geojson=geojson,
-        locations="dep",
-        featureidkey="properties.code",
-        color=color_col,
-        hover_name="nom",
-        hover_data={"dep": True, "nb_accidents": True, "taux_gravite": ":.1%"},
-        color_continuous_scale=color_scale,
-        title=f"{metric_choice} par département",
-        labels={
-            "taux_gravite": "Taux gravité",
-            "nb_accidents": "Nb accidents",
-            "dep": "Code",
-        },
-    )
-    fig_map.update_geos(fitbounds="locations", visible=False)
-    fig_map.update_layout(margin={"r": 0, "t": 40, "l": 0, "b": 0}, height=500)
-    st.plotly_chart(fig_map, use_container_width=True)
+    # Contours livrés avec le frontend, limités aux départements affichés
+    geojson = departments_geojson(dep_stats["dep"].tolist())
+    if not geojson["features"]:
+        st.info("Contours des départements absents : carte indisponible.")
+        if st.button("Télécharger les contours"):
+            try:
+                refresh()
+            except OSError as e:
+                st.error(f"Téléchargement impossible : {e}")
+            geojson = departments_geojson(dep_stats["dep"].tolist())
+
+    if geojson["features"]:
+        metric_choice = st.radio(
+            "Métrique affichée sur la carte",
+            ["Taux de gravité", "Nombre d'accidents"],
+            horizontal=True,
+        )
+        color_col = (
+            "taux_gravite" if metric_choice == "Taux de gravité" else "nb_accidents"
+        )
+        color_scale = "Reds" if color_col == "taux_gravite" else "Blues"
+
+        fig_map = px.choropleth(
+            dep_stats,
+            geojson=geojson,
+            locations="dep",
+            color=color_col,
+            hover_name="nom",
+            hover_data={"dep": True, "nb_accidents": True, "taux_gravite": ":.1%"},
+            color_continuous_scale=color_scale,
+            title=f"{metric_choice} par département",
+            labels={
+                "taux_gravite": "Taux gravité",
+                "nb_accidents": "Nb accidents",
+                "dep": "Code",
+            },
+        )
+        fig_map.update_geos(fitbounds="locations", visible=False)
+        fig_map.update_layout(margin={"r": 0, "t": 40, "l": 0, "b": 0}, height=500)
+        st.plotly_chart(fig_map, use_container_width=True)
 
     # --- Top 15 barres ---
     g1, g2 = st.columns(2)
@@ -213,40 +237,18 @@ def section_geographie(df: pd.DataFrame):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def section_facteurs_risque(df: pd.DataFrame):
-    """Ratio de gravité pour les facteurs binaires clés."""
+def section_facteurs_risque(filters: Filters):
+    """Ratio de gravité (avec IC à 95 %) pour les facteurs binaires."""
     st.subheader("Facteurs de risque")
 
-    risk_features = [
-        "hors_agglo",
-        "bidirectionnelle",
-        "haute_vitesse",
-        "meteo_degradee",
-        "surface_glissante",
-        "has_moto",
-        "has_velo",
-        "has_pieton",
-        "has_vehicule_lourd",
-        "collision_frontale",
-        "collision_solo",
-        "nuit",
-        "weekend",
-        "intersection_complexe",
-    ]
-    available = [f for f in risk_features if f in df.columns]
-
-    risk_data = []
-    for feat in available:
-        taux_present = df[df[feat] == 1]["grave"].mean()
-        taux_absent = df[df[feat] == 0]["grave"].mean()
-        risk_data.append(
-            {
-                "feature": feature_label(feat),
-                "ratio": taux_present / taux_absent if taux_absent > 0 else 0,
-            }
-        )
+    tous = st.checkbox("Afficher tous les facteurs binaires", value=False)
+    flags = (binary_flags() or RISK_FEATURES) if tous else RISK_FEATURES
+    df_risk = risk_ratios(flags, filters).dropna(subset=["ratio"])
+    df_risk["feature"] = df_risk["facteur"].map(feature_label)
+    df_risk["erreur_haut"] = df_risk["ic_haut"] - df_risk["ratio"]
+    df_risk["erreur_bas"] = df_risk["ratio"] - df_risk["ic_bas"]
+    df_risk = df_risk.sort_values("ratio", ascending=True)
 
-    df_risk = pd.DataFrame(risk_data).sort_values("ratio", ascending=True)
     fig = px.bar(
         df_risk,
         x="ratio",
@@ -254,17 +256,35 @@ def section_facteurs_risque(df: pd.DataFrame):
         orientation="h",
         color="ratio",
         color_continuous_scale="Reds",
+        error_x="erreur_haut",
+        error_x_minus="erreur_bas",
+        hover_data={
+            "nb_present": ":,",
+            "taux_present": ":.1%",
+            "nb_absent": ":,",
+            "taux_absent": ":.1%",
+            "erreur_haut": False,
+            "erreur_bas": False,
+        },
         title="Ratio de gravité (présent vs absent)",
-        labels={"ratio": "Ratio de risque", "feature": ""},
+        labels={
+            "ratio": "Ratio de risque",
+            "feature": "",
+            "nb_present": "Accidents (présent)",
+            "taux_present": "Taux gravité (présent)",
+            "nb_absent": "Accidents (absent)",
+            "taux_absent": "Taux gravité (absent)",
+        },
     )
     fig.add_vline(
         x=1, line_dash="dash", line_color="gray", annotation_text="Référence (x1)"
     )
-    fig.update_layout(height=500)
+    fig.update_layout(height=max(500, 25 * len(df_risk)))
     st.plotly_chart(fig, use_container_width=True)
     st.caption(
         "Un ratio > 1 signifie que la présence de ce facteur augmente le taux de gravité. "
-        "Par exemple, un ratio de 2 signifie que le taux de gravité est 2x plus élevé."
+        "Par exemple, un ratio de 2 signifie que le taux de gravité est 2x plus élevé. "
+        "Les barres d'erreur donnent l'intervalle de confiance à 95 %."
     )
 
 
@@ -272,14 +292,13 @@ def section_feature_importance():
     """Feature importance des modèles via l'API."""
     st.subheader("Feature importance du modèle")
     try:
-        r = requests.get(f"{API_URL}/feature-importances", timeout=5)
-        if r.status_code != 200:
-            return
+        fi_data = get_api_json("/feature-importances")
     except requests.ConnectionError:
         st.warning("API non disponible — feature importance indisponible.")
         return
+    if not isinstance(fi_data, dict):
+        return
 
-    fi_data = r.json()
     version_sel = st.selectbox("Version du modèle", list(fi_data.keys()))
 
     if version_sel not in fi_data:
@@ -349,22 +368,11 @@ def section_comparaison_modeles(meta: dict):
     )
 
 
-def section_evolution_annuelle(df: pd.DataFrame):
+def section_evolution_annuelle(filters: Filters):
     """Volume d'accidents et taux de gravité par année."""
-    if "annee" not in df.columns:
-        return
-
     st.subheader("Évolution annuelle")
 
-    yearly = (
-        df.groupby("annee")
-        .agg(
-            nb_accidents=("grave", "count"),
-            nb_graves=("grave", "sum"),
-            taux=("grave", "mean"),
-        )
-        .reset_index()
-    )
+    yearly = grave_counts("annee", filters)
     yearly["annee_str"] = yearly["annee"].astype(str)
 
     fig = make_subplots(specs=[[{"secondary_y": True}]])
@@ -382,10 +390,10 @@ def section_evolution_annuelle(df: pd.DataFrame):
     fig.add_trace(
         go.Scatter(
             x=yearly["annee_str"],
-            y=yearly["taux"] * 100,
+            y=yearly["taux_gravite"] * 100,
             name="Taux gravité (%)",
             mode="lines+markers+text",
-            text=yearly["taux"].apply(lambda v: f"{v:.1%}"),
+            text=yearly["taux_gravite"].apply(lambda v: f"{v:.1%}"),
             textposition="top center",
             line={"color": "crimson", "width": 3},
             marker={"size": 10},
@@ -403,24 +411,51 @@ def section_evolution_annuelle(df: pd.DataFrame):
     )
 
 
+def sidebar_filters() -> Filters:
+    """Filtres de la barre latérale, appliqués à toutes les sections."""
+    annees, deps = filter_options()
+    st.sidebar.header("Filtres")
+    return Filters(
+        annees=tuple(st.sidebar.multiselect("Années", annees)),
+        deps=tuple(
+            st.sidebar.multiselect(
+                "Départements",
+                deps,
+                format_func=lambda d: f"{d} — {DEPARTMENTS.get(d, '')}",
+            )
+        ),
+        routes=tuple(
+            ROAD_TYPES[r] for r in st.sidebar.multiselect("Type de route", ROAD_TYPES)
+        ),
+        vehicules=tuple(
+            VEHICLE_TYPES[v]
+            for v in st.sidebar.multiselect("Véhicules impliqués", VEHICLE_TYPES)
+        ),
+    )
+
+
 # --- Point d'entrée de la page ---
 
 st.title("Dashboard — Accidents routiers 2021-2024")
 
-df = load_dataset()
-if df.empty:
+if not dataset_available():
     st.error("Dataset introuvable. Exécutez d'abord le notebook 04a.")
     st.stop()
 
+# Agrégats calculés par DuckDB selon les filtres (utils.data)
+filters = sidebar_filters()
+if grave_counts(None, filters)["nb_accidents"].iloc[0] == 0:
+    st.warning("Aucun accident ne correspond à ces filtres.")
+    st.stop()
 meta = load_metadata()
 
-section_kpis(df, meta)
+section_kpis(filters, meta)
 st.divider()
-section_impact_operationnel(df, meta)
+section_impact_operationnel(filters, meta)
 st.divider()
-section_distributions_temporelles(df)
-section_geographie(df)
-section_facteurs_risque(df)
+section_distributions_temporelles(filters)
+section_geographie(filters)
+section_facteurs_risque(filters)
 section_feature_importance()
 section_comparaison_modeles(meta)
-section_evolution_annuelle(df)
+section_evolution_annuelle(filters)
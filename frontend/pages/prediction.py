@@ -3,7 +3,10 @@
 import plotly.graph_objects as go
 import requests
 import streamlit as st
-from utils.config import API_URL, DEPARTMENTS, VERSION_LABELS
+from utils.config import API_URL, DEPARTMENTS, VERSION_LABELS, feature_label
+
+# Features affichées avec leur valeur (les autres sont des indicateurs oui/non)
+NUMERIC_FEATURES = {"heure", "mois", "vma", "nbv", "nb_vehicules"}
 
 
 def check_api() -> tuple[bool, dict]:
@@ -185,6 +188,45 @@ def render_result(pred: dict):
             mc3.metric("Precision", f"{m.get('precision_at_threshold', 0):.3f}")
 
 
+def contribution_label(contribution: dict) -> str:
+    """Libellé d'une contribution : « Heure = 3 », « De nuit : non »..."""
+    feat, valeur = contribution["feature"], contribution["valeur"]
+    label = feature_label(feat)
+    if feat == "dep":
+        return label
+    if feat in NUMERIC_FEATURES:
+        return f"{label} = {valeur}"
+    return f"{label} : {'oui' if valeur else 'non'}"
+
+
+def render_explanation(explication: dict):
+    """Affiche les principales contributions (SHAP) de la prédiction."""
+    contributions = explication.get("contributions")
+    if not contributions:
+        st.caption("Explication indisponible (budget de calcul dépassé).")
+        return
+
+    contributions = contributions[::-1]  # plus forte contribution en haut
+    fig = go.Figure(
+        go.Bar(
+            x=[c["contribution"] for c in contributions],
+            y=[contribution_label(c) for c in contributions],
+            orientation="h",
+            marker_color=[
+                "crimson" if c["contribution"] > 0 else "seagreen"
+                for c in contributions
+            ],
+        )
+    )
+    fig.update_layout(
+        height=60 + 35 * len(contributions),
+        margin={"t": 10, "b": 0},
+        xaxis_title="Contribution (log-odds)",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Rouge : augmente la gravité prédite ; vert : la diminue.")
+
+
 # --- Point d'entrée de la page ---
 
 st.title("Prédiction de gravité d'un accident")
@@ -209,6 +251,14 @@ with col_form:
             r = requests.post(f"{API_URL}/predict", json=payload, timeout=10)
             if r.status_code == 200:
                 st.session_state["prediction"] = r.json()
+                st.session_state.pop("explication", None)
+                r = requests.post(
+                    f"{API_URL}/explain",
+                    json={"accidents": [payload], "top_k": 8},
+                    timeout=10,
+                )
+                if r.status_code == 200:
+                    st.session_state["explication"] = r.json()["explications"][0]
             else:
                 st.error(f"Erreur API : {r.text}")
         except Exception as e:
@@ -218,5 +268,8 @@ with col_result:
     st.subheader("Résultat")
     if "prediction" in st.session_state:
         render_result(st.session_state["prediction"])
+        if "explication" in st.session_state:
+            with st.expander("Pourquoi ce résultat ?", expanded=True):
+                render_explanation(st.session_state["explication"])
     else:
         st.info("Remplissez le formulaire et cliquez sur Prédire")
@@ -1,11 +1,94 @@
 """Chargement et mise en cache des données partagées entre les pages."""
 
+import hashlib
 import json
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
 
+import duckdb
+import numpy as np
 import pandas as pd
+import requests
 import streamlit as st
 
-from utils.config import DATA_DIR, MODELS_DIR
+from utils.config import API_URL, DATA_DIR, MODELS_DIR
+
+DATASET_CSV = DATA_DIR / "UC1_v4_collision.csv"
+
+# Cache colonnaire du dataset (Parquet), dérivé du CSV
+CACHE_DIR = Path(os.getenv("DASHBOARD_CACHE_DIR", str(DATA_DIR / ".cache")))
+
+# Cube du dashboard : comptes par (annee, dep), croisés avec chaque dimension
+CUBE_KEYS = ("annee", "dep")
+CUBE_DIMENSIONS = ("heure", "mois", "jour_semaine")
+
+# Résultats de requêtes DuckDB gardés en mémoire (un par requête et filtre)
+FILTER_CACHE_SIZE = int(os.getenv("DASHBOARD_FILTER_CACHE_SIZE", "256"))
+
+# Quantile de la loi normale pour les intervalles de confiance à 95 %
+Z_95 = 1.96
+
+# Filtres du dashboard : libellé → colonne binaire du dataset
+ROAD_TYPES = {
+    "Autoroute": "route_autoroute",
+    "Départementale": "route_departementale",
+    "Communale": "route_communale",
+}
+VEHICLE_TYPES = {
+    "Moto": "has_moto",
+    "Cyclomoteur": "has_cyclomoteur",
+    "Vélo": "has_velo",
+    "EDP": "has_edp",
+    "Poids lourd": "has_vehicule_lourd",
+}
+
+# Réponses GET de l'API : URL → (ETag, date d'expiration, JSON décodé).
+# Partagé entre sessions et reruns (variable de module, pas de session_state).
+_api_cache: dict[str, tuple[str, float, object]] = {}
+
+
+def _max_age(cache_control: str) -> int:
+    """Durée de fraîcheur d'un ``Cache-Control`` (0 si no-cache/no-store)."""
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
+
+def get_api_json(path: str, timeout: float = 5) -> object | None:
+    """GET JSON sur l'API en respectant ``Cache-Control`` et ``ETag``.
+
+    Tant que ``max-age`` n'est pas écoulé, la réponse en mémoire est servie
+    sans requête ; ensuite elle est revalidée par ``If-None-Match`` (304 →
+    réponse en mémoire). Retourne None si l'API répond une erreur.
+
+    Raises:
+        requests.ConnectionError: API injoignable.
+    """
+    url = f"{API_URL}{path}"
+    cached = _api_cache.get(url)
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[2]
+
+    headers = {"If-None-Match": cached[0]} if cached is not None else {}
+    r = requests.get(url, headers=headers, timeout=timeout)
+    expires = time.monotonic() + _max_age(r.headers.get("Cache-Control", ""))
+    if r.status_code == 304 and cached is not None:
+        data = cached[2]
+    elif r.status_code == 200:
+        data = r.json()
+    else:
+        return None
+    etag = r.headers.get("ETag")
+    if etag:
+        _api_cache[url] = (etag, expires, data)
+    return data
 
 
 @st.cache_data
@@ -18,10 +101,376 @@ def load_metadata() -> dict:
     return {}
 
 
-@st.cache_data
-def load_dataset() -> pd.DataFrame:
-    """Charge le dataset V4 complet (2021-2024)."""
-    path = DATA_DIR / "UC1_v4_collision.csv"
-    if path.exists():
-        return pd.read_csv(path)
-    return pd.DataFrame()
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Types réduits : catégories pour le texte, booléens pour les colonnes
+    0/1, plus petit entier (ou float32) pour les autres nombres."""
+    columns = {}
+    for name, col in df.items():
+        if not pd.api.types.is_numeric_dtype(col):
+            columns[name] = col.astype("category")
+        elif col.isna().any() or not (col == col.round()).all():
+            columns[name] = col.astype("float32")
+        elif col.isin((0, 1)).all():
+            columns[name] = col.astype(bool)
+        else:
+            columns[name] = pd.to_numeric(col, downcast="integer")
+    return pd.DataFrame(columns)
+
+
+def _flags(df: pd.DataFrame) -> list[str]:
+    """Colonnes binaires (0/1, valeurs manquantes admises) hors cible."""
+    return [
+        name
+        for name, col in df.items()
+        if name != "grave"
+        and pd.api.types.is_numeric_dtype(col)
+        and col.dropna().isin((0, 1)).all()
+    ]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrège le dataset en cube de comptes (format long).
+
+    Une ligne par (``dimension``, ``valeur``, annee, dep) avec ``nb_accidents``
+    et ``nb_graves``. La dimension ``total`` ne croise que (annee, dep) ; les
+    autres sont les dimensions temporelles (``CUBE_DIMENSIONS`` présentes) et
+    chaque colonne binaire (valeur 0/1). La taille ne dépend que des
+    cardinalités (~400 couples annee, dep), pas du nombre d'accidents.
+    """
+    keys = [k for k in CUBE_KEYS if k in df.columns]
+    dimensions = [d for d in CUBE_DIMENSIONS if d in df.columns] + _flags(df)
+    levels = []
+    for dimension in ("total", *dimensions):
+        by = keys if dimension == "total" else [*keys, dimension]
+        level = (
+            df.groupby(by, observed=True, dropna=False)["grave"]
+            .agg(nb_accidents="count", nb_graves="sum")
+            .reset_index()
+        )
+        if dimension == "total":
+            level["valeur"] = 0
+        else:
+            level = level.dropna(subset=[dimension])
+            level = level.rename(columns={dimension: "valeur"})
+        level.insert(0, "dimension", dimension)
+        levels.append(level)
+    cube = pd.concat(levels, ignore_index=True)
+    return cube.astype(
+        {
+            "dimension": "category",
+            "valeur": "int8",
+            "nb_accidents": "int32",
+            "nb_graves": "int32",
+        }
+    )
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cube_path(cache: Path) -> Path:
+    return cache.with_name(f"{cache.stem}_cube.parquet")
+
+
+def _write_atomic(path: Path, write: Callable[[Path], object]) -> None:
+    """Écrit ``path`` par ``write(tmp)`` puis le renomme : une autre
+    session lit l'ancien fichier ou le nouveau, jamais un fichier partiel.
+
+    Fichier temporaire propre au processus et au thread (les sessions
+    Streamlit sont des threads d'un même processus).
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def dataset_cache(source: Path = DATASET_CSV, cache_dir: Path = CACHE_DIR) -> Path:
+    """Cache Parquet du CSV ``source`` et de son cube (``build_cube``),
+    reconstruits seulement si le CSV a changé.
+
+    Le fichier ``<nom>.json`` à côté du cache garde la date de modification,
+    la taille et l'empreinte SHA-256 du CSV. Date et taille inchangées : le
+    cache est valide sans relire le CSV ; sinon l'empreinte décide (un CSV
+    seulement touché n'est pas re-parsé). Sans droit d'écriture dans
+    ``cache_dir``, retourne le CSV lui-même.
+
+    Chaque fichier est remplacé atomiquement (``_write_atomic``) et les
+    métadonnées en dernier : elles ne valident le cache qu'une fois le
+    Parquet et le cube complets, même si deux sessions le reconstruisent
+    en même temps.
+    """
+    cache = cache_dir / f"{source.stem}.parquet"
+    cube = _cube_path(cache)
+    meta_path = cache.with_suffix(".json")
+    stat = source.stat()
+    key = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    built = cache.exists() and cube.exists()
+    if built and {k: meta.get(k) for k in key} == key:
+        return cache
+
+    sha256 = _sha256(source)
+    try:
+        if not built or meta.get("sha256") != sha256:
+            df = _compact(pd.read_csv(source, dtype={"dep": str}))
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(cache, partial(df.to_parquet, index=False))
+            _write_atomic(cube, partial(build_cube(df).to_parquet, index=False))
+        meta = json.dumps({**key, "sha256": sha256})
+        _write_atomic(meta_path, lambda tmp: tmp.write_text(meta))
+    except OSError:
+        return source
+    return cache
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Filtres du dashboard (vides = pas de filtre).
+
+    Années et départements se combinent en ET ; plusieurs types de route ou
+    de véhicule sélectionnés se combinent en OU (colonnes binaires).
+    """
+
+    annees: tuple[int, ...] = ()
+    deps: tuple[str, ...] = ()
+    routes: tuple[str, ...] = ()
+    vehicules: tuple[str, ...] = ()
+
+    @property
+    def on_rows(self) -> bool:
+        """Vrai si un filtre porte sur une colonne absente du cube."""
+        return bool(self.routes or self.vehicules)
+
+    def where(self) -> tuple[str, list]:
+        """Clause ``WHERE`` paramétrée (``TRUE`` sans filtre)."""
+        clauses, params = ["TRUE"], []
+        for column, values in (("annee", self.annees), ("dep", self.deps)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        for allowed, columns in (
+            (ROAD_TYPES, self.routes),
+            (VEHICLE_TYPES, self.vehicules),
+        ):
+            if columns:
+                if not set(columns) <= set(allowed.values()):
+                    raise ValueError(f"Filtre inconnu : {columns}")
+                flags = " OR ".join(f"CAST({c} AS INTEGER) = 1" for c in columns)
+                clauses.append(f"({flags})")
+        return " AND ".join(clauses), params
+
+
+NO_FILTERS = Filters()
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+@st.cache_resource
+def _connection() -> duckdb.DuckDBPyConnection:
+    """Base DuckDB en mémoire, partagée (un curseur par requête)."""
+    return duckdb.connect()
+
+
+@st.cache_data(max_entries=FILTER_CACHE_SIZE)
+def _query(sql: str, params: tuple, version: int) -> pd.DataFrame:
+    """Résultat d'une requête, mis en cache par (requête, paramètres, version)."""
+    with _connection().cursor() as cursor:
+        return cursor.execute(sql, list(params)).df()
+
+
+def _select(
+    columns: str, source: str, params: list, version: int, tail: str = ""
+) -> pd.DataFrame:
+    """``SELECT columns FROM source tail`` (mis en cache).
+
+    Les fragments SQL viennent de constantes, de chemins et de noms de
+    colonnes échappés ; les valeurs des filtres passent en paramètres.
+    """
+    sql = f"SELECT {columns} FROM {source} {tail}"  # noqa: S608
+    return _query(sql, tuple(params), version)
+
+
+def _relations() -> tuple[str, str | None, int]:
+    """Relations SQL des accidents et du cube (None sans cache) et version."""
+    path = dataset_cache()
+    version = path.stat().st_mtime_ns
+    if path.suffix == ".csv":  # cache impossible à écrire : CSV lu directement
+        return f"read_csv({_literal(path)}, types={{'dep': 'VARCHAR'}})", None, version
+    cube = f"read_parquet({_literal(_cube_path(path))})"
+    return f"read_parquet({_literal(path)})", cube, version
+
+
+def dataset_available() -> bool:
+    return DATASET_CSV.exists()
+
+
+def filter_options() -> tuple[list[int], list[str]]:
+    """Années et départements présents dans le dataset."""
+    rows, cube, version = _relations()
+    source = f"{cube} WHERE dimension = 'total'" if cube else rows
+    pairs = _select("DISTINCT annee, dep", source, [], version)
+    return (
+        sorted(pairs["annee"].dropna().astype(int).unique().tolist()),
+        sorted(pairs["dep"].dropna().astype(str).unique().tolist()),
+    )
+
+
+def _aggregate(
+    columns: str, source: str, params: list, version: int, by: str = ""
+) -> pd.DataFrame:
+    """Agrégats ``columns`` (``nb_accidents``, ``nb_graves``) groupés et triés
+    par ``by``, avec le taux de gravité."""
+    group = f"GROUP BY {by}" if by else ""
+    inner = f"(SELECT {columns} FROM {source} {group})"  # noqa: S608
+    rate = "*, nb_graves / nb_accidents AS taux_gravite"
+    return _select(rate, inner, params, version, f"ORDER BY {by}" if by else "")
+
+
+def binary_flags() -> tuple[str, ...]:
+    """Colonnes binaires du dataset (niveaux du cube hors temps ; () sans cube)."""
+    _, cube, version = _relations()
+    if cube is None:
+        return ()
+    levels = _select("DISTINCT dimension", cube, [], version)["dimension"]
+    return tuple(sorted(set(levels) - {"total", *CUBE_DIMENSIONS}))
+
+
+def grave_counts(by: str | None = None, filters: Filters = NO_FILTERS) -> pd.DataFrame:
+    """Accidents, accidents graves et taux de gravité, groupés par ``by``.
+
+    ``by`` : ``annee``, ``dep``, ``heure``, ``mois`` ou None (une seule
+    ligne). Sans filtre sur la route ou les véhicules, la requête somme le
+    cube ; sinon elle agrège les accidents (Parquet) en un passage.
+    """
+    if by is not None and by not in CUBE_KEYS + CUBE_DIMENSIONS:
+        raise ValueError(f"Regroupement inconnu : {by}")
+    rows, cube, version = _relations()
+    where, params = filters.where()
+    if cube and not filters.on_rows:
+        dimension = by if by in CUBE_DIMENSIONS else "total"
+        key = f"valeur AS {by}" if by in CUBE_DIMENSIONS else by
+        totals = (
+            "coalesce(sum(nb_accidents), 0) AS nb_accidents,"
+            " coalesce(sum(nb_graves), 0) AS nb_graves"
+        )
+        source = f"{cube} WHERE dimension = ? AND {where}"
+        params = [dimension, *params]
+    else:
+        key, source = by, f"{rows} WHERE {where}"
+        totals = (
+            "count(grave) AS nb_accidents,"
+            " coalesce(sum(grave::INTEGER), 0) AS nb_graves"
+        )
+    if by is None:
+        return _aggregate(totals, source, params, version)
+    return _aggregate(f"{key}, {totals}", source, params, version, by)
+
+
+def risk_counts(flags: tuple[str, ...], filters: Filters = NO_FILTERS) -> pd.DataFrame:
+    """Comptes par facteur binaire et valeur (0/1), en un seul passage.
+
+    Une ligne par (``facteur``, ``valeur``) avec ``nb_accidents``,
+    ``nb_graves`` et ``taux_gravite`` ; les facteurs absents du dataset
+    n'ont pas de ligne.
+    """
+    rows, cube, version = _relations()
+    on_cube = cube is not None and not filters.on_rows
+    if not on_cube:
+        available = _select("*", rows, [], version, "LIMIT 0").columns
+        flags = tuple(f for f in flags if f in available)
+    if not flags:
+        return pd.DataFrame(
+            columns=["facteur", "valeur", "nb_accidents", "nb_graves", "taux_gravite"]
+        )
+    where, params = filters.where()
+    by = "facteur, valeur"
+    if on_cube:
+        placeholders = ", ".join("?" * len(flags))
+        return _aggregate(
+            "dimension AS facteur, valeur, sum(nb_accidents) AS nb_accidents,"
+            " sum(nb_graves) AS nb_graves",
+            f"{cube} WHERE dimension IN ({placeholders}) AND {where}",
+            [*flags, *params],
+            version,
+            by,
+        )
+    # Une ligne (facteur, valeur) par accident et facteur : un seul parcours
+    casts = ", ".join(f"{_ident(f)}::TINYINT AS {_ident(f)}" for f in flags)
+    unpivot = (
+        f"(UNPIVOT (SELECT grave, {casts} FROM {rows} WHERE {where}) "  # noqa: S608
+        f"ON {', '.join(map(_ident, flags))} INTO NAME facteur VALUE valeur)"
+    )
+    return _aggregate(
+        "facteur, valeur, count(grave) AS nb_accidents,"
+        " sum(grave::INTEGER) AS nb_graves",
+        unpivot,
+        params,
+        version,
+        by,
+    )
+
+
+def risk_ratios(flags: tuple[str, ...], filters: Filters = NO_FILTERS) -> pd.DataFrame:
+    """Ratio de gravité (facteur présent / absent) et son IC à 95 %.
+
+    Calculé pour tous les facteurs à la fois à partir des comptes de
+    ``risk_counts``, sans repasser sur les accidents, et mis en cache par
+    (facteurs, filtres). Une ligne par facteur : ``nb_present``,
+    ``graves_present``, ``nb_absent``, ``graves_absent``, ``taux_present``,
+    ``taux_absent``, ``ratio``, ``ic_bas``, ``ic_haut``. Intervalle de Katz
+    (normalité du log du ratio) ; NaN si un groupe est vide ou sans
+    accident grave.
+    """
+    return _risk_ratios(flags, filters, _relations()[2])
+
+
+@st.cache_data(max_entries=FILTER_CACHE_SIZE)
+def _risk_ratios(
+    flags: tuple[str, ...], filters: Filters, version: int
+) -> pd.DataFrame:
+    wide = (
+        risk_counts(flags, filters)
+        .set_index(["facteur", "valeur"])[["nb_accidents", "nb_graves"]]
+        .unstack("valeur", fill_value=0)
+        .reindex(
+            columns=pd.MultiIndex.from_product([["nb_accidents", "nb_graves"], [1, 0]]),
+            fill_value=0,
+        )
+        .astype("int64")
+    )
+    n1, n0 = wide["nb_accidents"][1], wide["nb_accidents"][0]
+    g1, g0 = wide["nb_graves"][1], wide["nb_graves"][0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p1, p0 = g1 / n1, g0 / n0
+        ratio = p1 / p0
+        margin = Z_95 * np.sqrt(1 / g1 - 1 / n1 + 1 / g0 - 1 / n0)
+        out = pd.DataFrame(
+            {
+                "nb_present": n1,
+                "graves_present": g1,
+                "nb_absent": n0,
+                "graves_absent": g0,
+                "taux_present": p1,
+                "taux_absent": p0,
+                "ratio": ratio,
+                "ic_bas": ratio * np.exp(-margin),
+                "ic_haut": ratio * np.exp(margin),
+            }
+        )
+    out = out.replace([np.inf, -np.inf], np.nan)
+    out.loc[(g1 == 0) | (g0 == 0), ["ic_bas", "ic_haut"]] = np.nan
+    return out.reset_index()
@@ -0,0 +1,203 @@
+"""Contours des départements pour la carte du dashboard.
+
+Les contours sont livrés avec le frontend (``frontend/assets/geo/``) à
+plusieurs niveaux de simplification, en JSON compressé indexé par code de
+département : la page n'accède pas au réseau et n'envoie au navigateur que
+les départements affichés, au niveau de détail adapté à leur nombre.
+
+Seuls les niveaux simplifiés sont versionnés (la source pèse plus que la
+limite des fichiers ajoutés au dépôt). Ils sont régénérés depuis un GeoJSON
+local (``--source``) ou téléchargé (GEOJSON_URL, seul accès réseau, sur
+demande explicite) :
+
+    cd frontend && python -m utils.geo --bundle --source contours.geojson.gz
+    cd frontend && python -m utils.geo --bundle    # fichiers livrés
+    cd frontend && python -m utils.geo             # cache local
+
+Une mise à jour écrite dans le cache local (``DASHBOARD_CACHE_DIR/geo``)
+est prioritaire sur les fichiers livrés.
+"""
+
+import argparse
+import gzip
+import json
+from pathlib import Path
+from urllib.request import urlopen
+
+import numpy as np
+import streamlit as st
+
+from utils.data import CACHE_DIR
+
+GEOJSON_URL = (
+    "https://raw.githubusercontent.com/gregoiredavid/france-geojson/"
+    "master/departements.geojson"
+)
+
+# Niveaux livrés : contours dérivés des géométries communales ADMIN EXPRESS
+# (IGN, Licence Ouverte)
+BUNDLE_DIR = Path(__file__).resolve().parent.parent / "assets" / "geo"
+GEO_CACHE_DIR = CACHE_DIR / "geo"
+
+# Niveau → (tolérance de Douglas-Peucker en degrés, décimales conservées)
+LEVELS = {
+    "fin": (0.0005, 4),  # ~50 m : quelques départements
+    "moyen": (0.003, 3),  # ~300 m : une région
+    "leger": (0.01, 2),  # ~1 km : France entière
+}
+
+# Nombre maximal de départements affichés pour chaque niveau
+LEVEL_MAX_DEPARTMENTS = {"fin": 5, "moyen": 30}
+
+
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Points d'une ligne conservés par l'algorithme de Douglas-Peucker."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        chord = points[end] - points[start]
+        rel = points[start + 1 : end] - points[start]
+        length = np.hypot(*chord)
+        if length == 0:  # anneau fermé : distance au point de départ
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(chord[0] * rel[:, 1] - chord[1] * rel[:, 0]) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            keep[start + 1 + i] = True
+            stack += [(start, start + 1 + i), (start + 1 + i, end)]
+    return points[keep]
+
+
+def _simplify_polygon(
+    rings: list, tolerance: float, decimals: int
+) -> list[list[list[float]]]:
+    """Anneaux simplifiés ; les trous réduits à moins de 4 points sont
+    retirés, un contour extérieur réduit à moins de 4 points donne []."""
+    out = []
+    for ring in rings:
+        points = np.round(_douglas_peucker(np.asarray(ring), tolerance), decimals)
+        if len(points) >= 4:
+            out.append(points.tolist())
+        elif not out:
+            return []
+    return out
+
+
+def simplify(geometry: dict, tolerance: float, decimals: int) -> dict:
+    """Polygon ou MultiPolygon simplifié (îlots trop petits retirés)."""
+    polygons = (
+        [geometry["coordinates"]]
+        if geometry["type"] == "Polygon"
+        else geometry["coordinates"]
+    )
+    kept = [
+        p for p in (_simplify_polygon(p, tolerance, decimals) for p in polygons) if p
+    ]
+    if not kept:  # département minuscule à cette échelle : plus grand polygone
+        largest = max(polygons, key=lambda p: len(p[0]))
+        kept = [[np.round(np.asarray(largest[0]), decimals).tolist()]]
+    if len(kept) == 1:
+        return {"type": "Polygon", "coordinates": kept[0]}
+    return {"type": "MultiPolygon", "coordinates": kept}
+
+
+def build_levels(geojson: dict, output: Path) -> dict[str, int]:
+    """Écrit ``departements-<niveau>.json.gz`` ({code: géométrie}) pour
+    chaque niveau et retourne la taille compressée de chacun."""
+    output.mkdir(parents=True, exist_ok=True)
+    sizes = {}
+    for level, (tolerance, decimals) in LEVELS.items():
+        keyed = {
+            feature["properties"]["code"]: simplify(
+                feature["geometry"], tolerance, decimals
+            )
+            for feature in geojson["features"]
+        }
+        path = output / f"departements-{level}.json.gz"
+        body = json.dumps(keyed, separators=(",", ":")).encode()
+        path.write_bytes(gzip.compress(body, mtime=0))
+        sizes[level] = path.stat().st_size
+    return sizes
+
+
+def refresh(output: Path = GEO_CACHE_DIR, url: str = GEOJSON_URL) -> dict[str, int]:
+    """Télécharge les contours et reconstruit les niveaux (seul accès réseau)."""
+    with urlopen(url, timeout=60) as response:  # noqa: S310 - mise à jour explicite
+        geojson = json.load(response)
+    sizes = build_levels(geojson, output)
+    load_departments.clear()
+    return sizes
+
+
+def rebuild(source: Path, output: Path = BUNDLE_DIR) -> dict[str, int]:
+    """Reconstruit les niveaux depuis un GeoJSON local (``.gz`` ou non)."""
+    with gzip.open(source) if source.suffix == ".gz" else open(source, "rb") as f:
+        geojson = json.load(f)
+    sizes = build_levels(geojson, output)
+    load_departments.clear()
+    return sizes
+
+
+@st.cache_resource
+def load_departments(level: str) -> dict[str, dict]:
+    """Géométries {code: géométrie} d'un niveau ({} si aucun fichier)."""
+    for directory in (GEO_CACHE_DIR, BUNDLE_DIR):
+        path = directory / f"departements-{level}.json.gz"
+        if path.exists():
+            with gzip.open(path) as f:
+                return json.load(f)
+    return {}
+
+
+def level_for(n_departments: int) -> str:
+    """Niveau le plus léger suffisant pour ``n_departments`` départements."""
+    for level, limit in LEVEL_MAX_DEPARTMENTS.items():
+        if n_departments <= limit:
+            return level
+    return "leger"
+
+
+def departments_geojson(codes: list[str], level: str | None = None) -> dict:
+    """FeatureCollection des seuls départements ``codes`` (``id`` = code).
+
+    Niveau par défaut selon le nombre de départements (``level_for``) ; les
+    codes sans contour sont ignorés (collection vide sans fichier).
+    """
+    geometries = load_departments(level or level_for(len(codes)))
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "id": code, "geometry": geometries[code]}
+            for code in codes
+            if code in geometries
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Met à jour les contours.")
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help=f"Écrit les fichiers livrés ({BUNDLE_DIR}) au lieu du cache local",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        help="GeoJSON local (éventuellement .gz) à simplifier, sans réseau",
+    )
+    parser.add_argument("--url", default=GEOJSON_URL)
+    args = parser.parse_args()
+    output = BUNDLE_DIR if args.bundle else GEO_CACHE_DIR
+    sizes = rebuild(args.source, output) if args.source else refresh(output, args.url)
+    for level, size in sizes.items():
+        print(f"{output / f'departements-{level}.json.gz'} : {size / 1000:.0f} ko")
+
+
+if __name__ == "__main__":
+    main()
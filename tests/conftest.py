@@ -7,6 +7,8 @@ import pytest
 from fastapi.testclient import TestClient
 
 import api.main
+from api.model import ModelStore, compile_encoders
+from api.registry import ModelRegistry
 
 
 @pytest.fixture
@@ -14,12 +16,11 @@ def client():
     """Client de test FastAPI sans modèles chargés.
 
     Le lifespan charge les modèles au démarrage.
-    On les vide ensuite pour tester le comportement sans modèles.
+    On les remplace ensuite par une génération vide pour tester le
+    comportement sans modèles.
     """
     with TestClient(api.main.app, raise_server_exceptions=False) as c:
-        api.main.models.clear()
-        api.main.metadata.clear()
-        api.main.dep_mapping.clear()
+        api.main.registry = ModelRegistry.empty()
         yield c
 
 
@@ -27,45 +28,57 @@ def client():
 def client_with_model():
     """Client de test avec un faux modèle V1.
 
-    - Mock du modèle : predict_proba renvoie [[0.25, 0.75]] (75% gravité)
-    - Mock de save_prediction : ne fait rien (pas de DB en test)
+    - Mock du modèle : predict_proba renvoie [0.25, 0.75] par ligne (75% gravité)
+    - Mock du logger de prédictions : ne fait rien (pas de DB en test)
     - Métadonnées minimales pour que build_features fonctionne
     """
     with TestClient(api.main.app, raise_server_exceptions=False) as c:
         # Faux modèle qui simule predict_proba
         fake_model = Mock()
-        fake_model.predict_proba.return_value = np.array([[0.25, 0.75]])
+        fake_model.predict_proba.side_effect = lambda X: np.tile(
+            [0.25, 0.75], (len(X), 1)
+        )
 
         # Injecter le faux modèle
-        api.main.models.clear()
-        api.main.models["v1_base"] = fake_model
+        models = ModelStore()
+        models["v1_base"] = fake_model
 
         # Métadonnées minimales (liste de features attendues par build_features)
-        api.main.metadata.clear()
-        api.main.metadata["threshold"] = 0.45
-        api.main.metadata["models"] = {
-            "v1_base": {
-                "features": [
-                    "dep",
-                    "heure",
-                    "mois",
-                    "weekend",
-                    "nuit",
-                    "heure_pointe",
-                    "heure_danger",
-                    "nuit_eclairee",
-                ],
-                "n_features": 8,
-                "metrics_test_2024": {"recall": 0.82},
-            }
+        metadata = {
+            "threshold": 0.45,
+            "models": {
+                "v1_base": {
+                    "features": [
+                        "dep",
+                        "heure",
+                        "mois",
+                        "weekend",
+                        "nuit",
+                        "heure_pointe",
+                        "heure_danger",
+                        "nuit_eclairee",
+                    ],
+                    "n_features": 8,
+                    "metrics_test_2024": {"recall": 0.82},
+                }
+            },
         }
 
         # Mapping département
-        api.main.dep_mapping.clear()
-        api.main.dep_mapping["75"] = 75
+        dep_mapping = {"75": 75}
 
-        # Mock save_prediction pour ne pas toucher à la DB
-        with patch("api.main.save_prediction"):
+        # Génération de test (pas de table V1 : les prédictions passent par
+        # le faux modèle)
+        api.main.registry = ModelRegistry(
+            generation="test",
+            models=models,
+            metadata=metadata,
+            dep_mapping=dep_mapping,
+            encoders=compile_encoders(metadata, dep_mapping),
+        )
+
+        # Mock du logger de prédictions pour ne pas toucher à la DB
+        with patch("api.main.prediction_logger"):
             yield c
 
 
@@ -1,5 +1,11 @@
 """Tests des endpoints de l'API."""
 
+from unittest.mock import patch
+
+import numpy as np
+
+import api.main
+
 
 def test_health_sans_modeles(client):
     """GET /health sans modèles → status 200, status='no_models'."""
@@ -51,3 +57,173 @@ def test_feature_importances_sans_modeles(client):
     assert response.status_code == 200
     # Vérifie que le JSON est vide
     assert response.json() == {}
+
+
+def test_feature_importances_etag(client_with_model):
+    """ETag + Cache-Control ; If-None-Match correspondant → 304 sans corps."""
+    model = api.main.registry.models["v1_base"]
+    model.get_feature_importance.return_value = np.arange(8.0)
+    model.tree_count_ = 300
+
+    response = client_with_model.get("/feature-importances")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=60"
+    top = response.json()["v1_base"]
+    assert top[0] == {"feature": "nuit_eclairee", "importance": 7.0}
+
+    etag = response.headers["etag"]
+    response = client_with_model.get(
+        "/feature-importances", headers={"If-None-Match": f'W/{etag}, "autre"'}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # Calculé une seule fois pour la génération
+    assert model.get_feature_importance.call_count == 1
+
+
+def test_models_introspection(client_with_model):
+    """GET /models : features, métriques, arbres et seuil de la génération."""
+    model = api.main.registry.models["v1_base"]
+    model.get_feature_importance.return_value = np.arange(8.0)
+    model.tree_count_ = 300
+
+    response = client_with_model.get("/models")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["generation"] == "test"
+    assert data["seuil"] == 0.45
+    v1 = data["modeles"]["v1_base"]
+    assert v1["n_arbres"] == 300
+    assert v1["n_features"] == 8
+    assert v1["metriques"] == {"recall": 0.82}
+    assert len(v1["importances"]) == 8
+    stale = client_with_model.get("/models", headers={"If-None-Match": '"autre"'})
+    assert stale.status_code == 200
+
+
+def test_predict_batch_avec_modele(client_with_model, accident_minimal):
+    """POST /predict/batch → une réponse par accident, dans l'ordre d'entrée."""
+    lot = [accident_minimal, {**accident_minimal, "heure": 3}, accident_minimal]
+    response = client_with_model.post("/predict/batch", json=lot)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 3
+    assert all(p["version_modele"] == "v1_base" for p in data)
+    assert all(p["probabilite"] == 0.75 for p in data)
+    # Un seul appel predict_proba pour les 3 accidents V1
+    assert api.main.registry.models["v1_base"].predict_proba.call_count == 1
+
+
+def test_predict_batch_modele_manquant(client_with_model, accident_minimal):
+    """POST /predict/batch avec une version non chargée → status 503."""
+    lot = [accident_minimal, {**accident_minimal, "type_collision": "solo"}]
+    response = client_with_model.post("/predict/batch", json=lot)
+    assert response.status_code == 503
+
+
+def test_predict_batch_trop_volumineux(client_with_model, accident_minimal):
+    """POST /predict/batch au-delà de BATCH_MAX_SIZE → status 413."""
+    with patch("api.main.BATCH_MAX_SIZE", 2):
+        response = client_with_model.post("/predict/batch", json=[accident_minimal] * 3)
+    assert response.status_code == 413
+
+
+def test_health_expose_file_de_journalisation(client):
+    """GET /health expose la profondeur de la file de journalisation."""
+    response = client.get("/health")
+    assert response.json()["prediction_log"]["queue_depth"] == 0
+
+
+def test_predict_cache_hit(client_with_model, accident_minimal):
+    """Une requête répétée est servie par le cache, sans nouvelle inférence."""
+    client_with_model.post("/predict", json=accident_minimal)
+    response = client_with_model.post("/predict", json=accident_minimal)
+
+    assert response.json()["probabilite"] == 0.75
+    assert api.main.registry.models["v1_base"].predict_proba.call_count == 1
+    assert api.main.prediction_cache.stats()["hits"] == 1
+
+
+def test_predict_porte_la_generation(client_with_model, accident_minimal):
+    """La réponse indique la génération de modèles qui l'a produite."""
+    response = client_with_model.post("/predict", json=accident_minimal)
+    assert response.json()["generation_modele"] == "test"
+
+
+def test_predict_sweep_matrice(client_with_model, accident_minimal):
+    """POST /predict/sweep → matrice heure x luminosité, un seul predict_proba."""
+    body = {
+        "accident": accident_minimal,
+        "axes": [{"champ": "heure"}, {"champ": "luminosite", "valeurs": ["jour"]}],
+    }
+    response = client_with_model.post("/predict/sweep", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["version_modele"] == "v1_base"
+    assert data["axes"][0]["valeurs"] == list(range(24))
+    assert len(data["probabilites"]) == 24
+    assert data["probabilites"][0] == [0.75]
+    assert api.main.registry.models["v1_base"].predict_proba.call_count == 1
+
+
+def test_predict_sweep_valeur_invalide(client_with_model, accident_minimal):
+    """Une valeur d'axe hors du domaine du champ → status 422."""
+    body = {"accident": accident_minimal, "axes": [{"champ": "heure", "valeurs": [25]}]}
+    response = client_with_model.post("/predict/sweep", json=body)
+    assert response.status_code == 422
+
+
+def test_predict_sweep_trop_volumineux(client_with_model, accident_minimal):
+    """POST /predict/sweep au-delà de SWEEP_MAX_CELLS → status 413."""
+    body = {"accident": accident_minimal, "axes": [{"champ": "heure"}]}
+    with patch("api.main.SWEEP_MAX_CELLS", 10):
+        response = client_with_model.post("/predict/sweep", json=body)
+    assert response.status_code == 413
+
+
+def _proba_par_heure(X):
+    """Faux predict_proba : probabilité = heure / 100 (colonne 1 des features)."""
+    p = X[:, 1].astype(float) / 100
+    return np.column_stack([1 - p, p])
+
+
+def test_triage_classement(client_with_model, accident_minimal):
+    """POST /triage → incidents classés par probabilité décroissante, top-k."""
+    api.main.registry.models["v1_base"].predict_proba.side_effect = _proba_par_heure
+    incidents = [
+        {"id": f"inc-{h}", "accident": {**accident_minimal, "heure": h}}
+        for h in (10, 20, 3)
+    ]
+    response = client_with_model.post(
+        "/triage", json={"incidents": incidents, "top_k": 2}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["n_incidents"] == 3
+    assert data["n_graves"] == 0
+    assert [r["id"] for r in data["classement"]] == ["inc-20", "inc-10"]
+    assert [r["rang"] for r in data["classement"]] == [1, 2]
+
+
+def test_triage_incremental(client_with_model, accident_minimal):
+    """Renvoyer l'ensemble avec un incident modifié ne rescore que celui-là."""
+    model = api.main.registry.models["v1_base"]
+    model.predict_proba.side_effect = _proba_par_heure
+    incidents = [
+        {"id": f"inc-{h}", "accident": {**accident_minimal, "heure": h}}
+        for h in range(5)
+    ]
+    client_with_model.post("/triage", json={"incidents": incidents})
+    incidents[2]["accident"]["heure"] = 23
+    response = client_with_model.post("/triage", json={"incidents": incidents})
+
+    assert response.json()["classement"][0]["id"] == "inc-2"
+    assert model.predict_proba.call_count == 2
+    assert len(model.predict_proba.call_args.args[0]) == 1
+
+
+def test_triage_identifiants_en_double(client_with_model, accident_minimal):
+    incident = {"id": "a", "accident": accident_minimal}
+    response = client_with_model.post("/triage", json={"incidents": [incident] * 2})
+    assert response.status_code == 422
@@ -0,0 +1,152 @@
+"""Tests du format Arrow IPC de /predict/batch."""
+
+from unittest.mock import patch
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.arrow_ipc import ACCIDENT_SCHEMA, ARROW_MEDIA_TYPE
+from api.schemas import AccidentInput
+from tests.test_stream import _random_payloads
+
+ARROW_HEADERS = {"Content-Type": ARROW_MEDIA_TYPE, "Accept": ARROW_MEDIA_TYPE}
+
+
+def _arrow_body(payloads, schema=ACCIDENT_SCHEMA):
+    table = pa.Table.from_pylist(payloads, schema=schema)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _read(response):
+    return pa.ipc.open_stream(response.content).read_all()
+
+
+@pytest.fixture(scope="module")
+def client_real():
+    """Client avec les vrais modèles (chargés par le lifespan), sans base."""
+    with TestClient(api.main.app) as c, patch("api.main.prediction_logger"):
+        yield c
+
+
+def test_arrow_parite_json(client_real):
+    """Mêmes versions et probabilités en Arrow qu'en JSON (vrais modèles)."""
+    deps = sorted(api.main.registry.dep_mapping)
+    payloads = _random_payloads(500, deps)
+
+    expected = client_real.post("/predict/batch", json=payloads).json()
+    response = client_real.post(
+        "/predict/batch", content=_arrow_body(payloads), headers=ARROW_HEADERS
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+
+    table = _read(response)
+    assert table.column("version_modele").to_pylist() == [
+        p["version_modele"] for p in expected
+    ]
+    np.testing.assert_allclose(
+        table.column("probabilite").to_numpy(),
+        [p["probabilite"] for p in expected],
+        atol=1e-4,
+    )
+    assert table.column("grave").to_pylist() == [p["grave"] for p in expected]
+    assert table.schema.metadata[b"generation_modele"] == (
+        api.main.registry.generation.encode()
+    )
+
+
+def test_arrow_journalise_comme_json(client_with_model, accident_minimal):
+    """Les accidents journalisés ont le format de ``model_dump``."""
+    lot = [accident_minimal, {**accident_minimal, "heure": 3}]
+    response = client_with_model.post(
+        "/predict/batch", content=_arrow_body(lot), headers=ARROW_HEADERS
+    )
+    assert response.status_code == 200
+    assert _read(response).column("probabilite").to_pylist() == [0.75, 0.75]
+
+    records, count = api.main.prediction_logger.log_bulk.call_args.args
+    assert count == 2
+    assert [r["input_data"] for r in records()] == [
+        AccidentInput(**p).model_dump() for p in lot
+    ]
+    assert [r["probability"] for r in records()] == [0.75, 0.75]
+
+
+def test_arrow_reponse_json_par_defaut(client_with_model, accident_minimal):
+    """Sans ``Accept`` Arrow, la réponse reste en JSON."""
+    response = client_with_model.post(
+        "/predict/batch",
+        content=_arrow_body([accident_minimal]),
+        headers={"Content-Type": ARROW_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["probabilite"] == 0.75
+
+
+def test_json_reponse_arrow(client_with_model, accident_minimal):
+    """Corps JSON et ``Accept`` Arrow : réponse en Arrow."""
+    response = client_with_model.post(
+        "/predict/batch",
+        json=[accident_minimal] * 3,
+        headers={"Accept": ARROW_MEDIA_TYPE},
+    )
+    assert _read(response).num_rows == 3
+
+
+def test_arrow_colonnes_non_typees(client_with_model, accident_minimal):
+    """Colonnes de types inférés (entiers 64 bits, département entier)."""
+    lot = [{**accident_minimal, "departement": 75}]
+    response = client_with_model.post(
+        "/predict/batch",
+        content=_arrow_body(lot, schema=None),
+        headers=ARROW_HEADERS,
+    )
+    assert response.status_code == 200
+
+
+def test_arrow_ligne_invalide(client_with_model, accident_minimal):
+    """Une valeur hors bornes → 422 avec l'indice de la ligne."""
+    lot = [accident_minimal, {**accident_minimal, "heure": 25}]
+    response = client_with_model.post(
+        "/predict/batch", content=_arrow_body(lot), headers=ARROW_HEADERS
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == [
+        {"loc": ["body", 1], "msg": "heure invalide", "type": "value_error"}
+    ]
+
+
+def test_arrow_corps_illisible(client_with_model):
+    response = client_with_model.post(
+        "/predict/batch", content=b"pas de l'arrow", headers=ARROW_HEADERS
+    )
+    assert response.status_code == 400
+
+
+def test_arrow_trop_volumineux(client_with_model, accident_minimal):
+    """La limite Arrow est distincte de BATCH_MAX_SIZE."""
+    body = _arrow_body([accident_minimal] * 3)
+    with patch("api.main.BATCH_MAX_SIZE", 2):
+        response = client_with_model.post(
+            "/predict/batch", content=body, headers=ARROW_HEADERS
+        )
+        assert response.status_code == 200
+    with patch("api.main.ARROW_BATCH_MAX_SIZE", 2):
+        response = client_with_model.post(
+            "/predict/batch", content=body, headers=ARROW_HEADERS
+        )
+    assert response.status_code == 413
+
+
+def test_json_invalide_toujours_422(client_with_model, accident_minimal):
+    """Le corps JSON garde les erreurs de validation de FastAPI."""
+    lot = [accident_minimal, {**accident_minimal, "heure": 25}]
+    response = client_with_model.post("/predict/batch", json=lot)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "heure"]
@@ -0,0 +1,64 @@
+"""Tests du micro-batcher (api.batching)."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from api.batching import MicroBatcher
+
+
+@pytest.fixture
+def recorded():
+    """predict_fn qui renvoie la 1re colonne /100 et mémorise la taille des lots."""
+    sizes: list[int] = []
+    lock = threading.Lock()
+
+    def predict_fn(version, X):
+        with lock:
+            sizes.append(len(X))
+        return X[:, 0].astype(float) / 100
+
+    return predict_fn, sizes
+
+
+def test_regroupe_les_soumissions_concurrentes(recorded):
+    """Les lignes soumises ensemble sont scorées en lots, chaque appelant reçoit
+    sa propre probabilité."""
+    predict_fn, sizes = recorded
+    batcher = MicroBatcher(predict_fn, max_wait_ms=50, max_batch=8)
+    batcher.start()
+    with ThreadPoolExecutor(16) as pool:
+        results = list(
+            pool.map(
+                lambda i: batcher.predict("v2_route", np.array([[i, 0]], dtype=object)),
+                range(32),
+            )
+        )
+    batcher.stop()
+
+    assert results == [i / 100 for i in range(32)]
+    assert sum(sizes) == 32
+    assert max(sizes) <= 8
+    assert len(sizes) < 32
+
+
+def test_propage_les_erreurs():
+    """Une erreur d'inférence est remontée à chaque appelant du lot."""
+
+    def failing(version, X):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(failing, max_wait_ms=1)
+    batcher.start()
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.predict("v2_route", np.array([[1]], dtype=object))
+    batcher.stop()
+
+
+def test_refuse_apres_arret(recorded):
+    """Un batcher arrêté refuse les nouvelles soumissions."""
+    batcher = MicroBatcher(recorded[0])
+    with pytest.raises(RuntimeError, match="arrêté"):
+        batcher.submit("v2_route", np.array([[1]], dtype=object))
@@ -0,0 +1,54 @@
+"""Tests du cache LRU des prédictions (api.cache)."""
+
+from unittest.mock import patch
+
+from api.cache import PredictionCache
+
+
+def test_lru_eviction():
+    """Au-delà de max_size, l'entrée la moins récemment utilisée est évincée."""
+    cache = PredictionCache(max_size=2)
+    cache.put("v2_route", (1,), 0.1)
+    cache.put("v2_route", (2,), 0.2)
+    assert cache.get("v2_route", (1,)) == 0.1  # (1,) devient la plus récente
+    cache.put("v2_route", (3,), 0.3)
+
+    assert cache.get("v2_route", (2,)) is None
+    assert cache.get("v2_route", (1,)) == 0.1
+    assert cache.stats() == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_ttl_expiration():
+    """Une entrée expirée n'est plus servie."""
+    cache = PredictionCache(max_size=10, ttl=5)
+    with patch("api.cache.time.monotonic", return_value=100.0):
+        cache.put("v2_route", (1,), 0.1)
+    with patch("api.cache.time.monotonic", return_value=104.0):
+        assert cache.get("v2_route", (1,)) == 0.1
+    with patch("api.cache.time.monotonic", return_value=106.0):
+        assert cache.get("v2_route", (1,)) is None
+
+
+def test_invalidation_par_version():
+    """invalidate(version) ne vide que les entrées de cette version."""
+    cache = PredictionCache(max_size=10)
+    cache.put("v2_route", (1,), 0.1)
+    cache.put("v3_vehicules", (1,), 0.2)
+    cache.invalidate("v2_route")
+
+    assert cache.get("v2_route", (1,)) is None
+    assert cache.get("v3_vehicules", (1,)) == 0.2
+
+
+def test_cache_desactive():
+    """max_size = 0 désactive le cache."""
+    cache = PredictionCache(max_size=0)
+    cache.put("v2_route", (1,), 0.1)
+    assert cache.get("v2_route", (1,)) is None
+    assert cache.stats()["size"] == 0
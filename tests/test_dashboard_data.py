@@ -0,0 +1,256 @@
+"""Tests de la couche de données du dashboard (frontend/utils/data.py).
+
+Le cube (``build_cube``), les filtres DuckDB (``Filters.where``) et les
+ratios de gravité (``risk_ratios``) sont comparés à un calcul pandas direct
+sur un petit dataset synthétique.
+"""
+
+import functools
+import sys
+import types
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "frontend"))
+
+
+def _streamlit_stub() -> types.SimpleNamespace:
+    """Module ``streamlit`` réduit aux décorateurs de cache.
+
+    streamlit 1.19 (seule version compatible pandas 3) ne s'importe pas sous
+    Python 3.13 (``imghdr`` supprimé) : la couche de données est testée sans
+    lui, avec des caches ``lru_cache`` vidés par ``cache_data.clear()``.
+    """
+    caches: list = []
+
+    def cache(func=None, *, max_entries=None, **_):
+        def wrap(f):
+            cached = functools.lru_cache(maxsize=max_entries)(f)
+            caches.append(cached)
+            return cached
+
+        return wrap(func) if func is not None else wrap
+
+    def clear() -> None:
+        for cached in caches:
+            cached.cache_clear()
+
+    cache.clear = clear
+    return types.SimpleNamespace(cache_data=cache, cache_resource=cache)
+
+
+with pytest.MonkeyPatch.context() as _mp:
+    _mp.setitem(sys.modules, "streamlit", _streamlit_stub())
+    from utils import data
+
+st = data.st
+
+# Fonction réelle : la fixture ``accidents`` remplace ``data.dataset_cache``
+# pour tout le module
+dataset_cache = data.dataset_cache
+
+FLAGS = ("route_autoroute", "route_communale", "has_moto", "has_velo")
+
+
+def _accidents(n: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    moto = rng.integers(0, 2, n).astype(float)
+    moto[rng.random(n) < 0.05] = np.nan  # valeurs manquantes dans un facteur
+    return pd.DataFrame(
+        {
+            "annee": rng.choice([2021, 2022, 2023], n),
+            "dep": rng.choice(["01", "2A", "75", "971"], n),
+            "heure": rng.integers(0, 24, n),
+            "mois": rng.integers(1, 13, n),
+            "jour_semaine": rng.integers(0, 7, n),
+            "route_autoroute": rng.random(n) < 0.2,
+            "route_communale": rng.random(n) < 0.5,
+            "has_moto": moto,
+            "has_velo": np.zeros(n, dtype=int),  # facteur jamais présent
+            "grave": (rng.random(n) < 0.3).astype(int),
+        }
+    ).astype({"route_autoroute": int, "route_communale": int})
+
+
+@pytest.fixture(scope="module")
+def accidents(tmp_path_factory):
+    """Dataset synthétique servi par ``_relations`` (cache Parquet + cube)."""
+    tmp = tmp_path_factory.mktemp("dashboard")
+    df = _accidents()
+    csv = tmp / "accidents.csv"
+    df.to_csv(csv, index=False)
+    st.cache_data.clear()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            data,
+            "dataset_cache",
+            partial(dataset_cache, csv, tmp / "cache"),
+        )
+        yield pd.read_csv(csv, dtype={"dep": str})
+
+
+def _mask(df: pd.DataFrame, filters: data.Filters) -> pd.Series:
+    """Filtres du dashboard appliqués en pandas (référence)."""
+    mask = pd.Series(True, index=df.index)
+    if filters.annees:
+        mask &= df["annee"].isin(filters.annees)
+    if filters.deps:
+        mask &= df["dep"].isin(filters.deps)
+    for columns in (filters.routes, filters.vehicules):
+        if columns:
+            mask &= (df[list(columns)] == 1).any(axis=1)
+    return mask
+
+
+FILTERS = [
+    data.NO_FILTERS,
+    data.Filters(annees=(2022,), deps=("2A", "75")),
+    data.Filters(routes=("route_autoroute", "route_communale")),
+    data.Filters(annees=(2021, 2023), vehicules=("has_moto",)),
+]
+
+
+def test_cube_egal_pandas():
+    """Chaque niveau du cube, filtré sur (annee, dep), somme comme pandas."""
+    df = data._compact(_accidents())
+    cube = data.build_cube(df)
+    assert set(cube["dimension"]) == {"total", *data.CUBE_DIMENSIONS, *FLAGS}
+
+    mask = df["annee"].isin([2021, 2022]) & df["dep"].isin(["2A", "971"])
+    selected = cube[cube["annee"].isin([2021, 2022]) & cube["dep"].isin(["2A", "971"])]
+    for dimension in (*data.CUBE_DIMENSIONS, *FLAGS):
+        level = selected[selected["dimension"] == dimension]
+        actual = level.groupby("valeur")[["nb_accidents", "nb_graves"]].sum()
+        expected = (
+            df[mask]
+            .groupby(dimension)["grave"]
+            .agg(nb_accidents="count", nb_graves="sum")
+        )
+        np.testing.assert_array_equal(actual.index, expected.index.astype(int))
+        np.testing.assert_array_equal(actual.to_numpy(), expected.to_numpy())
+    total = selected[selected["dimension"] == "total"]
+    assert total["nb_accidents"].sum() == mask.sum()
+    assert total["nb_graves"].sum() == df.loc[mask, "grave"].sum()
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("by", [None, "annee", "dep", "heure", "mois"])
+def test_grave_counts_egal_pandas(accidents, filters, by):
+    """Cube (filtres annee/dep) ou lignes (route/véhicule) : mêmes comptes
+    que pandas."""
+    selected = accidents[_mask(accidents, filters)]
+    result = data.grave_counts(by, filters)
+    if by is None:
+        assert result["nb_accidents"].item() == len(selected)
+        assert result["nb_graves"].item() == selected["grave"].sum()
+        return
+    expected = selected.groupby(by)["grave"].agg(["count", "sum", "mean"])
+    assert result[by].astype(str).tolist() == expected.index.astype(str).tolist()
+    np.testing.assert_array_equal(result["nb_accidents"], expected["count"])
+    np.testing.assert_array_equal(result["nb_graves"], expected["sum"])
+    np.testing.assert_allclose(result["taux_gravite"], expected["mean"])
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_risk_ratios_egal_calcul_direct(accidents, filters):
+    """Taux, ratio et intervalle de Katz depuis des moyennes masquées."""
+    selected = accidents[_mask(accidents, filters)]
+    result = data.risk_ratios(FLAGS, filters).set_index("facteur")
+    # Un facteur filtré n'a pas de groupe « absent » (voir comptes nuls)
+    filtered = {*filters.routes, *filters.vehicules}
+    for flag in sorted({"route_autoroute", "route_communale", "has_moto"} - filtered):
+        present = selected.loc[selected[flag] == 1, "grave"]
+        absent = selected.loc[selected[flag] == 0, "grave"]
+        n1, g1, n0, g0 = len(present), present.sum(), len(absent), absent.sum()
+        ratio = present.mean() / absent.mean()
+        margin = 1.96 * np.sqrt(1 / g1 - 1 / n1 + 1 / g0 - 1 / n0)
+        row = result.loc[flag]
+        assert (row["nb_present"], row["graves_present"]) == (n1, g1)
+        assert (row["nb_absent"], row["graves_absent"]) == (n0, g0)
+        np.testing.assert_allclose(
+            row[["taux_present", "taux_absent", "ratio", "ic_bas", "ic_haut"]].to_numpy(
+                dtype=float
+            ),
+            [
+                present.mean(),
+                absent.mean(),
+                ratio,
+                ratio * np.exp(-margin),
+                ratio * np.exp(margin),
+            ],
+        )
+    # Facteur jamais présent : pas de ratio
+    never = result.loc["has_velo"]
+    assert never["nb_present"] == 0
+    assert np.isnan(never[["taux_present", "ratio", "ic_bas", "ic_haut"]]).all()
+
+
+def test_risk_ratios_comptes_nuls(monkeypatch):
+    """Groupe vide ou sans accident grave : NaN plutôt que inf ou erreur."""
+    counts = pd.DataFrame(
+        {
+            "facteur": ["sans_grave", "sans_grave", "absent_vide", "normal", "normal"],
+            "valeur": [1, 0, 1, 1, 0],
+            "nb_accidents": [50, 100, 10, 40, 160],
+            "nb_graves": [0, 20, 5, 10, 20],
+        }
+    )
+    monkeypatch.setattr(data, "risk_counts", lambda flags, filters: counts)
+    st.cache_data.clear()
+    flags = ("sans_grave", "absent_vide", "normal")
+    result = data._risk_ratios(flags, data.NO_FILTERS, -1).set_index("facteur")
+
+    sans_grave = result.loc["sans_grave"]
+    assert sans_grave["ratio"] == 0
+    assert np.isnan(sans_grave[["ic_bas", "ic_haut"]].astype(float)).all()
+
+    absent_vide = result.loc["absent_vide"]
+    assert (absent_vide["nb_absent"], absent_vide["graves_absent"]) == (0, 0)
+    assert np.isnan(absent_vide[["taux_absent", "ratio", "ic_bas"]].astype(float)).all()
+
+    normal = result.loc["normal"]
+    margin = 1.96 * np.sqrt(1 / 10 - 1 / 40 + 1 / 20 - 1 / 160)
+    np.testing.assert_allclose(
+        normal[["ratio", "ic_bas", "ic_haut"]].to_numpy(dtype=float),
+        [2.0, 2.0 * np.exp(-margin), 2.0 * np.exp(margin)],
+    )
+
+
+def test_cache_ecrit_atomiquement(tmp_path, monkeypatch):
+    """Échec pendant l'écriture du cube : ni fichier partiel, ni métadonnées
+    validant le cache ; la reconstruction suivante le complète."""
+    csv = tmp_path / "accidents.csv"
+    _accidents(200).to_csv(csv, index=False)
+    cache_dir = tmp_path / "cache"
+
+    class Cube:
+        def to_parquet(self, path, index):
+            Path(path).write_bytes(b"PAR1")  # début de fichier puis erreur
+            raise OSError("disque plein")
+
+    with monkeypatch.context() as mp:
+        mp.setattr(data, "build_cube", lambda df: Cube())
+        assert dataset_cache(csv, cache_dir) == csv
+    assert sorted(p.name for p in cache_dir.iterdir()) == ["accidents.parquet"]
+
+    cache = dataset_cache(csv, cache_dir)
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        "accidents.json",
+        "accidents.parquet",
+        "accidents_cube.parquet",
+    ]
+    assert len(pd.read_parquet(cache)) == 200
+
+
+def test_where_sans_filtre():
+    assert data.NO_FILTERS.where() == ("TRUE", [])
+
+
+def test_where_filtre_inconnu():
+    with pytest.raises(ValueError, match="Filtre inconnu"):
+        data.Filters(routes=("grave",)).where()
@@ -0,0 +1,143 @@
+"""Tests de l'exécuteur d'inférence et de sa contre-pression."""
+
+import asyncio
+import os
+import threading
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+import pytest
+
+import api.main
+from api.batching import MicroBatcher
+from api.executor import INFERENCE_WORKERS, InferenceExecutor, Overloaded
+from api.model import CATBOOST_THREADS, default_catboost_threads
+from api.schemas import AccidentInput
+
+
+def test_run_dans_le_pool():
+    executor = InferenceExecutor(workers=2, queue_limit=0)
+    executor.start()
+    name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+    executor.stop()
+    assert name.startswith("inference")
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_file_pleine_refusee():
+    """workers + queue_limit inférences en cours : la suivante est refusée."""
+    executor = InferenceExecutor(workers=1, queue_limit=1)
+    executor.start()
+    release = threading.Event()
+
+    async def scenario():
+        pending = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await executor.run(release.wait)
+        release.set()
+        return await asyncio.gather(*pending)
+
+    assert asyncio.run(scenario()) == [True, True]
+    executor.stop()
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_executeur_arrete():
+    with pytest.raises(RuntimeError):
+        asyncio.run(InferenceExecutor().run(int))
+
+
+def test_predict_surcharge_503(client_with_model, accident_minimal):
+    with patch.object(
+        api.main.inference_executor, "run", AsyncMock(side_effect=Overloaded)
+    ):
+        response = client_with_model.post("/predict", json=accident_minimal)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_microbatch_lot_plus_grand_que_le_pool(
+    client_with_model, accident_minimal, monkeypatch
+):
+    """Les lignes attendent le lot dans la boucle d'événements : un seul
+    thread d'inférence suffit pour un lot de 8 lignes."""
+    executor = InferenceExecutor(workers=1, queue_limit=0)
+    executor.start()
+    monkeypatch.setattr(api.main, "inference_executor", executor)
+    batcher = MicroBatcher(api.main._predict_batched, max_wait_ms=50, max_batch=8)
+    batcher.start()
+    api.main.prediction_cache.invalidate()
+    reg = api.main.registry
+    rows = [AccidentInput(**{**accident_minimal, "heure": h}) for h in range(8)]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(api.main._score_microbatched(batcher, reg, "v1_base", r) for r in rows)
+        )
+
+    results = asyncio.run(scenario())
+    batcher.stop()
+    executor.stop()
+    assert [float(probas[0]) for probas, _ in results] == [0.75] * 8
+    calls = reg.models["v1_base"].predict_proba.call_args_list
+    assert [len(call.args[0]) for call in calls] == [8]
+
+
+def test_health_expose_executeur(client):
+    inference = client.get("/health").json()["inference"]
+    assert inference["workers"] == api.main.inference_executor.workers
+    assert inference["rejected"] == 0
+
+
+def test_arret_micro_batcher_avant_executeur():
+    """À l'arrêt, le micro-batcher vide ses lots avant l'arrêt de l'exécuteur,
+    puis le logger est arrêté en dernier."""
+    calls = []
+
+    def spy(name, stop):
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            return stop(*args, **kwargs)
+
+        return wrapper
+
+    with (
+        patch.object(api.main, "MICROBATCH_ENABLED", True),
+        patch.object(MicroBatcher, "stop", spy("micro_batcher", MicroBatcher.stop)),
+        patch.object(
+            api.main.shadow_scorer, "stop", spy("shadow", api.main.shadow_scorer.stop)
+        ),
+        patch.object(
+            api.main.inference_executor,
+            "stop",
+            spy("executor", api.main.inference_executor.stop),
+        ),
+        patch.object(
+            api.main.prediction_logger,
+            "stop",
+            spy("logger", api.main.prediction_logger.stop),
+        ),
+        TestClient(api.main.app),
+    ):
+        pass
+    assert calls == ["micro_batcher", "shadow", "executor", "logger"]
+
+
+CORES = os.cpu_count() or 1
+
+
+@pytest.mark.parametrize("workers", sorted({1, max(1, CORES // 2), CORES}))
+def test_threads_catboost_par_defaut_sans_surcharge(workers):
+    """workers x threads CatBoost par défaut ≤ nombre de cœurs."""
+    assert workers * default_catboost_threads(workers) <= CORES
+
+
+@pytest.mark.skipif(
+    "INFERENCE_WORKERS" in os.environ or "CATBOOST_THREADS" in os.environ,
+    reason="réglages imposés par l'environnement",
+)
+def test_reglages_par_defaut_sans_surcharge():
+    assert 0 < INFERENCE_WORKERS * CATBOOST_THREADS <= CORES
@@ -0,0 +1,151 @@
+"""Tests des explications SHAP (/explain)."""
+
+import time
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.cache import PredictionCache
+from api.explain import explain_rows, top_contributions
+from tests.test_stream import _random_payloads
+
+
+def _fake_shap(model, X):
+    """SHAP factice : contribution = valeur de la feature, base = -1."""
+    values = np.asarray(X, dtype=float)
+    return np.hstack([values, -np.ones((len(values), 1))])
+
+
+@pytest.fixture
+def shap_calls():
+    with patch("api.explain.shap_values", side_effect=_fake_shap) as fake:
+        yield fake
+
+
+def test_explain_rows_cache_et_doublons(shap_calls):
+    """Vecteurs identiques calculés une fois ; le second appel sert le cache."""
+    X = np.array([[1, 2], [3, 4], [1, 2]], dtype=object)
+    cache = PredictionCache(max_size=10)
+    deadline = time.monotonic() + 10
+
+    rows = explain_rows(Mock(), X, cache, "v1_base", "g1", deadline)
+    assert [r.tolist() for r in rows] == [[1, 2, -1], [3, 4, -1], [1, 2, -1]]
+    assert len(shap_calls.call_args.args[1]) == 2
+
+    explain_rows(Mock(), X, cache, "v1_base", "g1", deadline)
+    assert shap_calls.call_count == 1
+    # Autre génération : nouvelle clé
+    explain_rows(Mock(), X, cache, "v1_base", "g2", deadline)
+    assert shap_calls.call_count == 2
+
+
+def test_explain_rows_budget(shap_calls):
+    """Budget épuisé : seuls les vecteurs en cache sont renvoyés."""
+    X = np.array([[1, 2], [3, 4], [5, 6]], dtype=object)
+    cache = PredictionCache(max_size=10)
+    explain_rows(Mock(), X[:1], cache, "v1_base", "g", time.monotonic() + 10)
+
+    rows = explain_rows(Mock(), X, cache, "v1_base", "g", time.monotonic() - 1)
+    assert rows[0] is not None
+    assert rows[1] is None
+    assert rows[2] is None
+
+
+def test_explain_rows_par_paquets(shap_calls):
+    X = np.arange(10).reshape(5, 2).astype(object)
+    rows = explain_rows(
+        Mock(), X, PredictionCache(10), "v1_base", "g", time.monotonic() + 10, 2
+    )
+    assert shap_calls.call_count == 3
+    assert all(r is not None for r in rows)
+
+
+def test_top_contributions():
+    """Tri par valeur absolue décroissante, valeur de base exclue."""
+    shap_row = np.array([0.1, -0.5, 0.3, 9.0])
+    top = top_contributions(("a", "b", "c"), np.array([1, 0, 7]), shap_row, 2)
+    assert top == [
+        {"feature": "b", "valeur": 0, "contribution": -0.5},
+        {"feature": "c", "valeur": 7, "contribution": 0.3},
+    ]
+
+
+def test_explain_endpoint(client_with_model, accident_minimal, shap_calls):
+    response = client_with_model.post(
+        "/explain", json={"accidents": [accident_minimal], "top_k": 3}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["complet"] is True
+    explication = data["explications"][0]
+    assert explication["probabilite"] == 0.75
+    assert explication["valeur_base"] == -1
+    assert [c["feature"] for c in explication["contributions"]] == [
+        "dep",
+        "heure",
+        "mois",
+    ]
+
+
+def test_explain_budget_epuise(client_with_model, accident_minimal, shap_calls):
+    """Budget nul : réponse partielle, sans calcul SHAP."""
+    api.main.explanation_cache.invalidate()
+    with patch("api.main.EXPLAIN_BUDGET_MS", 0):
+        response = client_with_model.post(
+            "/explain", json={"accidents": [accident_minimal]}
+        )
+    data = response.json()
+    assert data["complet"] is False
+    assert data["explications"][0]["contributions"] is None
+    assert data["explications"][0]["probabilite"] == 0.75
+    shap_calls.assert_not_called()
+
+
+def test_explain_trop_volumineux(client_with_model, accident_minimal):
+    with patch("api.main.EXPLAIN_MAX_SIZE", 1):
+        response = client_with_model.post(
+            "/explain", json={"accidents": [accident_minimal] * 2}
+        )
+    assert response.status_code == 413
+
+
+def test_explain_backend_sans_shap(client_with_model, accident_minimal):
+    """Backend sans ``get_feature_importance`` (ONNX) → 501."""
+    model = Mock(spec=["predict_proba"])
+    model.predict_proba.return_value = np.array([[0.3, 0.7]])
+    api.main.registry.models["v1_base"] = model
+    response = client_with_model.post(
+        "/explain", json={"accidents": [accident_minimal]}
+    )
+    assert response.status_code == 501
+
+
+def test_explain_vrais_modeles():
+    """Base + somme des contributions = log-odds de la probabilité (V1 à V4)."""
+    with TestClient(api.main.app) as client, patch("api.main.prediction_logger"):
+        payloads = _random_payloads(20, sorted(api.main.registry.dep_mapping))
+        payloads.append(
+            {
+                "departement": "75",
+                "heure": 3,
+                "mois": 1,
+                "jour_semaine": 6,
+                "luminosite": "jour",
+            }
+        )
+        response = client.post("/explain", json={"accidents": payloads, "top_k": 40})
+    data = response.json()
+    assert data["complet"] is True
+    assert {e["version_modele"] for e in data["explications"]} == {
+        "v1_base",
+        "v2_route",
+        "v3_vehicules",
+        "v4_collision",
+    }
+    for e in data["explications"]:
+        p = e["probabilite"]
+        total = e["valeur_base"] + sum(c["contribution"] for c in e["contributions"])
+        assert total == pytest.approx(np.log(p / (1 - p)), abs=0.02)
@@ -0,0 +1,44 @@
+"""Tests de l'outillage du test de charge (sans lancer l'API)."""
+
+from api.model import detect_version
+from api.schemas import AccidentInput
+from benchmarks.loadtest import compare, make_payloads, parse_mix, stage_breakdown
+
+BASELINE = {"scenarios": {"predict_c8": {"rps": 500.0, "p95_ms": 20.0, "p99_ms": 30.0}}}
+
+
+def _report(**values):
+    result = {"errors": 0, "rps": 500.0, "p95_ms": 20.0, "p99_ms": 30.0, **values}
+    return {"scenarios": {"predict_c8": result}}
+
+
+def test_compare_dans_la_tolerance():
+    assert compare(_report(rps=400.0, p95_ms=24.0, p99_ms=44.0), BASELINE, 0.25) == []
+
+
+def test_compare_detecte_les_regressions():
+    regressions = compare(_report(rps=300.0, p95_ms=26.0, p99_ms=50.0), BASELINE, 0.25)
+    assert len(regressions) == 3
+
+
+def test_compare_erreurs_et_scenarios_nouveaux():
+    """Les erreurs HTTP échouent toujours ; un scénario sans référence passe."""
+    report = {"scenarios": {"batch_c1": {"errors": 2, "rps": 1.0, "p95_ms": 1.0}}}
+    assert compare(report, BASELINE, 0.25) == ["batch_c1: 2 requête(s) en erreur"]
+
+
+def test_stage_breakdown_difference_des_histogrammes():
+    before = {("predict", "v2_route"): (10.0, 0.001)}
+    after = {("predict", "v2_route"): (30.0, 0.005), ("log", "all"): (0.0, 0.0)}
+    assert stage_breakdown(before, after) == {
+        "predict/v2_route": {"count": 20.0, "mean_us": 200.0}
+    }
+
+
+def test_make_payloads_respecte_le_melange():
+    """Les accidents générés sont reproductibles et routés selon le mélange."""
+    mix = parse_mix("v1_base=0.5,v4_collision=0.5")
+    payloads = make_payloads(200, mix, seed=1)
+    assert payloads == make_payloads(200, mix, seed=1)
+    versions = {detect_version(AccidentInput(**p)) for p in payloads}
+    assert versions == {"v1_base", "v4_collision"}
@@ -0,0 +1,52 @@
+"""Tests de la table de prédictions précalculée V1 (api.lookup)."""
+
+import copy
+
+import numpy as np
+import pytest
+
+from api.lookup import V1LookupTable, load_table
+from api.model import compile_encoders, load_all_models
+from api.schemas import AccidentInput
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    models, metadata, dep_mapping = load_all_models()
+    encoder = compile_encoders(metadata, dep_mapping)["v1_base"]
+    return models["v1_base"], metadata, dep_mapping, encoder
+
+
+def test_table_identique_au_modele(loaded):
+    """La table renvoie les probabilités du modèle V1 (au pas de quantification)."""
+    model, metadata, dep_mapping, encoder = loaded
+    table = load_table(metadata, dep_mapping, model, encoder)
+    assert isinstance(table, V1LookupTable)
+
+    rows = [
+        AccidentInput(departement=dep, heure=h, mois=m, jour_semaine=j, luminosite=lum)
+        for dep, h, m, j, lum in [
+            ("75", 14, 6, 2, "jour"),
+            ("2A", 3, 1, 6, "nuit_non_eclairee"),
+            ("59", 22, 12, 5, "nuit_eclairee"),
+            ("99", 8, 9, 0, "jour"),  # département inconnu → code 0
+        ]
+    ]
+    expected = model.predict_proba(encoder.encode_batch(rows))[:, 1]
+    np.testing.assert_allclose(table.lookup_batch(rows), expected, atol=1e-5)
+
+
+def test_empreinte_invalide_repli_modele(loaded):
+    """Une empreinte différente des métadonnées désactive la table."""
+    model, metadata, dep_mapping, encoder = loaded
+    tampered = copy.deepcopy(metadata)
+    tampered["models"]["v1_base"]["lookup_table"]["sha256"] = "0" * 64
+    assert load_table(tampered, dep_mapping, model, encoder) is None
+
+
+def test_sans_table_repli_modele(loaded):
+    """Sans référence de table dans les métadonnées, pas de table."""
+    model, metadata, dep_mapping, encoder = loaded
+    stripped = copy.deepcopy(metadata)
+    del stripped["models"]["v1_base"]["lookup_table"]
+    assert load_table(stripped, dep_mapping, model, encoder) is None
@@ -0,0 +1,102 @@
+"""Tests des métriques Prometheus."""
+
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_format_prometheus(client):
+    """GET /metrics → texte Prometheus."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "uc1_stage_duration_seconds" in response.text
+
+
+STAGES = [
+    ("validation", "all"),
+    ("detect_version", "v1_base"),
+    ("features", "v1_base"),
+    ("predict", "v1_base"),
+    ("log", "v1_base"),
+]
+
+
+def test_predict_instrumente(client_with_model, accident_minimal):
+    """Une prédiction alimente les histogrammes d'étapes et le compteur."""
+    labels = {"endpoint": "predict", "version": "v1_base", "outcome": "ok"}
+    before = _sample("uc1_predictions_total", **labels)
+    counts = [
+        _sample("uc1_stage_duration_seconds_count", stage=s, version=v)
+        for s, v in STAGES
+    ]
+
+    client_with_model.post("/predict", json=accident_minimal)
+
+    assert _sample("uc1_predictions_total", **labels) == before + 1
+    for (s, v), count in zip(STAGES, counts, strict=True):
+        assert _sample("uc1_stage_duration_seconds_count", stage=s, version=v) > count
+
+
+def test_batch_compte_par_version(client_with_model, accident_minimal):
+    """/predict/batch compte chaque accident traité."""
+    labels = {"endpoint": "batch", "version": "v1_base", "outcome": "ok"}
+    before = _sample("uc1_predictions_total", **labels)
+    client_with_model.post("/predict/batch", json=[accident_minimal] * 3)
+    assert _sample("uc1_predictions_total", **labels) == before + 3
+
+
+def test_predict_indisponible_compte(client, accident_minimal):
+    """Un 503 est compté avec l'issue ``unavailable``."""
+    labels = {"endpoint": "predict", "version": "all", "outcome": "unavailable"}
+    before = _sample("uc1_predictions_total", **labels)
+    client.post("/predict", json=accident_minimal)
+    assert _sample("uc1_predictions_total", **labels) == before + 1
+
+
+def test_multiprocess_agrege_les_workers(tmp_path):
+    """En mode multi-processus, /metrics somme les workers sans doublon."""
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": "."}
+    worker = (
+        "from api.metrics import PREDICTIONS;"
+        "PREDICTIONS.labels('predict', 'v1_base', 'ok').inc()"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)  # noqa: S603
+
+    scrape = "from api.metrics import render; print(render()[0].decode())"
+    out = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", scrape],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    line = 'uc1_predictions_total{endpoint="predict",outcome="ok",version="v1_base"}'
+    assert f"{line} 2.0" in out.splitlines()
+
+
+def test_worker_arrete_sort_de_la_jauge_livesum(tmp_path):
+    """Un worker arrêté ne gonfle plus la profondeur de file agrégée."""
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": "."}
+    worker = (
+        "from api.metrics import LOG_QUEUE_DEPTH, mark_worker_dead;"
+        "LOG_QUEUE_DEPTH.set(5);"
+        "mark_worker_dead()"
+    )
+    subprocess.run([sys.executable, "-c", worker], env=env, check=True)  # noqa: S603
+
+    scrape = "from api.metrics import render; print(render()[0].decode())"
+    out = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", scrape],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert "uc1_prediction_log_queue_depth 5.0" not in out.splitlines()
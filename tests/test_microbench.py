@@ -0,0 +1,31 @@
+"""Tests de l'outillage des microbenchmarks."""
+
+from benchmarks.microbench import alloc_bytes_per_call, compare
+
+BASELINE = {"results": {"v1_base/encode": {"ns_per_call": 1000, "alloc_bytes": 500}}}
+
+
+def _report(ns, alloc):
+    return {"results": {"v1_base/encode": {"ns_per_call": ns, "alloc_bytes": alloc}}}
+
+
+def test_compare_dans_la_tolerance():
+    [row] = compare(_report(1150, 500), BASELINE, 0.2)
+    assert not row["regression"]
+    assert row["time_ratio"] == 1.15
+
+
+def test_compare_temps_ou_allocations_en_hausse():
+    assert compare(_report(1300, 500), BASELINE, 0.2)[0]["regression"]
+    assert compare(_report(1000, 700), BASELINE, 0.2)[0]["regression"]
+
+
+def test_compare_ignore_les_fonctions_nouvelles():
+    report = {"results": {"v9/encode": {"ns_per_call": 1, "alloc_bytes": 1}}}
+    assert compare(report, BASELINE, 0.2) == []
+
+
+def test_alloc_bytes_per_call():
+    """Le pic mesuré reflète la mémoire allouée pendant l'appel."""
+    assert alloc_bytes_per_call(lambda: None) < 1_000
+    assert alloc_bytes_per_call(lambda: bytearray(100_000)) >= 100_000
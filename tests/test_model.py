@@ -0,0 +1,125 @@
+"""Tests du chargement des modèles et de la construction des features."""
+
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from api.model import (
+    VERSIONS,
+    FeatureEncoder,
+    ModelStore,
+    build_features,
+    compile_encoders,
+    detect_version,
+    load_all_models,
+    load_model,
+    model_path,
+)
+from api.schemas import AccidentInput
+from benchmarks.payloads import SAMPLES
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    """Modèles, métadonnées et mapping réels du dossier models/."""
+    return load_all_models()
+
+
+@pytest.mark.parametrize("version", VERSIONS)
+def test_detect_version(version):
+    """Chaque accident de référence est routé vers sa version."""
+    assert detect_version(AccidentInput(**SAMPLES[version])) == version
+
+
+@pytest.mark.parametrize("version", VERSIONS)
+def test_encoder_identique_build_features(loaded, version):
+    """L'encodeur compilé produit les mêmes valeurs que build_features."""
+    _, metadata, dep_mapping = loaded
+    data = AccidentInput(**SAMPLES[version])
+    encoder = compile_encoders(metadata, dep_mapping)[version]
+
+    expected = build_features(data, version, metadata, dep_mapping)
+    X = encoder.encode(data)
+
+    assert X.shape == (1, len(expected.columns))
+    assert X.tolist() == expected.astype(object).to_numpy().tolist()
+
+
+@pytest.mark.parametrize("version", VERSIONS)
+def test_encoder_meme_prediction(loaded, version):
+    """CatBoost renvoie la même probabilité avec l'encodeur et le DataFrame."""
+    models, metadata, dep_mapping = loaded
+    data = AccidentInput(**SAMPLES[version])
+    encoder = compile_encoders(metadata, dep_mapping)[version]
+
+    expected = models[version].predict_proba(
+        build_features(data, version, metadata, dep_mapping)
+    )
+    assert np.array_equal(models[version].predict_proba(encoder.encode(data)), expected)
+
+
+def test_encode_batch_identique_encode(loaded):
+    """encode_batch équivaut à l'empilement des encode unitaires."""
+    _, metadata, dep_mapping = loaded
+    encoder = compile_encoders(metadata, dep_mapping)["v4_collision"]
+    rows = [AccidentInput(**SAMPLES[v]) for v in VERSIONS]
+
+    X = encoder.encode_batch(rows)
+
+    assert X.tolist() == [encoder.encode(r)[0].tolist() for r in rows]
+
+
+def test_plan_de_colonnes():
+    """Colonnes dans l'ordre des métadonnées ; feature non calculée → 0."""
+    features = ["frontale_x_hors_agglo", "heure", "inconnue", "dep", "has_moto"]
+    encoder = FeatureEncoder("v4_collision", features, {"13": 12})
+    data = AccidentInput(**{**SAMPLES["v4_collision"], "departement": "13"})
+    assert encoder.encode(data).tolist() == [[0, 22, 0, 12, 1]]
+
+    single = FeatureEncoder("v1_base", ["mois"], {})
+    assert single.encode(data).tolist() == [[11]]
+
+
+def test_chargement_paresseux():
+    """En mode lazy, un modèle n'est chargé (puis préchauffé) qu'au premier accès."""
+    models, _, _ = load_all_models(lazy=True)
+    models.on_load = Mock()
+    assert list(models) == list(VERSIONS)
+    assert models.loaded() == []
+
+    with patch("api.model.load_model", return_value="modele") as load:
+        assert models["v2_route"] == "modele"
+        assert models["v2_route"] == "modele"
+
+    load.assert_called_once_with(model_path("v2_route"))
+    models.on_load.assert_called_once_with("v2_route", "modele")
+    assert models.loaded() == ["v2_route"]
+
+
+def test_model_store_version_inconnue():
+    """Une version sans fichier lève KeyError."""
+    with pytest.raises(KeyError):
+        ModelStore()["v9"]
+
+
+def test_format_cbm_meme_prediction(loaded, tmp_path):
+    """Un modèle converti en .cbm prédit comme l'original joblib."""
+    models, metadata, dep_mapping = loaded
+    version = "v4_collision"
+    path = tmp_path / f"model_UC1_{version}.cbm"
+    models[version].save_model(str(path), format="cbm")
+
+    encoder = compile_encoders(metadata, dep_mapping)[version]
+    X = encoder.encode(AccidentInput(**SAMPLES[version]))
+    np.testing.assert_allclose(
+        load_model(path).predict_proba(X), models[version].predict_proba(X)
+    )
+
+
+def test_threads_par_version(monkeypatch):
+    """CATBOOST_THREADS_<VERSION> remplace CATBOOST_THREADS pour une version."""
+    monkeypatch.setenv("CATBOOST_THREADS_V4_COLLISION", "2")
+    assert load_model(model_path("v4_collision")).threads == 2
+    assert load_model(model_path("v4_collision"), threads=1).threads == 1
+    assert load_model(model_path("v1_base")).threads == -1
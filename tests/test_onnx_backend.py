@@ -0,0 +1,105 @@
+"""Tests des backends d'inférence : CatBoost et export ONNX Runtime."""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+import api.model
+import api.onnx_backend
+from api.model import CatBoostModel, compile_encoders, load_all_models, model_path
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from api.onnx_backend import (  # noqa: E402
+    PARITY_TOLERANCE,
+    OnnxModel,
+    check_parity,
+    compile_catboost,
+    load_holdout,
+    synthetic_sample,
+    to_onnx,
+)
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    models, metadata, dep_mapping = load_all_models(lazy=False, backend="catboost")
+    return models, compile_encoders(metadata, dep_mapping), dep_mapping
+
+
+@pytest.fixture(scope="module")
+def exported(loaded, tmp_path_factory):
+    """Export ONNX de chaque version dans un dossier temporaire."""
+    models, _, dep_mapping = loaded
+    n_dep = max(int(v) for v in dep_mapping.values()) + 1
+    directory = tmp_path_factory.mktemp("onnx")
+    paths = {}
+    for version in models:
+        paths[version] = directory / f"{version}.onnx"
+        onnx.save(to_onnx(compile_catboost(models[version], n_dep)), paths[version])
+    return paths
+
+
+def test_parite_onnx_catboost(loaded, exported):
+    """Chaque export reproduit les probabilités CatBoost (échantillon synthétique)."""
+    models, encoders, dep_mapping = loaded
+    for version, path in exported.items():
+        onnx_model = OnnxModel(path)
+        assert onnx_model.feature_names_ == list(models[version].feature_names_)
+        X = synthetic_sample(encoders[version], dep_mapping)
+        assert check_parity(models[version], onnx_model, X) < PARITY_TOLERANCE
+
+
+def test_holdout_annee_de_test(loaded, tmp_path, monkeypatch):
+    """L'échantillon de parité ne garde que l'année 2024, encodée par version."""
+    _, encoders, dep_mapping = loaded
+    encoder = encoders["v1_base"]
+    rows = {f: [1, 1, 1] for f in encoder.features}
+    rows.update({"dep": ["75", "13", "999"], "annee": [2023, 2024, 2024]})
+    path = tmp_path / "UC1_v4_collision.csv"
+    path.write_text(
+        ",".join(rows)
+        + "\n"
+        + "\n".join(",".join(str(col[i]) for col in rows.values()) for i in range(3))
+    )
+    monkeypatch.setattr(api.onnx_backend, "HOLDOUT_PATH", path)
+
+    X = load_holdout("v1_base", encoder, dep_mapping)
+    dep = list(encoder.features).index("dep")
+    assert X is not None
+    assert sorted(X[:, dep]) == sorted([dep_mapping["13"], 0])
+
+
+def test_holdout_absent(loaded, tmp_path, monkeypatch):
+    _, encoders, dep_mapping = loaded
+    monkeypatch.setattr(api.onnx_backend, "HOLDOUT_PATH", tmp_path / "absent.csv")
+    assert load_holdout("v1_base", encoders["v1_base"], dep_mapping) is None
+
+
+def test_model_path_repli_catboost(tmp_path, monkeypatch):
+    """Backend ONNX sans export : repli sur le modèle CatBoost."""
+    monkeypatch.setattr(api.model, "MODELS_DIR", tmp_path)
+    (tmp_path / "model_UC1_v1_base.joblib").touch()
+    assert model_path("v1_base", backend="onnx").suffix == ".joblib"
+
+    (tmp_path / "model_UC1_v1_base.onnx").touch()
+    assert model_path("v1_base", backend="onnx").suffix == ".onnx"
+    assert model_path("v1_base", backend="catboost").suffix == ".joblib"
+
+
+def test_model_path_backend_inconnu():
+    with pytest.raises(ValueError, match="tensorrt"):
+        model_path("v1_base", backend="tensorrt")
+
+
+def test_catboost_threads():
+    """Le nombre de threads est passé à CatBoost ; le reste est délégué."""
+    inner = Mock()
+    inner.predict_proba.return_value = np.array([[0.4, 0.6]])
+    model = CatBoostModel(inner, threads=2)
+
+    model.predict_proba([[1.0]])
+    inner.predict_proba.assert_called_once_with([[1.0]], thread_count=2)
+    assert model.feature_names_ is inner.feature_names_
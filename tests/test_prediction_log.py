@@ -0,0 +1,149 @@
+"""Tests de la journalisation asynchrone des prédictions."""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from api.prediction_log import PredictionLogger
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _record(i: int) -> dict:
+    return {
+        "input_data": {"i": i},
+        "model_version": "v1_base",
+        "probability": 0.5,
+        "prediction": 1,
+        "grave": True,
+    }
+
+
+def test_flush_par_lots_et_a_l_arret():
+    """Les prédictions sont écrites par lots ≤ batch_size, tout est vidé à l'arrêt."""
+    writer = Mock()
+    plog = PredictionLogger(writer=writer, batch_size=2, flush_interval=60)
+    plog.start()
+    plog.log_many([_record(i) for i in range(5)])
+    plog.stop()
+
+    batches = [call.args[0] for call in writer.call_args_list]
+    assert all(len(b) <= 2 for b in batches)
+    assert [r["input_data"]["i"] for b in batches for r in b] == list(range(5))
+    assert all("timestamp" in r for b in batches for r in b)
+    assert plog.stats()["written"] == 5
+    assert plog.depth == 0
+
+
+def test_flush_par_intervalle():
+    """Un lot incomplet est écrit une fois l'intervalle de flush écoulé."""
+    writer = Mock()
+    plog = PredictionLogger(writer=writer, batch_size=100, flush_interval=0.01)
+    plog.start()
+    plog.log(_record(0))
+    for _ in range(200):
+        if writer.called:
+            break
+        plog._stopping.wait(0.01)
+    assert writer.call_count == 1
+    plog.stop()
+
+
+def test_politique_drop():
+    """File pleine + politique drop → prédictions ignorées et comptées."""
+    plog = PredictionLogger(writer=Mock(), queue_size=1, full_policy="drop")
+    plog.log_many([_record(i) for i in range(3)])
+    assert plog.stats() == {
+        "queue_depth": 1,
+        "written": 0,
+        "dropped": 2,
+        "spilled": 0,
+        "failed": 0,
+    }
+
+
+def test_metriques_file_et_pertes(tmp_path):
+    """Profondeur de file, pertes et débordements exportés en métriques."""
+    dropped = _sample("uc1_db_rows_total", outcome="dropped")
+    spilled = _sample("uc1_db_rows_total", outcome="spilled")
+
+    plog = PredictionLogger(writer=Mock(), queue_size=2, full_policy="drop")
+    plog.log_many([_record(i) for i in range(5)])
+    assert _sample("uc1_prediction_log_queue_depth") == 2
+    assert _sample("uc1_db_rows_total", outcome="dropped") == dropped + 3
+
+    plog = PredictionLogger(
+        writer=Mock(),
+        queue_size=1,
+        full_policy="spill",
+        spill_path=tmp_path / "spill.jsonl",
+    )
+    plog.log_many([_record(i) for i in range(3)])
+    assert _sample("uc1_prediction_log_queue_depth") == 1
+    assert _sample("uc1_db_rows_total", outcome="spilled") == spilled + 2
+
+
+def test_politique_spill(tmp_path):
+    """File pleine + politique spill → prédictions ajoutées au fichier JSONL."""
+    spill = tmp_path / "spill.jsonl"
+    plog = PredictionLogger(
+        writer=Mock(), queue_size=1, full_policy="spill", spill_path=spill
+    )
+    plog.log_many([_record(i) for i in range(3)])
+
+    lines = [json.loads(line) for line in spill.read_text().splitlines()]
+    assert [r["input_data"]["i"] for r in lines] == [1, 2]
+    assert plog.stats()["spilled"] == 2
+
+
+def test_echec_ecriture_compte():
+    """Une erreur d'écriture est comptée sans arrêter le worker."""
+    writer = Mock(side_effect=RuntimeError("DB indisponible"))
+    plog = PredictionLogger(writer=writer, flush_interval=60)
+    plog.start()
+    plog.log(_record(0))
+    plog.stop()
+    assert plog.stats()["failed"] == 1
+
+
+def test_politique_inconnue():
+    """Une politique inconnue est refusée à la construction."""
+    with pytest.raises(ValueError, match="Politique inconnue"):
+        PredictionLogger(full_policy="ignore")
+
+
+def test_try_log_ne_bloque_pas():
+    """Politique block, file pleine : try_log rend la main sans déposer."""
+    plog = PredictionLogger(writer=Mock(), queue_size=1)
+    assert plog.try_log(_record(0)) is True
+    assert plog.try_log(_record(1)) is False
+    assert plog.depth == 1
+
+
+def test_log_bulk_un_seul_insert():
+    """Un lot déposé d'un bloc occupe une place et part en un seul INSERT."""
+    writer = Mock()
+    plog = PredictionLogger(writer=writer, queue_size=1, batch_size=2)
+    plog.log_bulk(lambda: [_record(i) for i in range(5)], 5)
+    assert plog.depth == 1
+    plog.start()
+    plog.stop()
+
+    (batch,) = [call.args[0] for call in writer.call_args_list]
+    assert [r["input_data"]["i"] for r in batch] == list(range(5))
+    assert len({r["timestamp"] for r in batch}) == 1
+    assert plog.stats()["written"] == 5
+
+
+def test_log_bulk_politique_drop():
+    """File pleine + politique drop → tout le lot est compté comme perdu."""
+    records = Mock()
+    plog = PredictionLogger(writer=Mock(), queue_size=1, full_policy="drop")
+    plog.log(_record(0))
+    plog.log_bulk(records, 1000)
+    records.assert_not_called()
+    assert plog.stats()["dropped"] == 1000
@@ -0,0 +1,209 @@
+"""Tests des générations de modèles et du rechargement à chaud."""
+
+import copy
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import api.main
+from api.lookup import V1LookupTable
+from api.registry import (
+    ModelRegistry,
+    RegistryError,
+    Reloader,
+    ReloadTrigger,
+    generation_id,
+    load_registry,
+    validate_registry,
+)
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return load_registry(lazy=False)
+
+
+def test_generation_valide(registry):
+    """La génération du dossier models/ est cohérente avec ses métadonnées."""
+    validate_registry(registry)
+    assert len(registry.generation) == 12
+
+
+def test_generation_sans_lire_les_modeles(tmp_path):
+    """L'empreinte lit les métadonnées mais pas les octets des modèles ; elle
+    change quand un modèle est remplacé."""
+    (tmp_path / "metadata_UC1_api.json").write_text("{}")
+    model = tmp_path / "model_UC1_v1_base.cbm"
+    model.write_bytes(b"v1")
+    with patch("api.registry.MODELS_DIR", tmp_path):
+        first = generation_id()
+        with patch.object(
+            Path, "read_bytes", autospec=True, side_effect=Path.read_bytes
+        ) as read:
+            assert generation_id() == first
+        assert [c.args[0].suffix for c in read.call_args_list] == [".json"]
+        model.write_bytes(b"v1 reentraine")
+        assert generation_id() != first
+
+
+def test_features_incoherentes_refusees(registry):
+    """Un modèle dont les features diffèrent des métadonnées est refusé."""
+    metadata = copy.deepcopy(registry.metadata)
+    metadata["models"]["v2_route"]["features"].reverse()
+    bad = ModelRegistry(
+        generation="bad",
+        models=registry.models,
+        metadata=metadata,
+        dep_mapping=registry.dep_mapping,
+        encoders=registry.encoders,
+    )
+    with pytest.raises(RegistryError, match="v2_route"):
+        validate_registry(bad)
+
+
+def test_table_v1_verifiee_au_premier_usage():
+    """En lazy, ni la validation au démarrage ni la table V1 ne chargent le
+    modèle V1 ; la table est vérifiée puis servie à son premier chargement."""
+    lazy = load_registry(lazy=True)
+    validate_registry(lazy, loaded_only=True)
+    assert lazy.models.loaded() == []
+    assert lazy.v1_table is None
+
+    lazy.models["v1_base"]
+    assert isinstance(lazy.v1_table, V1LookupTable)
+
+
+def test_generation_vide_refusee():
+    with pytest.raises(RegistryError, match="Aucun modèle"):
+        validate_registry(ModelRegistry.empty())
+
+
+def test_un_seul_rechargement_a_la_fois():
+    """Un rechargement concurrent est refusé (None) sans rien charger."""
+    reloader = Reloader()
+    with reloader._lock, patch("api.registry.load_registry") as load:
+        assert reloader.reload() is None
+    load.assert_not_called()
+
+
+def test_reload_desactive_sans_jeton(client):
+    """POST /admin/reload sans ADMIN_TOKEN configuré → status 403."""
+    assert client.post("/admin/reload").status_code == 403
+
+
+def test_reload_jeton_invalide(client):
+    """POST /admin/reload avec un mauvais jeton → status 401."""
+    with patch("api.main.ADMIN_TOKEN", "secret"):
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "x"})
+    assert response.status_code == 401
+
+
+@pytest.fixture
+def trigger(tmp_path):
+    """Signal de rechargement dans un dossier temporaire (pas dans models/)."""
+    trigger = ReloadTrigger(tmp_path / ".reload", interval=0)
+    with patch("api.main.reload_trigger", trigger):
+        yield trigger
+
+
+def test_reload_bascule_generation(client, accident_minimal, trigger):
+    """Le rechargement remplace la génération d'un bloc ; les réponses portent
+    la nouvelle génération, l'ancienne reste intacte pour les requêtes en cours."""
+    previous = api.main.registry
+    with patch("api.main.ADMIN_TOKEN", "secret"):
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["previous_generation"] == previous.generation
+    assert api.main.registry is not previous
+    assert not previous.models
+    with patch("api.main.prediction_logger"):
+        prediction = client.post("/predict", json=accident_minimal).json()
+    assert prediction["generation_modele"] == body["generation"]
+
+
+def test_reload_publie_le_signal(client, trigger):
+    """Le worker qui recharge publie un jeton sans le reprendre lui-même."""
+    with patch("api.main.ADMIN_TOKEN", "secret"):
+        client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert trigger.path.read_text() == trigger.seen
+    assert trigger.poll() is None
+
+
+def test_signal_suivi_par_un_autre_worker(tmp_path):
+    """Un autre worker voit le nouveau jeton au plus une fois par intervalle."""
+    path = tmp_path / ".reload"
+    worker = ReloadTrigger(path, interval=3600)
+    assert worker.poll() is None
+    ReloadTrigger(path).bump()
+    assert worker.poll() is None  # prochaine lecture dans une heure
+    worker._next_check = 0.0
+    assert worker.poll() == path.read_text()
+
+
+def test_rechargement_en_arriere_plan(trigger):
+    """Jeton d'un autre worker : la requête garde sa génération, la nouvelle
+    est chargée dans un thread puis installée."""
+    ReloadTrigger(trigger.path).bump()
+    new = ModelRegistry.empty()
+    previous = api.main.registry
+    with patch.object(api.main.reloader, "reload", return_value=new):
+        assert api.main._serving_registry() is previous
+        for thread in threading.enumerate():
+            if thread.name == "model-reload":
+                thread.join()
+    assert api.main.registry is new
+    assert trigger.seen == trigger.path.read_text()
+    assert trigger.poll() is None
+    api.main.registry = previous
+
+
+@pytest.mark.parametrize(
+    "error", [RegistryError("features"), OSError("tronqué"), ValueError("cbm")]
+)
+def test_rechargement_en_echec_non_relance(trigger, error):
+    """Échec du rechargement d'un autre worker, quelle qu'en soit la cause :
+    la génération reste servie et le jeton n'est pas repris au poll suivant."""
+    ReloadTrigger(trigger.path).bump()
+    previous = api.main.registry
+    with patch.object(api.main.reloader, "reload", side_effect=error):
+        api.main._follow_reload(trigger.poll())
+    assert api.main.registry is previous
+    assert trigger.seen == trigger.path.read_text()
+    assert trigger.poll() is None
+
+
+@pytest.mark.parametrize("path", ["/models", "/feature-importances", "/shadow"])
+def test_endpoints_statiques_suivent_le_rechargement(client, trigger, path):
+    """Les endpoints d'introspection relèvent aussi le jeton d'un autre worker."""
+    ReloadTrigger(trigger.path).bump()
+    new = ModelRegistry.empty()
+    previous = api.main.registry
+    with patch.object(api.main.reloader, "reload", return_value=new):
+        client.get(path)
+        for thread in threading.enumerate():
+            if thread.name == "model-reload":
+                thread.join()
+    assert api.main.registry is new
+    assert trigger.poll() is None
+    api.main.registry = previous
+
+
+def test_reload_hors_boucle(client, trigger):
+    """Le chargement de la génération tourne dans un thread d'AnyIO."""
+    threads = []
+
+    def reload():
+        threads.append(threading.current_thread().name)
+        return api.main.registry
+
+    with (
+        patch("api.main.ADMIN_TOKEN", "secret"),
+        patch.object(api.main.reloader, "reload", reload),
+    ):
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert threads[0].startswith("AnyIO worker thread")
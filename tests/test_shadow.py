@@ -0,0 +1,170 @@
+"""Tests de l'évaluation shadow des modèles candidats."""
+
+import shutil
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+import api.main
+from api.model import MODELS_DIR, ModelStore
+from api.registry import (
+    ModelRegistry,
+    RegistryError,
+    load_registry,
+    validate_registry,
+)
+from api.schemas import AccidentInput
+from api.shadow import ShadowScorer
+
+
+def _registry(shadow_proba):
+    """Génération minimale avec un candidat V1 de probabilité fixe."""
+    candidate = Mock()
+    candidate.predict_proba.side_effect = lambda X: np.tile(
+        [1 - shadow_proba, shadow_proba], (len(X), 1)
+    )
+    shadows = ModelStore()
+    shadows["v1_base"] = candidate
+    return ModelRegistry(
+        generation="test",
+        models=ModelStore(),
+        metadata={"threshold": 0.45},
+        dep_mapping={},
+        encoders={},
+        shadows=shadows,
+    )
+
+
+def _submit(scorer, reg, proba, n=1):
+    row = AccidentInput(
+        departement="75", heure=14, mois=6, jour_semaine=2, luminosite="jour"
+    )
+    record = {"input_data": row.model_dump(), "timestamp": "t"}
+    return [
+        scorer.submit(reg, "v1_base", row, np.zeros((1, 8)), proba, record)
+        for _ in range(n)
+    ]
+
+
+def test_shadow_journalise_et_compare():
+    log = Mock()
+    scorer = ShadowScorer(log, sample_rate=1.0)
+    scorer.start()
+    reg = _registry(0.5)
+    assert _submit(scorer, reg, 0.4, n=2) == [True, True]
+    scorer.stop()
+
+    records = [r for call in log.call_args_list for r in call.args[0]]
+    assert len(records) == 2
+    assert records[0]["model_version"] == "v1_base@shadow"
+    assert records[0]["probability"] == 0.5
+    assert records[0]["timestamp"] == "t"
+    stats = scorer.stats()["versions"]["v1_base"]
+    assert stats["n"] == 2
+    assert stats["accord"] == 0.0  # 0.4 < 0.45 <= 0.5
+    assert stats["ecart_moyen"] == pytest.approx(0.1)
+
+
+def test_shadow_sans_candidat_ni_echantillon():
+    scorer = ShadowScorer(Mock(), sample_rate=1.0)
+    scorer.start()
+    reg = _registry(0.5)
+    reg.shadows.clear()
+    assert _submit(scorer, reg, 0.4) == [False]
+    scorer.stop()
+    # Taux nul : aucun worker démarré, rien n'est échantillonné
+    scorer = ShadowScorer(Mock(), sample_rate=0.0)
+    scorer.start()
+    assert _submit(scorer, _registry(0.5), 0.4) == [False]
+
+
+def test_shadow_file_pleine_ne_bloque_pas():
+    """Candidat bloqué : les soumissions suivantes sont abandonnées sans attente."""
+    release = threading.Event()
+    reg = _registry(0.5)
+    reg.shadows["v1_base"].predict_proba.side_effect = lambda X: (
+        release.wait(),
+        np.tile([0.5, 0.5], (len(X), 1)),
+    )[1]
+    scorer = ShadowScorer(Mock(), sample_rate=1.0, queue_size=2, batch_size=1)
+    scorer.start()
+
+    start = time.perf_counter()
+    accepted = _submit(scorer, reg, 0.4, n=10)
+    elapsed = time.perf_counter() - start
+    release.set()
+    scorer.stop()
+
+    assert elapsed < 0.05
+    assert accepted.count(False) >= 7
+    assert scorer.stats()["dropped"] == accepted.count(False)
+
+
+def test_predict_soumet_au_candidat(client_with_model, accident_minimal):
+    """/predict : réponse du modèle servi, candidat journalisé à côté."""
+    reg = api.main.registry
+    reg.shadows["v1_base"] = _registry(0.2).shadows["v1_base"]
+    scorer = ShadowScorer(
+        lambda records: api.main.prediction_logger.log_many(records), sample_rate=1.0
+    )
+    scorer.start()
+    with patch("api.main.shadow_scorer", scorer):
+        response = client_with_model.post("/predict", json=accident_minimal)
+        scorer.stop()
+        stats = client_with_model.get("/shadow").json()
+
+    assert response.json()["probabilite"] == 0.75
+    primary = api.main.prediction_logger.try_log.call_args.args[0]
+    (shadow,) = api.main.prediction_logger.log_many.call_args.args[0]
+    assert shadow["model_version"] == "v1_base@shadow"
+    assert shadow["timestamp"] == primary["timestamp"]
+    assert shadow["input_data"] == primary["input_data"]
+    # Vecteur de features déjà encodé par la requête, pas ré-encodé
+    X = reg.shadows["v1_base"].predict_proba.call_args.args[0]
+    assert (
+        X.tolist()
+        == reg.encoders["v1_base"]
+        .encode_batch([AccidentInput(**accident_minimal)])
+        .tolist()
+    )
+    assert stats["candidats"] == ["v1_base"]
+    assert stats["versions"]["v1_base"]["accord"] == 0.0
+
+
+def test_candidat_identique_vrais_modeles(tmp_path, accident_minimal):
+    """Copie du modèle V2 en candidat : accord total, écart nul."""
+    shutil.copy(MODELS_DIR / "model_UC1_v2_route.joblib", tmp_path)
+    with patch("api.shadow.SHADOW_MODELS_DIR", tmp_path):
+        reg = load_registry(lazy=False)
+    validate_registry(reg)
+    assert list(reg.shadows) == ["v2_route"]
+
+    scorer = ShadowScorer(Mock(), sample_rate=1.0)
+    scorer.start()
+    rows = [
+        AccidentInput(**accident_minimal, vma=vma, nbv=2) for vma in (30, 50, 80, 110)
+    ]
+    X = reg.encoders["v2_route"].encode_batch(rows)
+    probas = reg.models["v2_route"].predict_proba(X)[:, 1]
+    for row, x, proba in zip(rows, X, probas, strict=True):
+        scorer.submit(reg, "v2_route", row, x[None, :], float(proba), {})
+    scorer.stop()
+
+    stats = scorer.stats()["versions"]["v2_route"]
+    assert stats["n"] == 4
+    assert stats["accord"] == 1.0
+    assert stats["ecart_absolu_max"] == 0.0
+
+
+def test_candidat_features_differentes(tmp_path):
+    """Un candidat d'une autre version (features différentes) est refusé."""
+    shutil.copy(
+        MODELS_DIR / "model_UC1_v1_base.joblib", tmp_path / "model_UC1_v2_route.joblib"
+    )
+    with patch("api.shadow.SHADOW_MODELS_DIR", tmp_path):
+        reg = load_registry(lazy=True)
+    with pytest.raises(RegistryError, match="Candidat v2_route"):
+        validate_registry(reg)
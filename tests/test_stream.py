@@ -0,0 +1,218 @@
+"""Tests du scoring en flux (CSV/NDJSON) et de l'encodage vectorisé."""
+
+import json
+import random
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.model import (
+    compile_encoders,
+    detect_version,
+    detect_versions,
+    load_all_models,
+)
+from api.registry import ModelRegistry
+from api.schemas import AccidentInput
+from api.stream import ChunkParser, normalize_frame, score_blocks
+
+VEHICULES = ["moto", "velo", "edp", "cyclomoteur", "pieton", "poids_lourd"]
+
+
+def _random_payloads(n, deps, seed=0):
+    """Accidents aléatoires, chaque champ optionnel renseigné une fois sur deux."""
+    rng = random.Random(seed)  # noqa: S311
+
+    def maybe(value):
+        return value if rng.random() < 0.5 else None
+
+    payloads = []
+    for _ in range(n):
+        payload = {
+            "departement": rng.choice(deps),
+            "heure": rng.randint(0, 23),
+            "mois": rng.randint(1, 12),
+            "jour_semaine": rng.randint(0, 6),
+            "luminosite": rng.choice(["jour", "nuit_eclairee", "nuit_non_eclairee"]),
+            "vma": maybe(rng.choice([30, 50, 90, 130])),
+            "nbv": maybe(rng.randint(1, 4)),
+            "type_route": maybe(rng.choice(["autoroute", "communale", "autre"])),
+            "en_agglomeration": maybe(rng.random() < 0.5),
+            "bidirectionnelle": maybe(rng.random() < 0.5),
+            "meteo_degradee": maybe(rng.random() < 0.5),
+            "surface_glissante": maybe(rng.random() < 0.5),
+            "intersection": maybe(rng.random() < 0.5),
+            "route_en_pente": maybe(rng.random() < 0.5),
+            "nb_vehicules": maybe(rng.randint(1, 4)),
+            "types_vehicules": maybe(rng.sample(VEHICULES, rng.randint(0, 3))),
+            "type_collision": maybe(rng.choice(["frontale", "cote", "solo"])),
+        }
+        payloads.append({k: v for k, v in payload.items() if v is not None})
+    return payloads
+
+
+@pytest.fixture(scope="module")
+def encoders_and_deps():
+    _, metadata, dep_mapping = load_all_models(lazy=True)
+    return compile_encoders(metadata, dep_mapping), dep_mapping
+
+
+def test_encodage_vectorise_identique(encoders_and_deps):
+    """encode_frame et detect_versions reproduisent encode_batch/detect_version."""
+    encoders, dep_mapping = encoders_and_deps
+    payloads = _random_payloads(500, [*sorted(dep_mapping)[:20], "999"])
+    rows = [AccidentInput(**p) for p in payloads]
+    df, errors = normalize_frame(pd.DataFrame.from_records(payloads))
+
+    assert errors.isna().all()
+    assert detect_versions(df).tolist() == [detect_version(r) for r in rows]
+    for encoder in encoders.values():
+        np.testing.assert_array_equal(
+            encoder.encode_frame(df), encoder.encode_batch(rows)
+        )
+
+
+def test_validation_vectorisee():
+    """Chaque ligne invalide reçoit un message ; les lignes valides aucun."""
+    raw = pd.DataFrame(
+        {
+            "departement": ["75", "75", None, "13", "13"],
+            "heure": ["3", "24", "3", "3.5", "3"],
+            "mois": ["1", "1", "1", "1", "1"],
+            "jour_semaine": ["0", "0", "0", "0", "0"],
+            "luminosite": ["jour", "jour", "jour", "jour", "aube"],
+            "en_agglomeration": ["True", None, None, None, "peut-être"],
+            "types_vehicules": ["moto|pieton", None, None, None, None],
+        }
+    )
+    df, errors = normalize_frame(raw)
+    assert errors.tolist() == [
+        None,
+        "heure invalide",
+        "departement manquant",
+        "heure invalide",
+        "luminosite invalide",
+    ]
+    assert df.loc[0, "en_agglomeration"] is True
+    assert df.loc[0, "types_vehicules"] == ["moto", "pieton"]
+
+
+def test_departement_numerique_refuse():
+    """NDJSON ``"departement": 75`` refusé comme par ``AccidentInput``."""
+    body = b"".join(
+        b'{"departement": %s, "heure": 3, "mois": 1, "jour_semaine": 0, '
+        b'"luminosite": "jour"}\n' % dep
+        for dep in (b'"75"', b"75")
+    )
+    parser = ChunkParser("ndjson")
+    parser.feed(body)
+    (chunk,) = parser.close()
+    df, errors = normalize_frame(chunk)
+    assert errors.tolist() == [None, "departement invalide"]
+    assert df.loc[0, "departement"] == "75"
+
+
+def test_decoupage_par_paquets():
+    """Les lignes coupées entre deux blocs sont recollées ; paquets de N lignes."""
+    body = b"heure,mois\n" + b"".join(b"%d,1\n" % h for h in range(7))
+    parser = ChunkParser("csv", chunk_rows=3)
+    chunks = [c for i in range(0, len(body), 5) for c in parser.feed(body[i : i + 5])]
+    chunks += parser.close()
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert pd.concat(chunks)["heure"].tolist() == [str(h) for h in range(7)]
+
+
+def _fake_registry(dep_mapping, encoders):
+    class Model:
+        def predict_proba(self, X):
+            p = X[:, 1].astype(float) / 100
+            return np.column_stack([1 - p, p])
+
+    return ModelRegistry(
+        generation="test",
+        models={v: Model() for v in encoders},
+        metadata={"threshold": 0.45},
+        dep_mapping=dep_mapping,
+        encoders=encoders,
+    )
+
+
+def test_memoire_constante(encoders_and_deps):
+    """Le pic mémoire ne croît pas avec la taille du flux (paquets de 200)."""
+    encoders, dep_mapping = encoders_and_deps
+    reg = _fake_registry(dep_mapping, encoders)
+    payloads = _random_payloads(200, sorted(dep_mapping))
+    block = "".join(json.dumps(p) + "\n" for p in payloads).encode()
+
+    def peak(n_blocks):
+        tracemalloc.start()
+        try:
+            for text in score_blocks(reg, [block] * n_blocks, "ndjson", 200):
+                del text
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(20) < 1.5 * peak(2)
+
+
+def test_predict_stream_ndjson(client_with_model, accident_minimal):
+    """POST /predict/stream : un résultat par ligne, erreurs en ligne, résumé."""
+    lines = [
+        json.dumps({**accident_minimal, "id": "a"}),
+        "{pas du json",
+        json.dumps({**accident_minimal, "heure": 99}),
+    ]
+    response = client_with_model.post(
+        "/predict/stream",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert results[0] == {
+        "ligne": 1,
+        "id": "a",
+        "version_modele": "v1_base",
+        "probabilite": 0.75,
+        "grave": True,
+    }
+    assert results[1]["erreur"] == "JSON invalide"
+    assert results[2]["erreur"] == "heure invalide"
+    assert results[3]["resume"]["lignes"] == 3
+    assert results[3]["resume"]["erreurs"] == 2
+
+
+def test_predict_stream_csv(client_with_model):
+    body = "departement,heure,mois,jour_semaine,luminosite\n75,3,1,0,jour\n"
+    response = client_with_model.post(
+        "/predict/stream", content=body, headers={"Content-Type": "text/csv"}
+    )
+    first = json.loads(response.text.splitlines()[0])
+    assert first["probabilite"] == 0.75
+
+
+def test_predict_stream_csv_id_manquant(client_with_model):
+    """Un id vide en CSV est omis, pas écrit ``NaN`` (NDJSON invalide)."""
+    body = (
+        "id,departement,heure,mois,jour_semaine,luminosite\n"
+        "a,75,3,1,0,jour\n"
+        ",75,4,1,0,jour\n"
+    )
+    response = client_with_model.post(
+        "/predict/stream", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert "NaN" not in response.text
+    first, second = (json.loads(line) for line in response.text.splitlines()[:2])
+    assert first["id"] == "a"
+    assert "id" not in second
+    assert second["probabilite"] == 0.75
+
+
+def test_predict_stream_format_inconnu(client_with_model):
+    response = client_with_model.post(
+        "/predict/stream", content="x", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
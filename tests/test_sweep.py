@@ -0,0 +1,115 @@
+"""Tests du balayage contrefactuel (grille de valeurs autour d'un accident)."""
+
+import time
+from typing import get_args
+
+import pytest
+
+import api.main
+from api.registry import load_registry
+from api.schemas import AccidentInput, SweepAxis, SweepField, SweepRequest
+from api.sweep import DOMAINS, axis_values, expand_grid
+
+ACCIDENT = AccidentInput(
+    departement="75",
+    heure=22,
+    mois=11,
+    jour_semaine=5,
+    luminosite="nuit_eclairee",
+    vma=50,
+    type_route="communale",
+    en_agglomeration=True,
+    nb_vehicules=2,
+    types_vehicules=["moto"],
+    type_collision="cote",
+)
+
+
+def test_domaines_couvrent_les_champs():
+    """Chaque champ balayable (hors départements) a un domaine par défaut."""
+    assert set(DOMAINS) | {"departement"} == set(get_args(SweepField))
+    assert axis_values(SweepAxis(champ="type_collision"), {}) == [
+        "frontale",
+        "arriere",
+        "cote",
+        "solo",
+    ]
+    assert axis_values(SweepAxis(champ="departement"), {"13": 12, "2A": 20}) == [
+        "13",
+        "2A",
+    ]
+
+
+def test_grille_ligne_par_ligne():
+    """La grille suit l'ordre (axe 1, axe 2) ; les autres champs sont inchangés."""
+    axes = [
+        SweepAxis(champ="heure", valeurs=[3, 15]),
+        SweepAxis(champ="type_route", valeurs=["autoroute", "communale"]),
+    ]
+    values, rows = expand_grid(ACCIDENT, axes, {})
+    assert values == [[3, 15], ["autoroute", "communale"]]
+    assert [(r.heure, r.type_route) for r in rows] == [
+        (3, "autoroute"),
+        (3, "communale"),
+        (15, "autoroute"),
+        (15, "communale"),
+    ]
+    assert all(r.departement == "75" and r.type_collision == "cote" for r in rows)
+
+
+def test_valeur_invalide():
+    with pytest.raises(ValueError, match="vma"):
+        expand_grid(ACCIDENT, [SweepAxis(champ="vma", valeurs=[200])], {})
+
+
+@pytest.mark.parametrize(
+    ("axis", "match"),
+    [
+        (SweepAxis(champ="departement", valeurs=["75", "99x"]), "inconnu"),
+        (SweepAxis(champ="heure", valeurs=[3, 3]), "double"),
+        (SweepAxis(champ="heure", valeurs=[True]), "heure"),
+    ],
+)
+def test_valeurs_refusees(axis, match):
+    """Département hors mapping, doublon et booléen sur un champ entier."""
+    with pytest.raises(ValueError, match=match):
+        expand_grid(ACCIDENT, [axis], {"75": 74, "13": 12})
+
+
+def test_departement_inconnu_422(client_with_model, accident_minimal):
+    """Un département hors mapping n'est pas scoré comme le code 0."""
+    response = client_with_model.post(
+        "/predict/sweep",
+        json={
+            "accident": accident_minimal,
+            "axes": [{"champ": "departement", "valeurs": ["75", "99x"]}],
+        },
+    )
+    assert response.status_code == 422
+    assert "99x" in response.json()["detail"]
+
+
+def test_axes_distincts():
+    with pytest.raises(ValueError, match="distincts"):
+        SweepRequest(
+            accident=ACCIDENT, axes=[SweepAxis(champ="mois"), SweepAxis(champ="mois")]
+        )
+
+
+def test_grille_complete_sous_50_ms(monkeypatch):
+    """Grille 24 x 12 (heure x mois) avec les vrais modèles, cache vide."""
+    monkeypatch.setattr(api.main, "registry", load_registry(lazy=False))
+    request = SweepRequest(
+        accident=ACCIDENT, axes=[SweepAxis(champ="heure"), SweepAxis(champ="mois")]
+    )
+    timings = []
+    for _ in range(5):
+        api.main.prediction_cache.invalidate()
+        start = time.perf_counter()
+        response = api.main.predict_sweep(request)
+        timings.append(time.perf_counter() - start)
+
+    assert response.version_modele == "v4_collision"
+    assert len(response.probabilites) == 24
+    assert {len(row) for row in response.probabilites} == {12}
+    assert min(timings) < 0.05